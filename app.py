@@ -24,8 +24,8 @@ class JSONEncoder(json.JSONEncoder):
 
 app.json_encoder = JSONEncoder
 
-# Initialize database and crawler
-db = CrawlerDatabase()
+# Initialize database and crawler (MongoDB is connected in the background, so startup never waits on it)
+db = CrawlerDatabase(background=True)
 crawler = EnhancedWebCrawler(db)
 
 @app.route('/')
@@ -94,7 +94,9 @@ def crawl_now():
             "url": data.get('url'),
             "type": data.get('type'),
             "max_items": data.get('max_items', 20),
-            "frequency": data.get('frequency', 'daily')
+            "frequency": data.get('frequency', 'daily'),
+            # Quick crawls always show fresh data, even if the page is unchanged
+            "conditional_get": False
         }
         
         if 'selectors' in data:
@@ -123,6 +125,9 @@ def crawl_now():
         # Get recent data and convert ObjectId to string
         recent_data = []
         if result['status'] == 'success':
+            # Items are stored by the write-behind thread: wait for them before reading back
+            if crawler.writer is not None:
+                crawler.writer.flush(timeout=10)
             raw_data = db.get_recent_data(limit=3)
             for item in raw_data:
                 # Convert ObjectId to string
@@ -168,12 +173,43 @@ def crawl_source_by_id(source_id):
         
         result = crawler.crawl_source(source)
         return jsonify({
-            'success': result['status'] == 'success',
+            'success': result['status'] in ('success', 'not_modified'),
             'result': result
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 400
 
+@app.route('/api/crawl/all', methods=['POST'])
+def crawl_all_sources():
+    """API: Crawl all active sources concurrently"""
+    data = request.json or {}
+    
+    try:
+        concurrency = max(1, int(data.get('concurrency', 8)))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'concurrency must be an integer'}), 400
+    
+    try:
+        sources = db.get_all_sources(status="active")
+        results = crawler.crawl_many(sources, concurrency=concurrency)
+        
+        for result in results:
+            if 'source_id' in result:
+                result['source_id'] = str(result['source_id'])
+            if '_id' in result:
+                result['_id'] = str(result['_id'])
+            if 'timestamp' in result and isinstance(result['timestamp'], datetime):
+                result['timestamp'] = result['timestamp'].isoformat()
+        
+        return jsonify({
+            'success': True,
+            'crawled': len(results),
+            'succeeded': sum(1 for r in results if r['status'] in ('success', 'not_modified')),
+            'results': results
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
 @app.route('/search')
 def search():
     """Search page"""
@@ -238,6 +274,42 @@ def get_stats():
     stats = db.get_statistics()
     return jsonify(stats)
 
+@app.route('/api/rate-limits', methods=['GET'])
+def get_rate_limits():
+    """API: Get per-host rate limits and queue-wait metrics"""
+    return jsonify(crawler.rate_limiter.stats())
+
+@app.route('/api/browser-pool', methods=['GET'])
+def get_browser_pool():
+    """API: Get headless browser pool usage"""
+    return jsonify(crawler.browser_pool.stats())
+
+@app.route('/api/circuit-breakers', methods=['GET'])
+def get_circuit_breakers():
+    """API: Get per-host circuit breaker state"""
+    return jsonify(crawler.breaker.stats())
+
+@app.route('/api/circuit-breakers/<host>/reset', methods=['POST'])
+def reset_circuit_breaker(host):
+    """API: Close a host's circuit breaker"""
+    if crawler.breaker.reset(host):
+        return jsonify({'success': True})
+    return jsonify({'success': False, 'error': 'Unknown host'}), 404
+
+@app.route('/api/write-behind', methods=['GET'])
+def get_write_behind():
+    """API: Get write-behind queue depth, batch sizes and flush latency"""
+    if crawler.writer is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(crawler.writer.stats(), enabled=True))
+
+@app.route('/api/spool', methods=['GET'])
+def get_spool():
+    """API: Get crawl results waiting on disk for MongoDB, and replay totals"""
+    if crawler.spool is None:
+        return jsonify({'enabled': False})
+    return jsonify(dict(crawler.spool.stats(), enabled=True))
+
 @app.route('/api/logs', methods=['GET'])
 def get_logs():
     """API: Get crawl logs"""
@@ -270,9 +342,15 @@ def ai_summarize():
         
         # Get items from database
         items = []
+        stories = set()
         for item_id in item_ids[:10]:  # Limit to 10 items
             item_data = db.crawled_data.find_one({"_id": ObjectId(item_id)})
-            if item_data:
+            if not item_data:
+                continue
+            # Near duplicates of the same story are summarized once
+            story = item_data.get('duplicate_of') or item_data.get('fingerprint') or item_data['_id']
+            if story not in stories:
+                stories.add(story)
                 items.append(item_data)
         
         if not items:
@@ -314,7 +392,7 @@ def ai_chat():
             }), 503
         
         # Get recent data for context
-        recent_items = db.get_recent_data(limit=5)
+        recent_items = db.get_recent_data(limit=5, canonical_only=True)
         context = ""
         for item in recent_items:
             context += f"{item.get('title', '')}: {item.get('content', '')[:200]} "
@@ -346,9 +424,9 @@ def ai_analyze():
         
         # Get data based on query
         if search_query:
-            items = db.search_by_keyword(search_query, limit=50)
+            items = db.search_by_keyword(search_query, limit=50, canonical_only=True)
         else:
-            items = db.get_recent_data(limit=50)
+            items = db.get_recent_data(limit=50, canonical_only=True)
         
         if not items:
             return jsonify({'success': False, 'error': 'No data found'}), 400
@@ -379,7 +457,7 @@ if __name__ == '__main__':
     print("=" * 70)
     print("🚀 WEB CRAWLER DASHBOARD")
     print("=" * 70)
-    print(f"\n✅ MongoDB: {'Connected' if db.client else 'Not Connected'}")
+    print(f"\n✅ MongoDB: {'Connected' if db.wait_connected(timeout=2) else 'Not connected yet (retrying in background)'}")
     print(f"✅ Flask: Starting server...")
     print(f"\n🌐 Open your browser and go to:")
     print(f"   http://localhost:5000")
@@ -0,0 +1,249 @@
+"""
+Headless Browser Pool
+Warm, bounded set of browser instances shared by dynamic crawls
+
+A dynamic crawl borrows a browser, renders its page and hands the browser
+back instead of starting and quitting Chrome every time. Browsers are
+health-checked before reuse and recycled after `max_pages` pages or when
+their JavaScript heap grows past `max_memory_mb`.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Any, Optional
+
+DEFAULT_POOL_SIZE = int(os.getenv('CRAWLER_BROWSER_POOL_SIZE', '2'))
+DEFAULT_MAX_PAGES = int(os.getenv('CRAWLER_BROWSER_MAX_PAGES', '50'))
+DEFAULT_MAX_MEMORY_MB = int(os.getenv('CRAWLER_BROWSER_MAX_MEMORY_MB', '512'))
+
+# Seconds a crawl waits for a free browser before giving up
+DEFAULT_BORROW_TIMEOUT = float(os.getenv('CRAWLER_BROWSER_BORROW_TIMEOUT', '120'))
+
+# Used JS heap of the current page (Chrome only, None elsewhere)
+MEMORY_SCRIPT = "return window.performance && performance.memory ? performance.memory.usedJSHeapSize : null"
+
+
+class BrowserPoolTimeout(RuntimeError):
+    """Raised when no browser becomes available within the borrow timeout"""
+
+
+def default_factory():
+    """Start an undetected headless Chrome that logs DevTools network events"""
+    from seleniumbase import Driver
+    return Driver(uc=True, headless=True, log_cdp_events=True)
+
+
+class PooledBrowser:
+    """A browser instance and its usage counters"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.pages = 0
+        self.created = time.monotonic()
+
+
+class BrowserPool:
+    """Thread-safe pool of reusable headless browsers"""
+
+    def __init__(self, max_size: int = DEFAULT_POOL_SIZE, max_pages: int = DEFAULT_MAX_PAGES,
+                 max_memory_mb: int = DEFAULT_MAX_MEMORY_MB,
+                 factory: Optional[Callable[[], Any]] = None,
+                 borrow_timeout: float = DEFAULT_BORROW_TIMEOUT):
+        self.max_size = max(1, max_size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.factory = factory or default_factory
+        self.borrow_timeout = borrow_timeout
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+        # Metrics
+        self.started = 0
+        self.reused = 0
+        self.recycled = 0
+        self.unhealthy = 0
+
+    # ==================== HEALTH ====================
+
+    def _quit(self, browser: PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"⚠️ Error closing browser: {e}")
+
+    def _is_healthy(self, browser: PooledBrowser) -> bool:
+        """The browser still answers script calls"""
+        try:
+            return browser.driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    def _memory_mb(self, browser: PooledBrowser) -> Optional[float]:
+        try:
+            used = browser.driver.execute_script(MEMORY_SCRIPT)
+        except Exception:
+            return None
+        return used / (1024 * 1024) if used else None
+
+    def _should_recycle(self, browser: PooledBrowser) -> bool:
+        if self.max_pages and browser.pages >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            memory = self._memory_mb(browser)
+            if memory is not None and memory > self.max_memory_mb:
+                return True
+        return False
+
+    def _reset(self, browser: PooledBrowser):
+        """Leave the previous page so the next source starts clean"""
+        browser.driver.delete_all_cookies()
+        browser.driver.get("about:blank")
+
+    # ==================== BORROW / RETURN ====================
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledBrowser:
+        """
+        Take a healthy browser, starting one if the pool is below max_size
+
+        Args:
+            timeout: Seconds to wait for a free browser (default: borrow_timeout)
+
+        Raises:
+            BrowserPoolTimeout: Every browser stayed busy for the whole timeout
+        """
+        timeout = self.borrow_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed")
+                    if self._idle:
+                        browser = self._idle.pop()
+                        break
+                    if self._size < self.max_size:
+                        browser = None
+                        self._size += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise BrowserPoolTimeout(f"No browser available after {timeout:.0f}s")
+                    self._condition.wait(remaining)
+
+            # Start or check the browser without holding the lock
+            if browser is None:
+                try:
+                    browser = PooledBrowser(self.factory())
+                except Exception:
+                    self._discard(None)
+                    raise
+                with self._condition:
+                    self.started += 1
+                return browser
+
+            if self._is_healthy(browser):
+                with self._condition:
+                    self.reused += 1
+                return browser
+
+            with self._condition:
+                self.unhealthy += 1
+            self._discard(browser)
+
+    def release(self, browser: PooledBrowser, failed: bool = False):
+        """
+        Give a browser back after a page was rendered
+
+        Args:
+            browser: Browser returned by acquire
+            failed: The crawl raised; the browser is only kept if it is still healthy
+        """
+        browser.pages += 1
+
+        if failed and not self._is_healthy(browser):
+            with self._condition:
+                self.unhealthy += 1
+            self._discard(browser)
+            return
+
+        if self._should_recycle(browser):
+            with self._condition:
+                self.recycled += 1
+            self._discard(browser)
+            return
+
+        try:
+            self._reset(browser)
+        except Exception:
+            with self._condition:
+                self.unhealthy += 1
+            self._discard(browser)
+            return
+
+        with self._condition:
+            if self._closed:
+                self._size -= 1
+            else:
+                self._idle.append(browser)
+                self._condition.notify()
+                return
+        self._quit(browser)
+
+    def _discard(self, browser: Optional[PooledBrowser]):
+        """Quit a browser and free its slot"""
+        if browser is not None:
+            self._quit(browser)
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    @contextmanager
+    def borrow(self, timeout: Optional[float] = None):
+        """Borrow a browser for one page, yielding its driver"""
+        browser = self.acquire(timeout)
+        failed = False
+        try:
+            yield browser.driver
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.release(browser, failed=failed)
+
+    def close(self):
+        """Quit every idle browser; borrowed ones are quit when returned"""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+
+        for browser in idle:
+            self._quit(browser)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, usage and recycling counters"""
+        with self._condition:
+            return {
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "started": self.started,
+                "reused": self.reused,
+                "recycled": self.recycled,
+                "unhealthy": self.unhealthy
+            }
+
+
+# Shared so every crawler instance in the process reuses the same browsers;
+# no browser is started until the first dynamic crawl
+default_browser_pool = BrowserPool()
+atexit.register(default_browser_pool.close)
@@ -0,0 +1,142 @@
+"""
+Per-Host Circuit Breaker
+Stops fetching from hosts that keep failing, shared by every crawler fetch path
+
+After CRAWLER_BREAKER_THRESHOLD consecutive failures (connection errors,
+timeouts, 5xx) a host's circuit opens and fetches fail immediately with
+CircuitOpen instead of waiting for a timeout. Once the cooldown is over a
+single half-open probe is let through: success closes the circuit, failure
+opens it again for twice as long (up to CRAWLER_BREAKER_MAX_COOLDOWN).
+"""
+import os
+import threading
+import time
+from typing import Dict, Any
+from urllib.parse import urlparse
+
+DEFAULT_THRESHOLD = int(os.getenv('CRAWLER_BREAKER_THRESHOLD', 5))
+DEFAULT_COOLDOWN = float(os.getenv('CRAWLER_BREAKER_COOLDOWN', 60))
+DEFAULT_MAX_COOLDOWN = float(os.getenv('CRAWLER_BREAKER_MAX_COOLDOWN', 15 * 60))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of fetching from a host whose circuit is open"""
+
+
+class HostCircuit:
+    """Breaker state of a single host"""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.cooldown = 0.0
+        self.trips = 0
+        self.probing = False
+        self.probe_started = 0.0
+
+        # Metrics
+        self.short_circuited = 0
+        self.total_failures = 0
+        self.total_successes = 0
+
+
+class CircuitBreaker:
+    """Thread-safe consecutive-failure breaker keyed by host name"""
+
+    def __init__(self, threshold: int = DEFAULT_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN,
+                 max_cooldown: float = DEFAULT_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._circuits: Dict[str, HostCircuit] = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, url: str) -> HostCircuit:
+        host = urlparse(url).netloc.lower()
+        circuit = self._circuits.get(host)
+        if circuit is None:
+            circuit = self._circuits[host] = HostCircuit()
+        return circuit
+
+    def before(self, url: str):
+        """
+        Check that a fetch from the URL's host may go ahead
+
+        Raises CircuitOpen while the circuit is open, and for everyone but
+        the single probe while it is half-open.
+        """
+        with self._lock:
+            circuit = self._circuit(url)
+            if circuit.state == CLOSED:
+                return
+
+            now = time.monotonic()
+            if circuit.state == OPEN and now - circuit.opened_at >= circuit.cooldown:
+                circuit.state = HALF_OPEN
+                circuit.probing = False
+
+            # A probe that never reported back (e.g. stopped by robots.txt) does not block forever
+            if circuit.state == HALF_OPEN and (not circuit.probing or now - circuit.probe_started >= circuit.cooldown):
+                circuit.probing = True
+                circuit.probe_started = now
+                return
+
+            circuit.short_circuited += 1
+            retry_in = max(0.0, circuit.opened_at + circuit.cooldown - now)
+            raise CircuitOpen(f"Circuit open for {urlparse(url).netloc} "
+                              f"after {circuit.failures} failures (retry in {retry_in:.0f}s)")
+
+    def record_success(self, url: str):
+        with self._lock:
+            circuit = self._circuit(url)
+            circuit.total_successes += 1
+            circuit.failures = 0
+            circuit.trips = 0
+            circuit.probing = False
+            circuit.state = CLOSED
+
+    def record_failure(self, url: str):
+        with self._lock:
+            circuit = self._circuit(url)
+            circuit.total_failures += 1
+            circuit.failures += 1
+            circuit.probing = False
+            # Requests already in flight when the circuit opened do not extend the cooldown
+            if circuit.state == HALF_OPEN or (circuit.state == CLOSED and circuit.failures >= self.threshold):
+                # Each failed probe doubles how long the host is left alone
+                circuit.trips += 1
+                circuit.cooldown = min(self.max_cooldown, self.cooldown * 2 ** (circuit.trips - 1))
+                circuit.opened_at = time.monotonic()
+                circuit.state = OPEN
+
+    def reset(self, host: str) -> bool:
+        """Close a host's circuit by hand"""
+        with self._lock:
+            return self._circuits.pop(host.lower(), None) is not None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-host breaker state and counters"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "state": circuit.state,
+                    "consecutive_failures": circuit.failures,
+                    "retry_in": round(max(0.0, circuit.opened_at + circuit.cooldown - now), 1)
+                    if circuit.state == OPEN else 0.0,
+                    "trips": circuit.trips,
+                    "short_circuited": circuit.short_circuited,
+                    "failures": circuit.total_failures,
+                    "successes": circuit.total_successes
+                }
+                for host, circuit in self._circuits.items()
+            }
+
+
+# Shared breaker so every crawler instance in the process sees the same host health
+default_breaker = CircuitBreaker()
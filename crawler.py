@@ -2,24 +2,148 @@
 Web Crawler Engine
 Supports multiple content types: HTML, XML, PDF, TXT, RSS feeds
 """
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from contextlib import contextmanager
+from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
-from seleniumbase import Driver
-import PyPDF2
-import feedparser
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
 import time
-import io
+import re
+import heapq
+import threading
+import os
+from rate_limiter import HostRateLimiter, default_limiter
+from circuit_breaker import CircuitBreaker, CircuitOpen, default_breaker
+from retry_policy import retry_settings, backoff_delay, RETRYABLE_STATUSES, RETRYABLE_EXCEPTIONS
+from browser_pool import BrowserPool, default_browser_pool
+from page_readiness import readiness_settings, wait_until_ready
+from request_blocking import blocked_patterns, apply_blocking, count_requests
+from feed_parser import parse_feed
+from html_parsers import make_soup, select_containers, resolve_parser, diff_extractions, REFERENCE_PARSER
+from selector_cache import selector_cache, selectors_hash
+from response_cache import ResponseCache, get_default_cache, DEFAULT_MODE as RESPONSE_CACHE_MODE
+from snapshot_store import SnapshotStore, get_default_store, SNAPSHOTS_ENABLED
+from warc_archive import WarcWriter, get_default_writer, WARC_ENABLED
+from near_duplicate import NearDuplicateIndex, near_duplicate_mode
+from write_behind import BufferedWriter, WriterClosed, get_writer, WRITE_BEHIND
+from spool import DiskSpool, get_default_spool, start_replayer, SPOOL_ENABLED
+from robots import RobotsCache, RobotsDisallowed, RESPECT_ROBOTS
+from sitemap import is_sitemap_url, iter_sitemap, parse_lastmod, MAX_INDEX_DEPTH, MAX_PAGE_ATTEMPTS
+from frontier import Frontier, LinkRules, SeenSet, normalize_url, extract_links, QUEUE_FACTOR
+from frontier import DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES as FOLLOW_MAX_PAGES
+from xml_stream import iter_records, ResponseStream, DEFAULT_RECORD_TAGS
+from pdf_extractor import download_to_tempfile, extract_pdf_text, DEFAULT_MAX_BYTES, DEFAULT_MAX_PAGES
+
+# Default number of sources crawled at the same time by crawl_many
+DEFAULT_CONCURRENCY = 8
+
+# Keep-alive connections kept per host (must cover the highest concurrency used)
+CONNECTION_POOL_SIZE = 32
+
+# Timeout for every HTTP request (seconds)
+REQUEST_TIMEOUT = 30
+
+# XML documents larger than this (Content-Length, bytes) are parsed incrementally
+XML_STREAMING_THRESHOLD = int(os.getenv('CRAWLER_XML_STREAMING_THRESHOLD', 5 * 1024 * 1024))
+
+# Re-extract HTML with the reference parser and warn on differences (per source: parser_check)
+PARSER_CHECK = os.getenv('CRAWLER_PARSER_CHECK', 'false').lower() == 'true'
+
+# Accept header sent when fetching RSS/Atom feeds
+FEED_ACCEPT = "application/rss+xml, application/atom+xml, application/xml;q=0.9, text/xml;q=0.9, */*;q=0.8"
+
+# Response cache key prefix of rendered dynamic pages (kept apart from plain HTTP responses)
+RENDER_CACHE_PREFIX = "render:"
+
+# Source fields that change what is extracted from an unchanged response
+EXTRACTION_FIELDS = ("type", "selectors", "parser", "partial_parse", "fast_feed_parser", "record_tags",
+                     "max_items", "max_pages", "follow", "sitemap", "wait_for")
+
+# Sort key of sitemap URLs without a lastmod
+OLDEST = datetime.min.replace(tzinfo=timezone.utc)
+
+class NotModified(Exception):
+    """Raised when a conditional GET tells us the source has not changed"""
 
 class WebCrawler:
-    def __init__(self, database):
+    def __init__(self, database, rate_limiter: Optional[HostRateLimiter] = None,
+                 browser_pool: Optional[BrowserPool] = None, robots_cache: Optional[RobotsCache] = None,
+                 response_cache: Optional[ResponseCache] = None, snapshot_store: Optional[SnapshotStore] = None,
+                 warc_writer: Optional[WarcWriter] = None, circuit_breaker: Optional[CircuitBreaker] = None,
+                 near_duplicates: Optional[NearDuplicateIndex] = None, writer: Optional[BufferedWriter] = None,
+                 spool: Optional[DiskSpool] = None):
         """Initialize crawler with database connection"""
         self.db = database
+        self.rate_limiter = rate_limiter or default_limiter
+        # Hosts that keep failing are skipped until a probe succeeds
+        self.breaker = circuit_breaker or default_breaker
+        # robots.txt rules per origin, cached in memory and in Mongo
+        self.robots = robots_cache or RobotsCache(database)
+        # Same story from several sources: later copies are linked to (or dropped for) the first
+        self.near_duplicates = near_duplicates or NearDuplicateIndex(database)
+        # Crawl results MongoDB could not take, kept on disk and replayed once it is back
+        self.spool = spool or (get_default_spool() if SPOOL_ENABLED and database is not None else None)
+        if self.spool is not None:
+            start_replayer(database, self.spool)
+        # Write-behind storage batching the results of concurrent crawls (None: store synchronously)
+        self.writer = writer or (get_writer(database, self.spool) if WRITE_BEHIND and database is not None else None)
+        # On-disk response cache for record/replay (opened on first use)
+        self._response_cache = response_cache
+        # Compressed raw bodies behind extracted items (opened on first use)
+        self._snapshot_store = snapshot_store
+        # Warm headless browsers borrowed by dynamic crawls
+        self.browser_pool = browser_pool or default_browser_pool
+        # Per-thread crawl state (current log) so concurrent crawls keep separate metrics
+        self._context = threading.local()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
+        
+        # Large enough pools so concurrent crawls reuse connections instead of discarding them
+        adapter = HTTPAdapter(pool_connections=CONNECTION_POOL_SIZE, pool_maxsize=CONNECTION_POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Exact request/response bytes of every fetch, archived as WARC by a background thread
+        self.warc = warc_writer or (get_default_writer() if WARC_ENABLED else None)
+        if self.warc is not None:
+            self.session.hooks["response"].append(self.warc.capture)
+    
+    # ==================== CONCURRENT CRAWLING ====================
+    
+    def crawl_many(self, sources: List[Dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict[str, Any]]:
+        """Crawl several sources concurrently and return their logs in input order"""
+        return asyncio.run(self.crawl_many_async(sources, concurrency=concurrency))
+    
+    async def crawl_many_async(self, sources: List[Dict[str, Any]], concurrency: int = DEFAULT_CONCURRENCY) -> List[Dict[str, Any]]:
+        """
+        Crawl several sources concurrently from a running event loop
+        
+        Each source goes through crawl_source on a worker thread, so network
+        waits overlap while the existing _crawl_* parsing and crawl_logs
+        entries stay exactly the same as for a single crawl.
+        
+        Args:
+            sources: Source documents to crawl
+            concurrency: Maximum number of sources crawled at the same time
+        
+        Returns:
+            Crawl logs, one per source, in the same order as sources
+        """
+        if not sources:
+            return []
+        
+        concurrency = max(1, min(int(concurrency), len(sources)))
+        loop = asyncio.get_running_loop()
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="crawler") as executor:
+            tasks = [loop.run_in_executor(executor, self.crawl_source, source) for source in sources]
+            return list(await asyncio.gather(*tasks))
     
     def crawl_source(self, source: Dict[str, Any]) -> Dict[str, Any]:
         """Crawl a single source based on its type"""
@@ -32,8 +156,12 @@ class WebCrawler:
             "url": url,
             "status": "started",
             "items_collected": 0,
-            "errors": []
+            "errors": [],
+            "metrics": {"queue_wait": 0.0}
         }
+        self._context.log = log
+        self._context.pending_state = {}
+        items = []
         
         try:
             # Validate URL
@@ -54,56 +182,636 @@ class WebCrawler:
                 data = self._crawl_txt(source)
             elif source_type == "dynamic":
                 data = self._crawl_dynamic(source)
+            elif source_type == "sitemap":
+                data = self._crawl_sitemap(source)
             else:
                 raise ValueError(f"Unsupported source type: {source_type}")
             
-            # Store data
+            # Store data (upserted by fingerprint, so unchanged items are not stored twice)
             if data:
-                if isinstance(data, list):
-                    if self.db.crawled_data is not None:
-                        self.db.bulk_store_data(data)
-                        log["items_collected"] = len(data)
-                        print(f"✅ Collected {len(data)} items")
+                items = data if isinstance(data, list) else [data]
+                if self.db.crawled_data is not None:
+                    items, duplicates = self.near_duplicates.process(items, near_duplicate_mode(source))
+                    for outcome, count in duplicates.items():
+                        if count:
+                            log["metrics"][f"near_duplicates_{outcome}"] = count
+                    log["items_collected"] = len(items)
+                    if self.writer is not None:
+                        # Stored by the writer thread, batched with other crawls
+                        print(f"✅ Collected {len(items)} item{'s' if len(items) != 1 else ''} (queued for storage)")
                     else:
-                        log["status"] = "error"
-                        log["errors"].append("Database not connected")
+                        stored = self.db.bulk_store_data(items)
+                        for outcome in ("inserted", "updated", "unchanged"):
+                            log["metrics"][f"items_{outcome}"] = stored.get(outcome, 0)
+                        print(f"✅ Collected {len(items)} item{'s' if len(items) != 1 else ''} "
+                              f"({stored.get('inserted', 0)} new, {stored.get('updated', 0)} updated, "
+                              f"{stored.get('unchanged', 0)} unchanged)")
+                        if stored.get("failed"):
+                            log["status"] = "spooled" if self.spool is not None else "error"
+                            log["errors"].append(f"Could not store {stored['failed']} items")
+                elif self.spool is not None:
+                    # Fetched content is kept on disk instead of being fetched again later
+                    log["items_collected"] = len(items)
+                    log["status"] = "spooled"
+                    log["errors"].append("Database not connected, items spooled for replay")
                 else:
-                    if self.db.crawled_data is not None:
-                        self.db.store_crawled_data(data)
-                        log["items_collected"] = 1
-                        print(f"✅ Collected 1 item")
-                    else:
-                        log["status"] = "error"
-                        log["errors"].append("Database not connected")
+                    log["status"] = "error"
+                    log["errors"].append("Database not connected")
                 
-                if log["status"] != "error":
+                if log["status"] not in ("error", "spooled"):
                     log["status"] = "success"
             else:
                 log["status"] = "no_data"
                 log["errors"].append("No data extracted from source")
                 print(f"⚠️ No data found")
         
+        except NotModified:
+            log["status"] = "not_modified"
+            print(f"⏭️ Not modified since last crawl")
+        
+        except RobotsDisallowed as e:
+            log["status"] = "disallowed"
+            log["errors"].append(str(e))
+            print(f"🚫 {e}")
+        
+        except CircuitOpen as e:
+            log["status"] = "circuit_open"
+            log["errors"].append(str(e))
+            print(f"⛔ {e}")
+        
         except Exception as e:
             log["status"] = "error"
             log["errors"].append(str(e))
             print(f"❌ Error: {e}")
         
+        pending_state = self._context.pending_state if log["status"] in ("success", "spooled") else {}
+        if log["status"] == "no_data":
+            # Keep sitemap progress, but not validators: the next crawl must fetch the unextracted pages again
+            for state_url, state in self._context.pending_state.items():
+                sitemap_state = {key: value for key, value in state.items() if key.startswith("sitemap_")}
+                if sitemap_state:
+                    pending_state[state_url] = sitemap_state
+        self._context.log = None
+        self._context.pending_state = {}
+        log["metrics"] = {name: round(value, 3) if isinstance(value, float) else value
+                          for name, value in log["metrics"].items()}
+        
+        # Items, fetch state and log are replayed together once MongoDB is back
+        if log["status"] == "spooled":
+            self.spool.spool_crawl(items, pending_state, log, near_duplicate_mode(source))
+            return log
+        
+        if log["status"] != "success":
+            items = []
+        
+        # Items, fetch state and log are written later by the writer thread, in that order
+        if self.writer is not None:
+            try:
+                self.writer.submit(items, log if self.db.crawl_logs is not None else None, pending_state)
+                return log
+            except WriterClosed:
+                # Shutting down: store this crawl directly
+                stored = self.db.bulk_store_data(items) if items else {}
+                if stored.get("failed"):
+                    log["errors"].append(f"Could not store {stored['failed']} items")
+                    if self.spool is not None:
+                        log["status"] = "spooled"
+                        self.spool.spool_crawl(items, pending_state, log, near_duplicate_mode(source))
+                        return log
+                    # Lost content must be fetched again: keep the old validators
+                    log["status"] = "error"
+                    pending_state = {}
+        
+        # Only remember validators (and other fetch state) once the new content is safely stored
+        for state_url, state in pending_state.items():
+            self.db.update_source_state(state_url, state)
+        
         # Log the crawl
-        if self.db.crawl_logs is not None:
-            self.db.log_crawl(log)
+        logged = self.db.crawl_logs is not None and self.db.log_crawl(log)
+        if not logged and self.spool is not None:
+            self.spool.spool_crawl([], log=log)
         
         return log
     
+    # ==================== FETCHING ====================
+    
+    def _add_warning(self, message: str):
+        """Record a non-fatal problem in the crawl running on this thread"""
+        log = getattr(self._context, "log", None)
+        if log is not None:
+            log.setdefault("warnings", []).append(message)
+        print(f"⚠️ {message}")
+    
+    def _add_metric(self, name: str, amount: float = 1):
+        """Add to a metric of the crawl running on this thread"""
+        log = getattr(self._context, "log", None)
+        if log is not None:
+            log["metrics"][name] = log["metrics"].get(name, 0) + amount
+    
+    def _add_timing(self, name: str, start: float) -> float:
+        """Add the time elapsed since start to a metric and return the current time"""
+        now = time.monotonic()
+        self._add_metric(name, now - start)
+        return now
+    
+    @contextmanager
+    def _host_slot(self, url: str, source: Dict[str, Any]):
+        """Check robots.txt, then wait for the per-host rate limiter before touching the network"""
+        rate_limit = self._robots_gate(url, source)
+        with self.rate_limiter.limit(url, rate_limit) as waited:
+            self._add_metric("queue_wait", waited)
+            yield
+    
+    def _robots_gate(self, url: str, source: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Apply robots.txt to a URL about to be fetched
+        
+        Raises RobotsDisallowed for disallowed URLs, slows the host down to
+        the site's Crawl-delay when it has one, and returns the source's
+        rate_limit.
+        """
+        rate_limit = source.get("rate_limit")
+        if not source.get("respect_robots", RESPECT_ROBOTS):
+            return rate_limit
+        
+        try:
+            rules = self._robots_rules(url)
+        except requests.RequestException as e:
+            self._add_warning(f"robots.txt not checked: {e}")
+            return rate_limit
+        
+        if not rules.allows(url):
+            self._add_metric("robots_disallowed")
+            raise RobotsDisallowed(f"Disallowed by robots.txt: {url}")
+        
+        # Crawl-delay applies to the whole host, whichever source fetches from it
+        delay = rules.crawl_delay
+        if delay:
+            self.rate_limiter.configure_host(urlparse(url).netloc.lower(),
+                                             requests_per_second=min(self.rate_limiter.requests_per_second, 1.0 / delay),
+                                             burst=1)
+        return rate_limit
+    
+    def _robots_rules(self, url: str):
+        """Cached robots.txt rules of a URL's site"""
+        rules, hit = self.robots.get(url, self._fetch_robots)
+        self._add_metric("robots_cache_hits" if hit else "robots_cache_misses")
+        return rules
+    
+    def _fetch_robots(self, robots_url: str) -> tuple:
+        """Download a robots.txt (paced like any request, but not checked against itself)"""
+        self.breaker.before(robots_url)
+        try:
+            with self.rate_limiter.limit(robots_url):
+                response = self.session.get(robots_url, timeout=REQUEST_TIMEOUT)
+        except RETRYABLE_EXCEPTIONS:
+            self.breaker.record_failure(robots_url)
+            raise
+        self.breaker.record_success(robots_url)
+        return response.status_code, response.text
+    
+    def _fetch(self, url: str, source: Dict[str, Any], conditional: bool = False, **kwargs) -> requests.Response:
+        """
+        Fetch a URL through the shared session, paced per host
+        
+        Args:
+            url: URL to fetch
+            source: Source document the fetch belongs to
+            conditional: Send the saved ETag/Last-Modified and raise
+                NotModified when the server answers 304
+            **kwargs: Extra arguments for requests.Session.get
+        """
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        stream = kwargs.get("stream", False)
+        cache_mode = self._cache_mode(source)
+        
+        # Replay never touches the network (no robots.txt, no rate limiting)
+        if cache_mode == "replay":
+            response = self.response_cache.replay(url, stream=stream)
+            self._add_metric("cache_hits")
+            return response
+        
+        if conditional:
+            headers = dict(kwargs.pop("headers", None) or {})
+            headers.update(self._conditional_headers(url, source))
+            kwargs["headers"] = headers
+        
+        response = self._get_with_retries(url, source, **kwargs)
+        
+        if conditional:
+            if response.status_code == 304:
+                raise NotModified(url)
+            self._remember_validators(url, source, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        
+        if cache_mode == "record":
+            response = self.response_cache.record(url, response, stream=stream)
+            self._add_metric("cache_writes")
+        
+        return response
+    
+    def _get_with_retries(self, url: str, source: Dict[str, Any], **kwargs) -> requests.Response:
+        """
+        GET a URL, retrying connection errors and 429/5xx answers with jittered backoff
+        
+        Every attempt goes through the host's circuit breaker and rate
+        limiter. When the retries run out the last error is raised, or the
+        last response returned for the caller's raise_for_status.
+        """
+        settings = retry_settings(source)
+        attempt = 0
+        while True:
+            self.breaker.before(url)
+            retry_after = None
+            try:
+                with self._host_slot(url, source):
+                    response = self.session.get(url, **kwargs)
+            except RETRYABLE_EXCEPTIONS:
+                self.breaker.record_failure(url)
+                if attempt >= settings["attempts"]:
+                    raise
+            else:
+                # A 429 means the host is up but wants us to slow down
+                if response.status_code >= 500:
+                    self.breaker.record_failure(url)
+                elif response.status_code != 429:
+                    self.breaker.record_success(url)
+                if response.status_code not in RETRYABLE_STATUSES or attempt >= settings["attempts"]:
+                    return response
+                retry_after = response.headers.get("Retry-After")
+                response.close()
+            
+            delay = backoff_delay(attempt, settings["backoff"], settings["max_backoff"], retry_after)
+            self._add_metric("retries")
+            self._add_metric("retry_wait", delay)
+            time.sleep(delay)
+            attempt += 1
+    
+    @property
+    def response_cache(self) -> ResponseCache:
+        if self._response_cache is None:
+            self._response_cache = get_default_cache()
+        return self._response_cache
+    
+    @property
+    def snapshot_store(self) -> SnapshotStore:
+        if self._snapshot_store is None:
+            self._snapshot_store = get_default_store()
+        return self._snapshot_store
+    
+    def _cache_mode(self, source: Dict[str, Any]) -> str:
+        """Response cache mode of a source: off, record or replay"""
+        return source.get("response_cache", RESPONSE_CACHE_MODE)
+    
+    def _conditional_headers(self, url: str, source: Dict[str, Any]) -> Dict[str, str]:
+        """Build If-None-Match / If-Modified-Since headers from the saved state"""
+        if not source.get("conditional_get", True):
+            return {}
+        
+        state = self.db.get_source_state(url)
+        # Validators saved under another extraction config would hide the page from the new one
+        if state.get("config_hash") != self._config_hash(source):
+            return {}
+        
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+    
+    def _config_hash(self, source: Dict[str, Any]) -> str:
+        """Hash of the source fields that decide what is extracted"""
+        return selectors_hash({field: source.get(field) for field in EXTRACTION_FIELDS})
+    
+    def _remember_validators(self, url: str, source: Dict[str, Any], etag: Optional[str],
+                             last_modified: Optional[str]):
+        """Keep a response's validators, with the config they were fetched under, until the crawl has stored its data"""
+        if etag or last_modified:
+            self._remember_state(url, {"etag": etag, "last_modified": last_modified,
+                                       "config_hash": self._config_hash(source)})
+    
+    def _remember_state(self, url: str, state: Dict[str, Any]):
+        """Queue fetch state for a URL, saved only if the crawl succeeds"""
+        self._context.pending_state.setdefault(url, {}).update(state)
+    
+    # ==================== SNAPSHOTS ====================
+    
+    def _snapshot(self, source: Dict[str, Any], url: str, kind: str, response: requests.Response,
+                  items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep the raw body the items were extracted from and tag them with its hash
+        
+        A failure to store the snapshot only costs a warning, never the crawl.
+        """
+        if not items or not source.get("snapshot", SNAPSHOTS_ENABLED):
+            return items
+        
+        try:
+            saved = self.snapshot_store.put(response.content)
+            self.db.save_snapshot({
+                "source_id": source.get("_id"),
+                "url": url,
+                "hash": saved["hash"],
+                "type": kind,
+                "encoding": response.encoding,
+                "size": saved["size"],
+                # Crawler class whose _extract_html produced the items (used again when re-extracting)
+                "extractor": f"{type(self).__module__}.{type(self).__name__}",
+                "fetched_at": datetime.now()
+            })
+        except Exception as e:
+            self._add_warning(f"Snapshot not stored: {e}")
+            return items
+        
+        self._add_metric("snapshots_stored" if saved["stored"] else "snapshots_deduplicated")
+        for item in items:
+            item["snapshot"] = saved["hash"]
+        return items
+    
+    def extract_snapshot(self, source: Dict[str, Any], snapshot: Dict[str, Any], body: bytes) -> List[Dict[str, Any]]:
+        """Run the extraction of a crawl again over a stored snapshot body"""
+        if snapshot["type"] == "xml":
+            items = self._extract_xml(source, snapshot["url"], body)
+        else:
+            # Decode exactly like response.text did during the crawl
+            response = requests.Response()
+            response._content = body
+            response.encoding = snapshot.get("encoding")
+            items = self._extract_html(source, snapshot["url"], response.text, resolve_parser(source.get("parser")))
+        
+        for item in items:
+            item["snapshot"] = snapshot["hash"]
+        return items
+    
+    # ==================== CONTENT TYPES ====================
+    
     def _crawl_html(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Crawl HTML pages"""
         url = source.get("url")
-        selectors = source.get("selectors", {})
-        max_items = source.get("max_items", 50)
         
-        response = self.session.get(url, timeout=30)
+        if source.get("follow"):
+            return self._crawl_frontier(source)
+        
+        response = self._fetch(url, source, conditional=True)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, 'html.parser')
+        parser = resolve_parser(source.get("parser"))
+        items = self._extract_html(source, url, response.text, parser)
+        
+        if source.get("parser_check", PARSER_CHECK):
+            self._check_parser(source, url, response.text, parser, items)
+        
+        return self._snapshot(source, url, "html", response, items)
+    
+    def _crawl_frontier(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Crawl an HTML source by following its links
+        
+        Pages are taken from a priority frontier (shallowest first) until
+        follow.max_pages pages were fetched; each page goes through the
+        same _extract_html extraction as a single-page source. Links are
+        queued when they pass follow.allow / follow.deny and stay on the
+        seed's host (unless follow.same_host is false).
+        """
+        follow = source["follow"]
+        # "follow": true follows links with the default settings
+        if follow is True:
+            follow = {}
+        elif not isinstance(follow, dict):
+            raise ValueError(f"follow must be true or a document, not {follow!r}")
+        seed = normalize_url(source.get("url"))
+        max_depth = int(follow.get("max_depth", DEFAULT_MAX_DEPTH))
+        max_pages = int(follow.get("max_pages", FOLLOW_MAX_PAGES))
+        parser = resolve_parser(source.get("parser"))
+        
+        frontier = Frontier(LinkRules(seed, follow), max_depth=max_depth,
+                            max_queued=int(follow.get("max_queued", max_pages * QUEUE_FACTOR)))
+        frontier.seed(seed)
+        
+        items = []
+        pages = 0
+        while frontier and pages < max_pages:
+            url, depth = frontier.pop()
+            pages += 1
+            
+            try:
+                response = self._fetch(url, source)
+                response.raise_for_status()
+            except RobotsDisallowed:
+                if depth == 0:
+                    raise
+                continue
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                if depth == 0:
+                    raise
+                self._add_metric("pages_failed")
+                self._add_warning(f"{url}: {e}")
+                continue
+            
+            if "html" not in response.headers.get("Content-Type", "text/html"):
+                self._add_metric("pages_skipped")
+                continue
+            
+            markup = response.text
+            page_items = self._extract_html(source, response.url, markup, parser)
+            items.extend(self._snapshot(source, response.url, "html", response, page_items))
+            
+            if depth < max_depth:
+                for link in extract_links(markup, response.url, parser):
+                    frontier.push(link, depth + 1)
+        
+        self._add_metric("pages_crawled", pages)
+        self._add_metric("urls_seen", len(frontier.seen))
+        self._add_metric("urls_pending", len(frontier))
+        if frontier.dropped:
+            self._add_metric("urls_dropped", frontier.dropped)
+        return items
+    
+    def _crawl_sitemap(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Crawl the pages of a site's sitemaps that changed since the last run
+        
+        Only URLs whose <lastmod> is newer than the newest lastmod handled
+        by the previous successful run are fetched (oldest first, at most
+        sitemap.max_pages per run), then extracted with the source's
+        selectors like an html source. Undated URLs come first, in URL
+        order, resuming after the last one handled; they are only crawled
+        in one pass unless sitemap.include_undated is set. A page that
+        fails keeps the next run from moving past it, for at most
+        MAX_PAGE_ATTEMPTS runs.
+        """
+        url = source.get("url")
+        settings = source.get("sitemap", {})
+        max_pages = int(settings.get("max_pages", FOLLOW_MAX_PAGES))
+        allow = [re.compile(pattern) for pattern in settings.get("allow", [])]
+        deny = [re.compile(pattern) for pattern in settings.get("deny", [])]
+        parser = resolve_parser(source.get("parser"))
+        
+        state = self.db.get_source_state(url)
+        since = parse_lastmod(state.get("sitemap_lastmod"))
+        cursor = state.get("sitemap_undated_cursor")
+        include_undated = settings.get("include_undated",
+                                       since is None and not state.get("sitemap_undated_done"))
+        attempts = {page_url: count for page_url, count in state.get("sitemap_failed", [])}
+        
+        seen = SeenSet()
+        counts = {"urls": 0, "changed": 0}
+        
+        def changed_pages():
+            for page_url, lastmod in self._sitemap_entries(source, url, since):
+                counts["urls"] += 1
+                page_url = normalize_url(page_url)
+                if not page_url or not seen.add(page_url):
+                    continue
+                if any(pattern.search(page_url) for pattern in deny):
+                    continue
+                if allow and not any(pattern.search(page_url) for pattern in allow):
+                    continue
+                if lastmod is None and (not include_undated or (cursor and page_url <= cursor)):
+                    continue
+                if lastmod is not None and since is not None and lastmod <= since:
+                    continue
+                counts["changed"] += 1
+                yield lastmod or OLDEST, page_url
+        
+        # Oldest changes first, keeping only one page beyond the budget in memory
+        candidates = heapq.nsmallest(max_pages + 1, changed_pages())
+        self._add_metric("sitemap_urls", counts["urls"])
+        self._add_metric("pages_changed", counts["changed"])
+        if not candidates:
+            raise NotModified(url)
+        
+        batch = candidates[:max_pages]
+        items = []
+        failed = []
+        for lastmod, page_url in batch:
+            try:
+                response = self._fetch(page_url, source)
+                response.raise_for_status()
+            except RobotsDisallowed:
+                continue
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                self._add_metric("pages_failed")
+                count = attempts.get(page_url, 0) + 1
+                if count < MAX_PAGE_ATTEMPTS:
+                    failed.append((lastmod, page_url, count))
+                    self._add_warning(f"{page_url}: {e}")
+                else:
+                    self._add_warning(f"{page_url}: {e} (giving up after {count} runs)")
+                continue
+            
+            if "html" not in response.headers.get("Content-Type", "text/html"):
+                self._add_metric("pages_skipped")
+                continue
+            page_items = self._extract_html(source, response.url, response.text, parser)
+            items.extend(self._snapshot(source, response.url, "html", response, page_items))
+        self._add_metric("pages_crawled", len(batch))
+        
+        next_page = candidates[max_pages] if len(candidates) > max_pages else None
+        new_state = {"sitemap_failed": [[page_url, count] for _, page_url, count in failed]}
+        
+        # Dated pages: next run resumes right before the first page left out by the budget,
+        # or right before the first page that failed
+        dated = [lastmod for lastmod, _ in batch if lastmod != OLDEST]
+        if next_page is not None:
+            watermark = next_page[0] - timedelta(microseconds=1) if next_page[0] != OLDEST else since
+        else:
+            watermark = max(dated, default=since)
+        retried = [lastmod for lastmod, _, _ in failed if lastmod != OLDEST]
+        if retried:
+            watermark = min(watermark, min(retried) - timedelta(microseconds=1))
+        if watermark not in (None, OLDEST) and (since is None or watermark > since):
+            new_state["sitemap_lastmod"] = watermark.isoformat()
+        
+        # Undated pages: next run resumes after the last one handled before any failure
+        undated = [page_url for lastmod, page_url in batch if lastmod == OLDEST]
+        if undated:
+            retried = [page_url for lastmod, page_url, _ in failed if lastmod == OLDEST]
+            handled = [page_url for page_url in undated if not retried or page_url < retried[0]]
+            if retried or (next_page is not None and next_page[0] == OLDEST):
+                new_state["sitemap_undated_cursor"] = handled[-1] if handled else cursor
+            else:
+                # Pass complete: start over next time if undated pages are always included
+                new_state["sitemap_undated_cursor"] = None
+                new_state["sitemap_undated_done"] = True
+        
+        self._remember_state(url, new_state)
+        return items
+    
+    def _sitemap_entries(self, source: Dict[str, Any], url: str, since: Optional[datetime]):
+        """
+        Stream (page URL, lastmod) pairs from every sitemap of a source
+        
+        The source URL is either a sitemap itself or a site whose
+        robots.txt lists its sitemaps (default: /sitemap.xml). Child
+        sitemaps of an index whose lastmod is not newer than since are
+        skipped without being downloaded.
+        """
+        if is_sitemap_url(url):
+            pending = [url]
+        else:
+            pending = []
+            try:
+                pending = [urljoin(url, sitemap_url) for sitemap_url in self._robots_rules(url).sitemaps]
+            except requests.RequestException as e:
+                self._add_warning(f"robots.txt: {e}")
+            pending = pending or [urljoin(url, "/sitemap.xml")]
+        
+        pending = [(sitemap_url, 0) for sitemap_url in pending]
+        visited = set()
+        while pending:
+            sitemap_url, depth = pending.pop(0)
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            
+            try:
+                response = self._fetch(sitemap_url, source, stream=True)
+                response.raise_for_status()
+                self._add_metric("sitemaps_fetched")
+                
+                try:
+                    for kind, loc, lastmod in iter_sitemap(ResponseStream(response)):
+                        if kind == "url":
+                            yield loc, lastmod
+                        elif depth < MAX_INDEX_DEPTH:
+                            if since is not None and lastmod is not None and lastmod <= since:
+                                self._add_metric("sitemaps_unchanged")
+                            else:
+                                pending.append((urljoin(sitemap_url, loc), depth + 1))
+                finally:
+                    response.close()
+            except Exception as e:
+                if depth == 0 and not pending and len(visited) == 1:
+                    raise
+                self._add_metric("sitemaps_failed")
+                self._add_warning(f"Sitemap {sitemap_url}: {e}")
+    
+    def _check_parser(self, source: Dict[str, Any], url: str, markup: str, parser: str,
+                      items: List[Dict[str, Any]]):
+        """Warn when the selected backend extracts something different from the reference parser"""
+        if parser == REFERENCE_PARSER:
+            return
+        
+        difference = diff_extractions(self._extract_html(source, url, markup, REFERENCE_PARSER), items)
+        if difference:
+            self._add_metric("parser_mismatches")
+            self._add_warning(f"Parser '{parser}' differs from '{REFERENCE_PARSER}': {difference}")
+    
+    def _compiled_selectors(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Compiled CSS selectors for a source, cached across containers and runs"""
+        return selector_cache.get(source.get("_id"), source.get("selectors", {}))
+    
+    def _extract_html(self, source: Dict[str, Any], url: str, markup: str,
+                      parser: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Extract items from an HTML document using the source's selectors"""
+        selectors = source.get("selectors", {})
+        max_items = source.get("max_items", 50)
+        compiled = self._compiled_selectors(source)
         
         # Extract data based on selectors
         items = []
@@ -111,7 +819,10 @@ class WebCrawler:
         # If container selector is provided
         container_selector = selectors.get("container")
         if container_selector:
-            containers = soup.select(container_selector)[:max_items]
+            # Only the container subtrees are parsed, and selection stops at max_items
+            containers = select_containers(markup, container_selector, max_items, parser,
+                                           partial=source.get("partial_parse", True),
+                                           compiled=compiled["container"])
             
             if not containers:
                 print(f"⚠️ No elements found with selector: {container_selector}")
@@ -129,7 +840,7 @@ class WebCrawler:
                 # Extract fields
                 for field, selector in selectors.items():
                     if field != "container":
-                        elem = container.select_one(selector)
+                        elem = compiled[field].select_one(container)
                         if elem:
                             item["data"][field] = elem.get_text(strip=True)
                             # Set title if title field exists
@@ -148,6 +859,7 @@ class WebCrawler:
                     items.append(item)
         else:
             # Extract entire page content
+            soup = make_soup(markup, parser)
             item = {
                 "source_id": source.get("_id"),
                 "source_url": url,
@@ -164,54 +876,107 @@ class WebCrawler:
         url = source.get("url")
         selectors = source.get("selectors", {})
         max_items = source.get("max_items", 50)
-        wait_time = source.get("wait_time", 5)
+        compiled = self._compiled_selectors(source)
         
-        driver = Driver(uc=True, headless=True)
+        html = self._render(source)
+        phase_start = time.monotonic()
         
-        try:
-            driver.get(url)
-            time.sleep(wait_time)
+        items = []
+        container_selector = selectors.get("container")
+        
+        if container_selector:
+            containers = select_containers(html, container_selector, max_items, source.get("parser"),
+                                           partial=source.get("partial_parse", True),
+                                           compiled=compiled["container"])
             
-            html = driver.page_source
-            soup = BeautifulSoup(html, 'html.parser')
+            for container in containers:
+                item = {
+                    "source_id": source.get("_id"),
+                    "source_url": url,
+                    "type": "dynamic",
+                    "data": {}
+                }
+                
+                for field, selector in selectors.items():
+                    if field != "container":
+                        elem = compiled[field].select_one(container)
+                        if elem:
+                            item["data"][field] = elem.get_text(strip=True)
+                
+                if item["data"]:
+                    items.append(item)
+        
+        self._add_timing("extract_time", phase_start)
+        return items
+    
+    def _render(self, source: Dict[str, Any]) -> str:
+        """Rendered HTML of a dynamic source, from a pooled browser or the response cache"""
+        url = source.get("url")
+        cache_key = RENDER_CACHE_PREFIX + url
+        cache_mode = self._cache_mode(source)
+        
+        if cache_mode == "replay":
+            html = self.response_cache.read(cache_key).decode("utf-8")
+            self._add_metric("cache_hits")
+            return html
+        
+        readiness = readiness_settings(source)
+        phase_start = time.monotonic()
+        with self.browser_pool.borrow() as driver:
+            phase_start = self._add_timing("browser_wait", phase_start)
             
-            items = []
-            container_selector = selectors.get("container")
+            # Skip images, fonts, media and trackers: only the DOM is read
+            try:
+                apply_blocking(driver, blocked_patterns(source))
+            except Exception as e:
+                self._add_warning(f"Request blocking unavailable: {e}")
             
-            if container_selector:
-                containers = soup.select(container_selector)[:max_items]
-                
-                for container in containers:
-                    item = {
-                        "source_id": source.get("_id"),
-                        "source_url": url,
-                        "type": "dynamic",
-                        "data": {}
-                    }
-                    
-                    for field, selector in selectors.items():
-                        if field != "container":
-                            elem = container.select_one(selector)
-                            if elem:
-                                item["data"][field] = elem.get_text(strip=True)
-                    
-                    if item["data"]:
-                        items.append(item)
+            with self._host_slot(url, source):
+                driver.get(url)
+            phase_start = self._add_timing("navigate_time", phase_start)
             
-            return items
+            # Poll for the content instead of sleeping a fixed time
+            ready = wait_until_ready(driver, **readiness)
+            self._add_timing("ready_wait", phase_start)
+            if not ready["ready"]:
+                self._add_metric("ready_timeouts")
+                self._add_warning(f"Page not ready after {readiness['timeout']:.0f}s "
+                                  f"({ready['matched']} of {readiness['min_count']} containers)")
+            
+            html = driver.page_source
+            
+            requests_made = count_requests(driver)
+            self._add_metric("requests_blocked", requests_made["blocked"])
+            self._add_metric("requests_allowed", requests_made["allowed"])
         
-        finally:
-            driver.quit()
+        if cache_mode == "record":
+            self.response_cache.store_bytes(cache_key, url, 200, {"Content-Type": "text/html; charset=utf-8"},
+                                            html.encode("utf-8"))
+            self._add_metric("cache_writes")
+        return html
+    
+    def _fetch_feed(self, url: str, source: Dict[str, Any], max_items: int) -> List[Dict[str, Any]]:
+        """Download a feed through the pooled session and parse at most max_items entries"""
+        response = self._fetch(url, source, conditional=True, headers={"Accept": FEED_ACCEPT})
+        response.raise_for_status()
+        
+        # The response URL and Content-Type let relative links and encodings resolve
+        feed = parse_feed(response.content, max_items=max_items, base_url=response.url,
+                          content_type=response.headers.get("Content-Type", ""),
+                          fast=source.get("fast_feed_parser", True))
+        if feed["parser"] != "fast":
+            self._add_metric("feed_parser_fallbacks")
+        return feed["entries"]
     
     def _crawl_rss(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Crawl RSS feeds"""
         url = source.get("url")
         max_items = source.get("max_items", 50)
         
-        feed = feedparser.parse(url)
+        entries = self._fetch_feed(url, source, max_items)
         
         items = []
-        for entry in feed.entries[:max_items]:
+        for entry in entries:
             item = {
                 "source_id": source.get("_id"),
                 "source_url": url,
@@ -228,16 +993,21 @@ class WebCrawler:
     def _crawl_pdf(self, source: Dict[str, Any]) -> Dict[str, Any]:
         """Crawl PDF documents"""
         url = source.get("url")
+        max_bytes = source.get("max_bytes", DEFAULT_MAX_BYTES)
+        max_pages = source.get("max_pages", DEFAULT_MAX_PAGES)
         
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-        
-        pdf_file = io.BytesIO(response.content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        # Stream to a size-capped temp file instead of buffering the whole body
+        response = self._fetch(url, source, conditional=True, stream=True)
+        try:
+            response.raise_for_status()
+            pdf_path = download_to_tempfile(response, max_bytes)
+        finally:
+            response.close()
         
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
+        try:
+            text, total_pages, extracted_pages = extract_pdf_text(pdf_path, max_pages)
+        finally:
+            os.remove(pdf_path)
         
         item = {
             "source_id": source.get("_id"),
@@ -245,19 +1015,37 @@ class WebCrawler:
             "type": "pdf",
             "title": source.get("name", "PDF Document"),
             "content": text,
-            "pages": len(pdf_reader.pages)
+            "pages": total_pages
         }
         
+        if extracted_pages < total_pages:
+            item["pages_extracted"] = extracted_pages
+        
         return item
     
     def _crawl_xml(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Crawl XML documents"""
         url = source.get("url")
         
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
+        response = self._fetch(url, source, conditional=True, stream=True)
+        try:
+            response.raise_for_status()
+            
+            # Large documents (or sources that ask for it) are parsed while they download
+            declared = response.headers.get("Content-Length", "")
+            large = declared.isdigit() and int(declared) > XML_STREAMING_THRESHOLD
+            if source.get("streaming", large):
+                return self._crawl_xml_streaming(source, response)
+            
+            content = response.content
+        finally:
+            response.close()
         
-        soup = BeautifulSoup(response.content, 'xml')
+        return self._snapshot(source, url, "xml", response, self._extract_xml(source, url, content))
+    
+    def _extract_xml(self, source: Dict[str, Any], url: str, content: bytes) -> List[Dict[str, Any]]:
+        """Extract one item per item/entry/record element of an XML document"""
+        soup = BeautifulSoup(content, 'xml')
         
         items = []
         # Extract all items (customize based on XML structure)
@@ -277,11 +1065,35 @@ class WebCrawler:
             "content": soup.get_text(strip=True)
         }]
     
+    def _crawl_xml_streaming(self, source: Dict[str, Any], response: requests.Response) -> List[Dict[str, Any]]:
+        """
+        Parse an XML response incrementally, one item per record element
+        
+        Memory stays bounded by the size of a single record, and parsing
+        stops as soon as max_items records have been read. Unlike the
+        in-memory path there is no whole-document fallback item.
+        """
+        url = source.get("url")
+        max_items = source.get("max_items", 50)
+        tags = source.get("record_tags", DEFAULT_RECORD_TAGS)
+        
+        items = []
+        for record in iter_records(ResponseStream(response), tags=tags, max_items=max_items):
+            items.append({
+                "source_id": source.get("_id"),
+                "source_url": url,
+                "type": "xml",
+                "content": record["content"]
+            })
+        
+        print(f"   Streamed {len(items)} XML records (max_items={max_items})")
+        return items
+    
     def _crawl_txt(self, source: Dict[str, Any]) -> Dict[str, Any]:
         """Crawl plain text files"""
         url = source.get("url")
         
-        response = self.session.get(url, timeout=30)
+        response = self._fetch(url, source, conditional=True)
         response.raise_for_status()
         
         item = {
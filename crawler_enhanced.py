@@ -3,32 +3,30 @@ Enhanced Web Crawler with Image Support
 Adds image URL extraction to the base crawler
 """
 from crawler import WebCrawler
-from bs4 import BeautifulSoup
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
+from html_parsers import make_soup, select_containers
 from urllib.parse import urljoin
 
 class EnhancedWebCrawler(WebCrawler):
     """Enhanced crawler with better image handling"""
     
-    def _crawl_html(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Crawl HTML pages with image extraction"""
-        url = source.get("url")
+    def _extract_html(self, source: Dict[str, Any], url: str, markup: str,
+                      parser: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Extract items from an HTML document, including images"""
         selectors = source.get("selectors", {})
         max_items = source.get("max_items", 50)
-        
-        response = self.session.get(url, timeout=30)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
+        compiled = self._compiled_selectors(source)
         
         items = []
         container_selector = selectors.get("container")
         
         if container_selector:
-            all_containers = soup.select(container_selector)
-            containers = all_containers[:max_items]
+            # Only the container subtrees are parsed, and selection stops at max_items
+            containers = select_containers(markup, container_selector, max_items, parser,
+                                           partial=source.get("partial_parse", True),
+                                           compiled=compiled["container"])
             
-            print(f"   Found {len(all_containers)} containers, processing {len(containers)} (max_items={max_items})")
+            print(f"   Processing {len(containers)} containers (max_items={max_items})")
             
             if not containers:
                 print(f"⚠️ No elements found with selector: {container_selector}")
@@ -47,7 +45,7 @@ class EnhancedWebCrawler(WebCrawler):
                 # Extract fields
                 for field, selector in selectors.items():
                     if field != "container":
-                        elem = container.select_one(selector)
+                        elem = compiled[field].select_one(container)
                         if elem:
                             # Check if it's an image
                             if elem.name == 'img':
@@ -91,6 +89,7 @@ class EnhancedWebCrawler(WebCrawler):
                     items.append(item)
         else:
             # Extract entire page
+            soup = make_soup(markup, parser)
             item = {
                 "source_id": source.get("_id"),
                 "source_url": url,
@@ -116,19 +115,14 @@ class EnhancedWebCrawler(WebCrawler):
     
     def _crawl_rss(self, source: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Crawl RSS feeds with image extraction"""
-        import feedparser
-        
         url = source.get("url")
         max_items = source.get("max_items", 50)
         
-        feed = feedparser.parse(url)
-        
-        # Check if feed has entries
-        total_available = len(feed.entries)
-        print(f"   RSS feed has {total_available} entries, requesting {max_items}")
+        entries = self._fetch_feed(url, source, max_items)
+        print(f"   RSS feed parsed {len(entries)} entries (max_items={max_items})")
         
         items = []
-        for entry in feed.entries[:max_items]:
+        for entry in entries:
             item = {
                 "source_id": source.get("_id"),
                 "source_url": url,
@@ -141,8 +135,8 @@ class EnhancedWebCrawler(WebCrawler):
             }
             
             # Extract images from media content
-            if hasattr(entry, 'media_content'):
-                for media in entry.media_content:
+            if entry.get('media_content'):
+                for media in entry.get('media_content'):
                     if media.get('type', '').startswith('image'):
                         item["images"].append({
                             "url": media.get('url', ''),
@@ -150,8 +144,8 @@ class EnhancedWebCrawler(WebCrawler):
                         })
             
             # Extract images from enclosures
-            if hasattr(entry, 'enclosures'):
-                for enclosure in entry.enclosures:
+            if entry.get('enclosures'):
+                for enclosure in entry.get('enclosures'):
                     if enclosure.get('type', '').startswith('image'):
                         item["images"].append({
                             "url": enclosure.get('href', ''),
@@ -161,10 +155,12 @@ class EnhancedWebCrawler(WebCrawler):
             # Parse content for images
             content_html = entry.get("content", [{}])[0].get("value", "") if entry.get("content") else entry.get("summary", "")
             if content_html:
-                soup = BeautifulSoup(content_html, 'html.parser')
+                soup = make_soup(content_html, source.get("parser"))
                 for img in soup.find_all('img'):
                     img_src = img.get('src', '')
                     if img_src:
+                        # Relative to the entry's page, not the feed
+                        img_src = self._make_absolute_url(img_src, entry.get("link") or url)
                         item["images"].append({
                             "url": img_src,
                             "alt": img.get('alt', entry.get("title", ""))
@@ -172,7 +168,7 @@ class EnhancedWebCrawler(WebCrawler):
             
             items.append(item)
         
-        print(f"   Collected {len(items)} items (requested {max_items}, available {total_available})")
+        print(f"   Collected {len(items)} items (requested {max_items})")
         return items
     
     def _make_absolute_url(self, url: str, base_url: str) -> str:
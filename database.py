@@ -2,19 +2,37 @@
 Database module for storing and retrieving crawled data
 Uses MongoDB for NoSQL storage
 """
-from pymongo import MongoClient, ASCENDING, TEXT
+from pymongo import MongoClient, ASCENDING, DeleteMany, UpdateOne
+from pymongo.errors import BulkWriteError
 from datetime import datetime
 import json
 import os
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 from dotenv import load_dotenv
+from fingerprint import fingerprint_item
+from migrations import migrate
 
 # Load environment variables
 load_dotenv()
 
+CONNECT_TIMEOUT_MS = int(os.getenv('MONGODB_CONNECT_TIMEOUT_MS', 5000))
+# Pending schema migrations (indexes) are applied when connecting
+AUTO_MIGRATE = os.getenv('MONGODB_AUTO_MIGRATE', 'true').lower() == 'true'
+# Background reconnect attempts back off from RECONNECT_INTERVAL to MAX_RECONNECT_INTERVAL seconds
+RECONNECT_INTERVAL = float(os.getenv('MONGODB_RECONNECT_INTERVAL', 5))
+MAX_RECONNECT_INTERVAL = 60
+
 class CrawlerDatabase:
-    def __init__(self, connection_string=None, db_name=None):
-        """Initialize MongoDB connection"""
+    COLLECTIONS = ("sources", "crawled_data", "crawl_logs", "source_state", "robots_cache", "snapshots")
+    
+    def __init__(self, connection_string=None, db_name=None, background=False):
+        """
+        Initialize MongoDB connection
+        
+        With background=True the constructor returns at once and a daemon
+        thread keeps connecting; collections are None until it succeeds.
+        """
         # Use environment variables if not provided
         if connection_string is None:
             # Use authenticated connection string for Docker
@@ -23,45 +41,95 @@ class CrawlerDatabase:
         if db_name is None:
             db_name = os.getenv('MONGODB_DATABASE', 'web_crawler')
         
-        try:
-            self.client = MongoClient(connection_string, serverSelectionTimeoutMS=5000)
-            # Test connection
-            self.client.server_info()
-            self.db = self.client[db_name]
-            
-            # Collections
-            self.sources = self.db.sources
-            self.crawled_data = self.db.crawled_data
-            self.crawl_logs = self.db.crawl_logs
+        self.connection_string = connection_string
+        self.db_name = db_name
+        self.client = None
+        self.db = None
+        for name in self.COLLECTIONS:
+            setattr(self, name, None)
+        self._connect_lock = threading.Lock()
+        self._connected = threading.Event()
+        self._closing = threading.Event()
+        self._reconnect_thread = None
+        
+        if background:
+            self.connect_in_background()
+        else:
+            self.connect()
+    
+    def connect(self, quiet: bool = False) -> bool:
+        """(Re)connect to MongoDB; collections stay None while it is unreachable"""
+        with self._connect_lock:
+            if self.client is not None:
+                return True
             
-            # Create indexes
-            self._create_indexes()
-            print("✅ Connected to MongoDB successfully!")
-        except Exception as e:
-            print(f"❌ MongoDB connection failed: {e}")
-            print("⚠️  The dashboard will run with limited functionality.")
-            print("   To fix: Make sure MongoDB is running without authentication")
-            # Initialize with None to handle gracefully
+            client = None
+            try:
+                client = MongoClient(self.connection_string, serverSelectionTimeoutMS=CONNECT_TIMEOUT_MS)
+                # Test connection
+                client.server_info()
+                database = client[self.db_name]
+                
+                # Indexes are created once, by migrations recorded in the database
+                if AUTO_MIGRATE:
+                    try:
+                        migrate(database)
+                    except Exception as e:
+                        print(f"Warning: Could not apply schema migrations: {e}")
+                        print("Database will work but searches may be slower.")
+                
+                self.client = client
+                self.db = database
+                
+                # Collections
+                for name in self.COLLECTIONS:
+                    setattr(self, name, self.db[name])
+                self._connected.set()
+                print("✅ Connected to MongoDB successfully!")
+                return True
+            except Exception as e:
+                if not quiet:
+                    print(f"❌ MongoDB connection failed: {e}")
+                    print("⚠️  The dashboard will run with limited functionality.")
+                    print("   To fix: Make sure MongoDB is running without authentication")
+                if client is not None:
+                    client.close()
+                return False
+    
+    def connect_in_background(self) -> threading.Thread:
+        """Keep trying to connect from a daemon thread, backing off between attempts"""
+        with self._connect_lock:
+            if self._reconnect_thread is None or not self._reconnect_thread.is_alive():
+                self._reconnect_thread = threading.Thread(target=self._reconnect, name="mongodb-connect",
+                                                          daemon=True)
+                self._reconnect_thread.start()
+            return self._reconnect_thread
+    
+    def _reconnect(self):
+        delay = RECONNECT_INTERVAL
+        attempts = 0
+        # Only the first failure is reported
+        while not self._closing.is_set() and not self.connect(quiet=attempts > 0):
+            attempts += 1
+            if self._closing.wait(delay):
+                return
+            delay = min(delay * 2, MAX_RECONNECT_INTERVAL)
+    
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the (background) connection; False if not connected within timeout"""
+        return self._connected.wait(timeout)
+    
+    def close(self):
+        """Close database connection (and stop reconnecting)"""
+        self._closing.set()
+        with self._connect_lock:
+            if self.client is not None:
+                self.client.close()
             self.client = None
             self.db = None
-            self.sources = None
-            self.crawled_data = None
-            self.crawl_logs = None
-    
-    def _create_indexes(self):
-        """Create indexes for better query performance"""
-        try:
-            # Text index for keyword search
-            self.crawled_data.create_index([("content", TEXT), ("title", TEXT)])
-            
-            # Index for source_id and timestamp
-            self.crawled_data.create_index([("source_id", ASCENDING), ("timestamp", ASCENDING)])
-            
-            # Index for sources
-            self.sources.create_index([("url", ASCENDING)], unique=True)
-        except Exception as e:
-            print(f"Warning: Could not create indexes: {e}")
-            print("Database will work but searches may be slower.")
+            for name in self.COLLECTIONS:
+                setattr(self, name, None)
+            self._connected.clear()
     
     # ==================== SOURCE MANAGEMENT ====================
     
@@ -86,13 +154,21 @@ class CrawlerDatabase:
             {"_id": ObjectId(source_id)},
             {"$set": update_data}
         )
+        
+        # Compiled selectors of the old configuration are no longer needed
+        if "selectors" in update_data:
+            from selector_cache import selector_cache
+            selector_cache.invalidate(source_id)
+        
         return result.modified_count > 0
     
     def delete_source(self, source_id: str) -> bool:
         """Delete a source"""
         from bson.objectid import ObjectId
+        from selector_cache import selector_cache
         
         result = self.sources.delete_one({"_id": ObjectId(source_id)})
+        selector_cache.invalidate(source_id)
         return result.deleted_count > 0
     
     def get_source(self, source_id: str) -> Optional[Dict]:
@@ -122,46 +198,211 @@ class CrawlerDatabase:
             print(f"Warning: Could not get sources: {e}")
             return []
     
+    # ==================== FETCH STATE ====================
+    
+    def get_source_state(self, url: str) -> Dict[str, Any]:
+        """Get the saved fetch state (ETag, Last-Modified, ...) for a URL"""
+        if self.source_state is None:
+            return {}
+        
+        try:
+            return self.source_state.find_one({"url": url}, {"_id": 0}) or {}
+        except Exception as e:
+            print(f"Warning: Could not get source state: {e}")
+            return {}
+    
+    def update_source_state(self, url: str, state: Dict[str, Any]) -> bool:
+        """Save fetch state fields for a URL"""
+        if self.source_state is None:
+            return False
+        
+        try:
+            state["updated_at"] = datetime.now()
+            self.source_state.update_one({"url": url}, {"$set": state}, upsert=True)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not update source state: {e}")
+            return False
+    
+    def get_robots(self, origin: str) -> Optional[Dict[str, Any]]:
+        """Get the cached robots.txt of an origin (scheme://host)"""
+        if self.robots_cache is None:
+            return None
+        
+        try:
+            return self.robots_cache.find_one({"origin": origin}, {"_id": 0})
+        except Exception as e:
+            print(f"Warning: Could not get robots.txt cache: {e}")
+            return None
+    
+    def save_robots(self, origin: str, robots: Dict[str, Any]) -> bool:
+        """Cache the robots.txt (status, text, fetched_at) of an origin"""
+        if self.robots_cache is None:
+            return False
+        
+        try:
+            self.robots_cache.update_one({"origin": origin}, {"$set": robots}, upsert=True)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not save robots.txt cache: {e}")
+            return False
+    
     # ==================== DATA STORAGE ====================
     
+    def _upsert(self, data: Dict[str, Any], timestamp: datetime,
+                extra: Optional[Dict[str, Any]] = None) -> Tuple[Dict, Dict]:
+        """
+        Filter and update document upserting an item by its fingerprint
+        
+        timestamp is only set when the item is first stored, so storing an
+        unchanged item again modifies nothing.
+        """
+        fingerprint_item(data)
+        fields = {name: value for name, value in data.items() if name not in ("_id", "timestamp")}
+        fields.update(extra or {})
+        return {"fingerprint": data["fingerprint"]}, {"$set": fields, "$setOnInsert": {"timestamp": timestamp}}
+    
     def store_crawled_data(self, data: Dict[str, Any]) -> str:
-        """Store crawled data"""
+        """Store (or update) a crawled item, returning its ID"""
         if self.crawled_data is None:
             return ""
         
         try:
-            data["timestamp"] = datetime.now()
-            result = self.crawled_data.insert_one(data)
-            return str(result.inserted_id)
+            result = self.crawled_data.update_one(*self._upsert(data, datetime.now()), upsert=True)
+            if result.upserted_id is not None:
+                return str(result.upserted_id)
+            return str(self.crawled_data.find_one({"fingerprint": data["fingerprint"]}, {"_id": 1})["_id"])
         except Exception as e:
             print(f"Warning: Could not store data: {e}")
             return ""
     
-    def bulk_store_data(self, data_list: List[Dict[str, Any]]) -> List[str]:
-        """Store multiple crawled data items"""
-        if self.crawled_data is None:
-            return []
+    def bulk_store_data(self, data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Store crawled items idempotently with one unordered bulk upsert
+        
+        Returns:
+            {"inserted": new items, "updated": changed items, "unchanged": items already stored as is,
+             "failed": items that could not be stored, plus their "failed_fingerprints" if any}
+        """
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+        if self.crawled_data is None or not data_list:
+            return counts
+        
+        now = datetime.now()
+        # An item listed twice in one crawl becomes a single upsert
+        operations = {}
+        for data in data_list:
+            key, update = self._upsert(data, now)
+            operations[key["fingerprint"]] = UpdateOne(key, update, upsert=True)
+        duplicates = len(data_list) - len(operations)
         
         try:
-            for data in data_list:
-                data["timestamp"] = datetime.now()
-            
-            result = self.crawled_data.insert_many(data_list)
-            return [str(id) for id in result.inserted_ids]
+            result = self.crawled_data.bulk_write(list(operations.values()), ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            # Another crawler stored the same item at the same moment: it is stored, so count it unchanged
+            result = e.details
+            conflicts = [error for error in result["writeErrors"] if error["code"] == 11000]
+            result["nMatched"] += len(conflicts)
+            counts["failed"] = len(result["writeErrors"]) - len(conflicts)
+            if counts["failed"]:
+                print(f"Warning: Could not store {counts['failed']} items")
+                # Error indexes point into the deduplicated operations
+                fingerprints = list(operations)
+                counts["failed_fingerprints"] = [fingerprints[error["index"]] for error in result["writeErrors"]
+                                                 if error["code"] != 11000]
         except Exception as e:
             print(f"Warning: Could not bulk store data: {e}")
+            counts["failed"] = len(data_list)
+            counts["failed_fingerprints"] = list(operations)
+            return counts
+        
+        counts["inserted"] = result["nUpserted"]
+        counts["updated"] = result["nModified"]
+        counts["unchanged"] = result["nMatched"] - result["nModified"] + duplicates
+        return counts
+    
+    def find_near_duplicates(self, bands: List[int]) -> List[Dict[str, Any]]:
+        """Canonical items sharing any of the given MinHash band keys (signature fields only)"""
+        if self.crawled_data is None or not bands:
+            return []
+        
+        try:
+            return list(self.crawled_data.find(
+                {"minhash_bands": {"$in": list(set(bands))}},
+                {"_id": 0, "fingerprint": 1, "minhash": 1, "minhash_bands": 1, "source_id": 1, "snapshot": 1}
+            ))
+        except Exception as e:
+            print(f"Warning: Could not look up near duplicates: {e}")
             return []
     
+    # ==================== SNAPSHOTS ====================
+    
+    def save_snapshot(self, snapshot: Dict[str, Any]) -> bool:
+        """Record that a page body (by hash) was crawled for a source"""
+        if self.snapshots is None:
+            return False
+        
+        try:
+            key = {"source_id": snapshot["source_id"], "url": snapshot["url"], "hash": snapshot["hash"]}
+            self.snapshots.update_one(key, {"$set": snapshot}, upsert=True)
+            return True
+        except Exception as e:
+            print(f"Warning: Could not save snapshot: {e}")
+            return False
+    
+    def iter_snapshots(self, source_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over the snapshots of a source (or all sources), oldest first"""
+        if self.snapshots is None:
+            return iter([])
+        
+        query = {"source_id": source_id} if source_id else {}
+        return self.snapshots.find(query, {"_id": 0}).sort("fetched_at", ASCENDING).batch_size(1000)
+    
+    def replace_snapshot_items(self, results: List[Tuple[Dict[str, Any], List[Dict[str, Any]]]]) -> Dict[str, int]:
+        """
+        Replace the items extracted from snapshots in one ordered bulk write
+        
+        Args:
+            results: (snapshot, new items) pairs
+        
+        Returns:
+            {"deleted": old items removed, "inserted": new items stored,
+             "updated": items of another snapshot updated in place}
+        """
+        counts = {"deleted": 0, "inserted": 0, "updated": 0}
+        if self.crawled_data is None:
+            return counts
+        
+        now = datetime.now()
+        operations = []
+        for snapshot, items in results:
+            operations.append(DeleteMany({"source_id": snapshot["source_id"], "source_url": snapshot["url"],
+                                          "snapshot": snapshot["hash"]}))
+            for item in items:
+                operations.append(UpdateOne(*self._upsert(item, snapshot["fetched_at"], {"reextracted_at": now}),
+                                            upsert=True))
+        
+        try:
+            result = self.crawled_data.bulk_write(operations, ordered=True)
+            return {"deleted": result.deleted_count, "inserted": result.upserted_count,
+                    "updated": result.modified_count}
+        except Exception as e:
+            print(f"Warning: Could not replace snapshot items: {e}")
+            return counts
+    
     # ==================== DATA RETRIEVAL ====================
     
-    def search_by_keyword(self, keyword: str, limit: int = 100) -> List[Dict]:
-        """Search crawled data by keyword"""
+    def search_by_keyword(self, keyword: str, limit: int = 100, canonical_only: bool = False) -> List[Dict]:
+        """Search crawled data by keyword (canonical_only leaves out near duplicates)"""
         if self.crawled_data is None:
             return []
         
         try:
+            query = {"$text": {"$search": keyword}}
+            if canonical_only:
+                query["duplicate_of"] = None
             results = self.crawled_data.find(
-                {"$text": {"$search": keyword}},
+                query,
                 {"score": {"$meta": "textScore"}}
             ).sort([("score", {"$meta": "textScore"})]).limit(limit)
             
@@ -193,13 +434,14 @@ class CrawlerDatabase:
             print(f"Warning: Could not get data by source: {e}")
             return []
     
-    def get_recent_data(self, limit: int = 100) -> List[Dict]:
-        """Get most recent crawled data"""
+    def get_recent_data(self, limit: int = 100, canonical_only: bool = False) -> List[Dict]:
+        """Get most recent crawled data (canonical_only leaves out near duplicates)"""
         if self.crawled_data is None:
             return []
         
         try:
-            results = self.crawled_data.find().sort("timestamp", -1).limit(limit)
+            query = {"duplicate_of": None} if canonical_only else {}
+            results = self.crawled_data.find(query).sort("timestamp", -1).limit(limit)
             
             data = []
             for doc in results:
@@ -277,6 +519,31 @@ class CrawlerDatabase:
             print(f"Warning: Could not log crawl: {e}")
             return ""
     
+    def bulk_log_crawl(self, logs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Log several crawl operations with one unordered insert
+        
+        Returns:
+            {"logged": logs inserted, "failed": indexes in logs of those that were not}
+        """
+        if self.crawl_logs is None or not logs:
+            return {"logged": 0, "failed": list(range(len(logs)))}
+        
+        now = datetime.now()
+        for log_data in logs:
+            log_data["timestamp"] = now
+        try:
+            return {"logged": len(self.crawl_logs.insert_many(logs, ordered=False).inserted_ids), "failed": []}
+        except BulkWriteError as e:
+            # A log replayed after it was already inserted keeps its _id: it is logged
+            conflicts = [error for error in e.details["writeErrors"] if error["code"] == 11000]
+            failed = [error["index"] for error in e.details["writeErrors"] if error["code"] != 11000]
+            print(f"Warning: Could not log {len(failed)} crawls")
+            return {"logged": e.details["nInserted"] + len(conflicts), "failed": failed}
+        except Exception as e:
+            print(f"Warning: Could not log crawls: {e}")
+            return {"logged": 0, "failed": list(range(len(logs)))}
+    
     def get_crawl_logs(self, limit: int = 100) -> List[Dict]:
         """Get recent crawl logs"""
         if self.crawl_logs is None:
@@ -293,7 +560,3 @@ class CrawlerDatabase:
         except Exception as e:
             print(f"Warning: Could not get logs: {e}")
             return []
-    
-    def close(self):
-        """Close database connection"""
-        self.client.close()
@@ -0,0 +1,212 @@
+"""
+Fast RSS 2.0 / Atom Parser
+Streaming parser that extracts only the fields the crawler reads
+
+Entries come back as plain dicts with the same keys feedparser uses
+(title, summary, link, published, content, media_content, enclosures), so
+_crawl_rss handles both parsers the same way. Anything the fast path does
+not understand (malformed XML, unknown feed formats) is handed to
+feedparser instead.
+"""
+import io
+from typing import Dict, List, Any, Optional
+from urllib.parse import urljoin
+
+from xml_stream import etree, XMLParseError, ITERPARSE_OPTIONS, split_tag as _split, release
+
+ATOM_NS = "http://www.w3.org/2005/Atom"
+MEDIA_NS = "http://search.yahoo.com/mrss/"
+CONTENT_NS = "http://purl.org/rss/1.0/modules/content/"
+DC_NS = "http://purl.org/dc/elements/1.1/"
+RSS1_NS = "http://purl.org/rss/1.0/"
+
+# Root elements the fast path knows how to read
+FEED_ROOTS = {"rss", "RDF", "feed"}
+
+
+class UnsupportedFeed(Exception):
+    """Raised when the fast path cannot handle a document"""
+
+
+def _text(elem) -> str:
+    """All text inside an element, stripped"""
+    return "".join(elem.itertext()).strip()
+
+
+def _media_children(item):
+    """Direct children plus the children of any media:group"""
+    for child in item:
+        if child.tag == f"{{{MEDIA_NS}}}group":
+            yield from child
+        else:
+            yield child
+
+
+def _parse_rss_item(item, base_url: str) -> Dict[str, Any]:
+    """Extract the crawler's fields from an RSS 2.0 / 1.0 <item>"""
+    entry = {"media_content": [], "enclosures": []}
+    guid = None
+
+    for child in _media_children(item):
+        namespace, name = _split(child.tag)
+
+        if namespace == MEDIA_NS:
+            if name == "content":
+                entry["media_content"].append(dict(child.attrib))
+        elif namespace == CONTENT_NS:
+            if name == "encoded":
+                entry["content"] = [{"value": _text(child), "type": "text/html"}]
+        elif namespace == DC_NS:
+            if name == "date":
+                entry.setdefault("published", _text(child))
+        elif namespace not in ("", RSS1_NS):
+            continue
+        elif name == "title":
+            entry["title"] = _text(child)
+        elif name == "link":
+            entry["link"] = urljoin(base_url, _text(child))
+        elif name == "description":
+            entry["summary"] = _text(child)
+        elif name == "pubDate":
+            entry["published"] = _text(child)
+        elif name == "guid":
+            if child.get("isPermaLink", "true").lower() == "true":
+                guid = _text(child)
+        elif name == "enclosure":
+            entry["enclosures"].append({
+                "href": urljoin(base_url, child.get("url", "")),
+                "type": child.get("type", ""),
+                "length": child.get("length", "")
+            })
+
+    # Same rule as feedparser: a permalink guid stands in for a missing link
+    if not entry.get("link") and guid:
+        entry["link"] = urljoin(base_url, guid)
+
+    return entry
+
+
+def _parse_atom_entry(item, base_url: str) -> Dict[str, Any]:
+    """Extract the crawler's fields from an Atom <entry>"""
+    entry = {"media_content": [], "enclosures": []}
+
+    for child in _media_children(item):
+        namespace, name = _split(child.tag)
+
+        if namespace == MEDIA_NS:
+            if name == "content":
+                entry["media_content"].append(dict(child.attrib))
+        elif namespace != ATOM_NS:
+            continue
+        elif name == "title":
+            entry["title"] = _text(child)
+        elif name == "link":
+            rel = child.get("rel", "alternate")
+            href = urljoin(base_url, child.get("href", ""))
+            if rel == "alternate" and "link" not in entry:
+                entry["link"] = href
+            elif rel == "enclosure":
+                entry["enclosures"].append({
+                    "href": href,
+                    "type": child.get("type", ""),
+                    "length": child.get("length", "")
+                })
+        elif name == "summary":
+            entry["summary"] = _text(child)
+        elif name == "content":
+            if child.get("type") == "xhtml":
+                # Inline XHTML needs markup serialization, which feedparser already does well
+                raise UnsupportedFeed("Inline XHTML content")
+            entry["content"] = [{"value": _text(child), "type": child.get("type", "text")}]
+        elif name == "published":
+            entry["published"] = _text(child)
+
+    # feedparser exposes the content as summary when an entry has no summary
+    if "summary" not in entry and entry.get("content"):
+        entry["summary"] = entry["content"][0]["value"]
+
+    return entry
+
+
+def parse_fast(content: bytes, max_items: Optional[int] = None, base_url: str = "") -> List[Dict[str, Any]]:
+    """
+    Stream-parse an RSS 2.0, RSS 1.0 or Atom document
+
+    Args:
+        content: Raw feed bytes
+        max_items: Stop once this many entries have been read
+        base_url: URL used to resolve relative links
+
+    Returns:
+        List of entry dicts
+
+    Raises:
+        UnsupportedFeed: The document is malformed or not a known feed format
+    """
+    entries = []
+    root_kind = None
+
+    try:
+        for event, elem in etree.iterparse(io.BytesIO(content), events=("start", "end"), **ITERPARSE_OPTIONS):
+            namespace, name = _split(elem.tag)
+
+            if root_kind is None:
+                if name not in FEED_ROOTS or (name == "feed" and namespace != ATOM_NS):
+                    raise UnsupportedFeed(f"Unknown feed root: {elem.tag}")
+                root_kind = "atom" if name == "feed" else "rss"
+                continue
+
+            if event != "end":
+                continue
+
+            if root_kind == "rss" and name == "item":
+                entries.append(_parse_rss_item(elem, base_url))
+            elif root_kind == "atom" and name == "entry" and namespace == ATOM_NS:
+                entries.append(_parse_atom_entry(elem, base_url))
+            else:
+                continue
+
+            # Free the parsed entry so memory stays flat on large feeds
+            release(elem)
+            if max_items is not None and len(entries) >= max_items:
+                break
+    except XMLParseError as e:
+        raise UnsupportedFeed(f"Malformed feed: {e}")
+
+    if root_kind is None:
+        raise UnsupportedFeed("Empty document")
+
+    return entries
+
+
+def parse_feed(content: bytes, max_items: Optional[int] = None, base_url: str = "",
+               content_type: str = "", fast: bool = True) -> Dict[str, Any]:
+    """
+    Parse a feed with the fast path, falling back to feedparser
+
+    Args:
+        content: Raw feed bytes
+        max_items: Maximum number of entries to return
+        base_url: URL used to resolve relative links
+        content_type: HTTP Content-Type, used by feedparser for encoding detection
+        fast: Set to False to go straight to feedparser
+
+    Returns:
+        {"entries": [...], "parser": "fast" | "feedparser"}
+    """
+    if fast:
+        try:
+            entries = parse_fast(content, max_items=max_items, base_url=base_url)
+            if entries:
+                return {"entries": entries, "parser": "fast"}
+        except UnsupportedFeed:
+            pass
+
+    import feedparser
+
+    feed = feedparser.parse(content, response_headers={
+        "content-location": base_url,
+        "content-type": content_type
+    })
+    entries = feed.entries if max_items is None else feed.entries[:max_items]
+    return {"entries": entries, "parser": "feedparser"}
@@ -0,0 +1,47 @@
+"""
+Item Fingerprints
+Stable keys that make storing crawled items idempotent
+
+Every item gets a `fingerprint` (which stored item it is) and a
+`content_hash` (what it currently says). Items with a link are keyed by
+(source_id, link), single-document sources (pdf, txt) by (source_id,
+source_url), and anything else by its content, so crawling the same
+feed again updates or skips items instead of storing copies.
+"""
+import hashlib
+import json
+from typing import Dict, Any, Optional
+
+# Bookkeeping fields that never make an item different
+VOLATILE_FIELDS = {"_id", "timestamp", "fingerprint", "content_hash", "snapshot", "reextracted_at",
+                   "minhash", "minhash_bands", "duplicate_of"}
+
+# Source types producing one item per URL, updated in place when the document changes
+SINGLE_ITEM_TYPES = {"pdf", "txt"}
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def content_hash(item: Dict[str, Any]) -> str:
+    """Hash of everything an item says (bookkeeping fields excluded)"""
+    return _digest({name: value for name, value in item.items() if name not in VOLATILE_FIELDS})
+
+
+def item_fingerprint(item: Dict[str, Any], digest: Optional[str] = None) -> str:
+    """Identity of an item across crawls"""
+    source_id = item.get("source_id")
+    if item.get("link"):
+        return _digest(source_id, "link", item["link"])
+    if item.get("type") in SINGLE_ITEM_TYPES:
+        return _digest(source_id, "url", item.get("source_url"))
+    return _digest(source_id, "content", item.get("source_url"), digest or content_hash(item))
+
+
+def fingerprint_item(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Set the fingerprint and content_hash fields of an item (in place)"""
+    digest = content_hash(item)
+    item["content_hash"] = digest
+    item["fingerprint"] = item_fingerprint(item, digest)
+    return item
@@ -0,0 +1,228 @@
+"""
+Crawl Frontier
+Priority queue of URLs to visit for link-following HTML sources
+
+URLs are normalized before deduplication and only a 64-bit hash of each
+normalized URL is remembered, in an open-addressing table backed by a
+flat array (about 16 bytes per URL), so sites with hundreds of thousands
+of links fit in a few megabytes.
+"""
+import hashlib
+import heapq
+import itertools
+import posixpath
+import re
+from array import array
+from typing import Dict, Iterator, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, urljoin, parse_qsl, urlencode
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|_ga|ref_src)$", re.I)
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+# Links to these files are not HTML pages
+SKIPPED_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".ico", ".css", ".js", ".json",
+    ".pdf", ".zip", ".gz", ".tar", ".rar", ".7z", ".exe", ".dmg", ".mp3", ".mp4",
+    ".avi", ".mov", ".webm", ".woff", ".woff2", ".ttf", ".xml", ".rss"
+}
+
+# Frontier defaults for a source's "follow" document
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 100
+
+# Pending URLs kept per allowed page of budget
+QUEUE_FACTOR = 20
+
+
+def normalize_url(url: str, base: Optional[str] = None) -> Optional[str]:
+    """
+    Canonical form of a URL used for deduplication
+
+    Resolves it against base, lowercases scheme and host, drops default
+    ports, fragments and tracking parameters, removes dot segments and
+    sorts the query. Returns None for anything that is not http(s).
+    """
+    if base:
+        url = urljoin(base, url.strip())
+
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    host = parts.hostname.lower().rstrip(".")
+    try:
+        port = parts.port
+    except ValueError:
+        return None
+    netloc = host if port is None or str(port) == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+
+    path = parts.path or "/"
+    if "." in path:
+        trailing = path.endswith("/")
+        path = posixpath.normpath(path)
+        path = "/" if path in (".", "/") else path + ("/" if trailing else "")
+        if path.startswith("//"):
+            path = "/" + path.lstrip("/")
+
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not TRACKING_PARAMS.match(key)]
+    query.sort()
+
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def url_hash(url: str) -> int:
+    """Non-zero 64-bit fingerprint of a (normalized) URL"""
+    value = int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+    return value or 1
+
+
+class SeenSet:
+    """Set of 64-bit URL hashes in a flat open-addressing table"""
+
+    def __init__(self, capacity: int = 1024):
+        size = 1
+        while size < capacity * 2:
+            size *= 2
+        self._table = array("Q", bytes(8 * size))
+        self._mask = size - 1
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, url: str) -> bool:
+        value = url_hash(url)
+        index = value & self._mask
+        while True:
+            slot = self._table[index]
+            if slot == 0:
+                return False
+            if slot == value:
+                return True
+            index = (index + 1) & self._mask
+
+    def add(self, url: str) -> bool:
+        """Add a URL, returning False when it was already present"""
+        if (self._count + 1) * 2 > len(self._table):
+            self._grow()
+        return self._insert(url_hash(url))
+
+    def _insert(self, value: int) -> bool:
+        index = value & self._mask
+        while True:
+            slot = self._table[index]
+            if slot == 0:
+                self._table[index] = value
+                self._count += 1
+                return True
+            if slot == value:
+                return False
+            index = (index + 1) & self._mask
+
+    def _grow(self):
+        old = self._table
+        self._table = array("Q", bytes(16 * len(old)))
+        self._mask = len(self._table) - 1
+        self._count = 0
+        for value in old:
+            if value:
+                self._insert(value)
+
+    def memory_bytes(self) -> int:
+        return self._table.itemsize * len(self._table)
+
+
+class LinkRules:
+    """Allow/deny patterns and host restriction of a source's "follow" settings"""
+
+    def __init__(self, seed_url: str, follow: Dict[str, Any]):
+        self.allow = [re.compile(pattern) for pattern in follow.get("allow", [])]
+        self.deny = [re.compile(pattern) for pattern in follow.get("deny", [])]
+        self.prefer = [re.compile(pattern) for pattern in follow.get("prefer", [])]
+        self.same_host = follow.get("same_host", True)
+        self.host = urlsplit(seed_url).hostname
+
+    def allows(self, url: str) -> bool:
+        if self.same_host and urlsplit(url).hostname != self.host:
+            return False
+        if posixpath.splitext(urlsplit(url).path)[1].lower() in SKIPPED_EXTENSIONS:
+            return False
+        if any(pattern.search(url) for pattern in self.deny):
+            return False
+        return not self.allow or any(pattern.search(url) for pattern in self.allow)
+
+    def preferred(self, url: str) -> bool:
+        return any(pattern.search(url) for pattern in self.prefer)
+
+
+class Frontier:
+    """
+    URLs waiting to be crawled, shallowest and preferred first
+
+    Every URL is pushed at most once (normalized). The queue of pending
+    URLs is capped so a link-heavy site cannot grow it without bound.
+    """
+
+    def __init__(self, rules: LinkRules, max_depth: int = DEFAULT_MAX_DEPTH,
+                 max_queued: int = DEFAULT_MAX_PAGES * QUEUE_FACTOR):
+        self.rules = rules
+        self.max_depth = max_depth
+        self.max_queued = max_queued
+        self.seen = SeenSet()
+        self._heap: List[Tuple[int, int, int, str]] = []
+        self._counter = itertools.count()
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._heap)
+
+    def seed(self, url: str):
+        """Queue the start URL, which is crawled whatever the link rules say"""
+        self.seen.add(url)
+        heapq.heappush(self._heap, (0, 0, next(self._counter), url))
+
+    def push(self, url: str, depth: int) -> bool:
+        """Queue a normalized URL; False when seen, out of scope or the queue is full"""
+        if depth > self.max_depth or not self.rules.allows(url):
+            return False
+        if len(self._heap) >= self.max_queued:
+            if url not in self.seen:
+                self.dropped += 1
+            return False
+        if not self.seen.add(url):
+            return False
+
+        priority = 0 if self.rules.preferred(url) else 1
+        heapq.heappush(self._heap, (depth, priority, next(self._counter), url))
+        return True
+
+    def pop(self) -> Tuple[str, int]:
+        """Next (url, depth) to crawl"""
+        depth, _, _, url = heapq.heappop(self._heap)
+        return url, depth
+
+
+def extract_links(markup: str, base_url: str, parser: str) -> Iterator[str]:
+    """Normalized absolute URLs of the page's <a href> links (respecting <base href>)"""
+    soup = BeautifulSoup(markup, parser, parse_only=SoupStrainer(["a", "base"]))
+
+    base = soup.find("base", href=True)
+    if base:
+        base_url = urljoin(base_url, base["href"])
+
+    for anchor in soup.find_all("a", href=True):
+        if "nofollow" in (anchor.get("rel") or []):
+            continue
+        url = normalize_url(anchor["href"], base_url)
+        if url:
+            yield url
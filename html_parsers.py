@@ -0,0 +1,228 @@
+"""
+HTML Parser Backends
+Selects the BeautifulSoup tree builder used for HTML sources
+
+The backend is chosen per source ("parser": "lxml" | "html5lib" |
+"html.parser"), then globally with CRAWLER_HTML_PARSER, and otherwise
+defaults to the fastest parser installed.
+"""
+import os
+import re
+from typing import Dict, List, Any, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.builder import builder_registry
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Fastest first
+PARSER_PREFERENCE = ("lxml", "html.parser", "html5lib")
+
+# Backend the others are compared against when checking extraction results
+REFERENCE_PARSER = "html.parser"
+
+# Backends that honour BeautifulSoup's parse_only
+STRAINER_PARSERS = {"lxml", "html.parser"}
+
+# A single compound selector: optional tag, then .class / #id / [attr] / [attr=value] parts
+SIMPLE_SELECTOR = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*)?(?P<parts>(?:\.[\w-]+|#[\w-]+|\[[\w-]+(?:=[^\]]*)?\])*)$")
+SELECTOR_PART = re.compile(r"\.([\w-]+)|#([\w-]+)|\[([\w-]+)(?:=([^\]]*))?\]")
+
+# Characters of markup tokenized at a time while looking for the end of the last container needed
+PREFIX_CHUNK = 32 * 1024
+
+
+def available_parsers() -> List[str]:
+    """HTML parser backends installed in this environment"""
+    return [name for name in PARSER_PREFERENCE if builder_registry.lookup(name) is not None]
+
+
+def _default_parser() -> str:
+    configured = os.getenv('CRAWLER_HTML_PARSER')
+    installed = available_parsers()
+    if configured in installed:
+        return configured
+    if configured:
+        print(f"⚠️ HTML parser '{configured}' is not installed, using '{installed[0]}'")
+    return installed[0]
+
+
+DEFAULT_PARSER = _default_parser()
+
+
+def resolve_parser(requested: Optional[str] = None) -> str:
+    """Parser to use for a source, falling back to the default when unavailable"""
+    if requested and requested != DEFAULT_PARSER:
+        if builder_registry.lookup(requested) is not None:
+            return requested
+        print(f"⚠️ HTML parser '{requested}' is not installed, using '{DEFAULT_PARSER}'")
+    return DEFAULT_PARSER
+
+
+def make_soup(markup, parser: Optional[str] = None, **kwargs) -> BeautifulSoup:
+    """Parse HTML with the chosen backend"""
+    return BeautifulSoup(markup, resolve_parser(parser), **kwargs)
+
+
+def _has_classes(classes):
+    def match(value):
+        if value is None:
+            return False
+        values = value.split() if isinstance(value, str) else value
+        return all(cls in values for cls in classes)
+    return match
+
+
+def _equals(expected):
+    return lambda value: value == expected
+
+
+def _present(value):
+    return value is not None
+
+
+def _compound_selector(selector: str):
+    """(tag, {attribute: predicate}) of a single compound selector, or None"""
+    match = SIMPLE_SELECTOR.match(selector.strip())
+    if not match or not (match.group("tag") or match.group("parts")):
+        return None
+
+    classes = []
+    attrs = {}
+    for cls, element_id, attr, value in SELECTOR_PART.findall(match.group("parts")):
+        if cls:
+            classes.append(cls)
+        elif element_id:
+            attrs["id"] = _equals(element_id)
+        elif value:
+            attrs[attr] = _equals(value.strip("\"'"))
+        else:
+            attrs[attr] = _present
+    if classes:
+        attrs["class"] = _has_classes(classes)
+
+    tag = match.group("tag")
+    return tag.lower() if tag else None, attrs
+
+
+def container_strainer(selector: str) -> Optional[SoupStrainer]:
+    """
+    SoupStrainer keeping only the elements a container selector can match
+
+    Only single compound selectors (e.g. "article", ".post", "div.item",
+    "#main", "li[data-id]") can be expressed this way; anything involving
+    combinators, pseudo-classes or selector lists returns None, meaning the
+    whole document has to be parsed.
+    """
+    compound = _compound_selector(selector)
+    if compound is None:
+        return None
+    tag, attrs = compound
+    return SoupStrainer(tag, attrs=attrs)
+
+
+class _ContainerCounter:
+    """lxml parser target noting when the first max_items container elements have closed"""
+
+    def __init__(self, tag, attrs, max_items):
+        self.tag = tag
+        self.attrs = attrs
+        self.max_items = max_items
+        self.elements = []
+        self.started = 0
+        self.open = 0
+        self.complete = False
+
+    def start(self, tag, attrib):
+        matched = (self.tag is None or tag == self.tag) and all(
+            check(attrib.get(name)) for name, check in self.attrs.items())
+        self.elements.append(matched)
+        if matched:
+            self.started += 1
+            self.open += 1
+
+    def end(self, tag):
+        if self.elements and self.elements.pop():
+            self.open -= 1
+            if self.started >= self.max_items and not self.open:
+                self.complete = True
+
+    def close(self):
+        pass
+
+
+def container_prefix(markup: str, selector: str, max_items: int) -> str:
+    """
+    Start of the markup holding the first max_items containers whole
+
+    The markup is tokenized with lxml one PREFIX_CHUNK at a time, and
+    tokenizing stops after the chunk in which the first max_items
+    containers (and any container around them) have closed. Returns the
+    whole markup when the selector is not a single compound selector or
+    the page has fewer containers.
+    """
+    compound = _compound_selector(selector)
+    if etree is None or compound is None or max_items <= 0 or len(markup) <= PREFIX_CHUNK:
+        return markup
+
+    counter = _ContainerCounter(*compound, max_items)
+    parser = etree.HTMLParser(target=counter)
+    try:
+        for end in range(PREFIX_CHUNK, len(markup), PREFIX_CHUNK):
+            parser.feed(markup[end - PREFIX_CHUNK:end])
+            if counter.complete:
+                return markup[:end]
+    except (etree.Error, ValueError):
+        pass
+    return markup
+
+
+def select_containers(markup, selector: str, max_items: int, parser: Optional[str] = None,
+                      partial: bool = True, compiled=None) -> list:
+    """
+    Container elements for a selector, parsing as little of the page as possible
+
+    With partial parsing and a single compound selector, the lxml backend
+    only parses the start of the page that holds the first max_items
+    containers (see container_prefix), and the tree builder keeps only the
+    subtrees the selector can match. Other backends still tokenize the
+    whole page. A precompiled soupsieve pattern for the selector can be
+    passed as compiled to skip re-parsing the selector.
+    """
+    parser = resolve_parser(parser)
+    strainer = container_strainer(selector) if partial and parser in STRAINER_PARSERS else None
+
+    if strainer is not None:
+        # The prefix is only cut where lxml itself closed the containers
+        if parser == "lxml" and isinstance(markup, str):
+            markup = container_prefix(markup, selector, max_items)
+        soup = BeautifulSoup(markup, parser, parse_only=strainer)
+    else:
+        soup = BeautifulSoup(markup, parser)
+
+    if compiled is not None:
+        return compiled.select(soup, limit=max_items)
+    return soup.select(selector, limit=max_items)
+
+
+def extraction_signature(items: List[Dict[str, Any]]) -> List[tuple]:
+    """Comparable summary of extracted items (what a backend change could alter)"""
+    return [(item.get("title") or "", item.get("content") or "", len(item.get("images", [])))
+            for item in items]
+
+
+def diff_extractions(expected: List[Dict[str, Any]], actual: List[Dict[str, Any]]) -> Optional[str]:
+    """Describe the first difference between two extraction results, or None"""
+    expected_sig = extraction_signature(expected)
+    actual_sig = extraction_signature(actual)
+
+    if len(expected_sig) != len(actual_sig):
+        return f"{len(actual_sig)} items instead of {len(expected_sig)}"
+
+    for index, (want, got) in enumerate(zip(expected_sig, actual_sig)):
+        if want != got:
+            return f"item {index} differs (title {got[0][:40]!r} vs {want[0][:40]!r})"
+    return None
@@ -0,0 +1,95 @@
+"""
+Schema Migrations
+Index changes applied once per database instead of on every connection
+
+Each migration runs once, in version order, and is recorded in the
+schema_migrations collection ({"_id": version, "name", "applied_at"}), so
+connecting only reads that collection. A failed migration is not recorded:
+it (and the ones after it) is retried on the next connection. Migrations
+must be idempotent, since two processes starting together may both apply
+a pending one.
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from pymongo import ASCENDING, TEXT
+
+MIGRATIONS_COLLECTION = "schema_migrations"
+
+
+def _initial_indexes(db):
+    # Text index for keyword search
+    db.crawled_data.create_index([("content", TEXT), ("title", TEXT)])
+    # Index for source_id and timestamp
+    db.crawled_data.create_index([("source_id", ASCENDING), ("timestamp", ASCENDING)])
+    # Index for sources
+    db.sources.create_index([("url", ASCENDING)], unique=True)
+
+
+def _source_state_indexes(db):
+    # One fetch-state document per URL
+    db.source_state.create_index([("url", ASCENDING)], unique=True)
+
+
+def _robots_indexes(db):
+    # One robots.txt per origin
+    db.robots_cache.create_index([("origin", ASCENDING)], unique=True)
+
+
+def _snapshot_indexes(db):
+    # One snapshot document per page body, listed per source by re-extraction
+    db.snapshots.create_index([("source_id", ASCENDING), ("url", ASCENDING), ("hash", ASCENDING)], unique=True)
+    db.snapshots.create_index([("source_id", ASCENDING), ("fetched_at", ASCENDING)])
+
+
+def _fingerprint_indexes(db):
+    # One stored item per fingerprint (documents stored before fingerprints are left out)
+    db.crawled_data.create_index([("fingerprint", ASCENDING)], unique=True,
+                                 partialFilterExpression={"fingerprint": {"$exists": True}})
+    # Items of a snapshot, replaced by re-extraction
+    db.crawled_data.create_index([("source_id", ASCENDING), ("snapshot", ASCENDING)])
+
+
+def _minhash_indexes(db):
+    # MinHash band keys of canonical items (multikey), looked up by near-duplicate detection
+    db.crawled_data.create_index([("minhash_bands", ASCENDING)], sparse=True)
+
+
+# (version, name, apply(db)); append new migrations, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "crawled data and source indexes", _initial_indexes),
+    (2, "unique fetch state per url", _source_state_indexes),
+    (3, "unique robots.txt per origin", _robots_indexes),
+    (4, "snapshot indexes", _snapshot_indexes),
+    (5, "item fingerprint indexes", _fingerprint_indexes),
+    (6, "minhash band index", _minhash_indexes),
+]
+
+
+def applied_versions(db) -> List[int]:
+    return sorted(doc["_id"] for doc in db[MIGRATIONS_COLLECTION].find({}, {"_id": 1}))
+
+
+def pending_migrations(db) -> List[Tuple[int, str, Callable]]:
+    applied = set(applied_versions(db))
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def migrate(db) -> List[str]:
+    """
+    Apply the pending migrations of a pymongo database, in order
+
+    Returns:
+        Names of the migrations applied
+    """
+    applied = []
+    for version, name, apply in pending_migrations(db):
+        apply(db)
+        db[MIGRATIONS_COLLECTION].update_one(
+            {"_id": version},
+            {"$setOnInsert": {"name": name, "applied_at": datetime.now()}},
+            upsert=True
+        )
+        print(f"🛠️ Applied schema migration {version}: {name}")
+        applied.append(name)
+    return applied
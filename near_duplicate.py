@@ -0,0 +1,180 @@
+"""
+Near-Duplicate Detection
+Spots the same story crawled from different sources before it is stored
+
+Every item's text (title, content, description) gets a MinHash signature
+of its word pairs, estimating how much two texts overlap (Jaccard
+similarity). The signature is cut into LSH bands, each hashed to a 64-bit
+key kept in the multikey `minhash_bands` field of canonical items: texts
+sharing about half their word pairs nearly always share a band, unrelated
+ones practically never, so one indexed $in query per crawl returns few
+candidates even among millions of items. A candidate within
+CRAWLER_NEAR_DUPLICATE_SIMILARITY makes the item a near duplicate, linked
+to its canonical item through `duplicate_of` (default) or dropped; per
+source: "near_duplicates": "link" | "drop" | "off".
+"""
+import hashlib
+import os
+import random
+import re
+import struct
+from typing import Dict, List, Any, Optional, Set, Tuple
+
+from fingerprint import fingerprint_item
+
+LINK = "link"
+DROP = "drop"
+OFF = "off"
+
+NEAR_DUPLICATES = os.getenv('CRAWLER_NEAR_DUPLICATES', LINK).lower()
+
+# Estimated share of common word pairs from which two items are near duplicates
+MIN_SIMILARITY = float(os.getenv('CRAWLER_NEAR_DUPLICATE_SIMILARITY', 0.5))
+
+# Texts shorter than this (words) are too short to compare reliably
+MIN_TOKENS = int(os.getenv('CRAWLER_NEAR_DUPLICATE_MIN_WORDS', 12))
+
+# Only the start of very long documents (e.g. PDFs) is hashed
+MAX_TEXT_CHARS = 20000
+
+TEXT_FIELDS = ("title", "content", "description")
+
+SHINGLE_SIZE = 2
+
+# 12 bands of 3 hashes: items become candidates from a similarity of about (1/12)^(1/3) = 0.44
+BANDS = 12
+ROWS = 3
+NUM_HASHES = BANDS * ROWS
+
+# Hash family (a * x + b) mod p, fixed so signatures stay comparable across processes and releases
+PRIME = (1 << 61) - 1
+_random = random.Random(20261017)
+PERMUTATIONS = [(_random.randrange(1, PRIME), _random.randrange(0, PRIME)) for _ in range(NUM_HASHES)]
+
+_WORD = re.compile(r"\w+")
+
+
+def near_duplicate_mode(source: Dict[str, Any]) -> str:
+    """What to do with near duplicates of a source (its `near_duplicates` over the default)"""
+    mode = source.get("near_duplicates", NEAR_DUPLICATES)
+    if mode is False:
+        return OFF
+    if mode is True:
+        return LINK
+    return str(mode).lower()
+
+
+def item_text(item: Dict[str, Any]) -> str:
+    return " ".join(str(item[name]) for name in TEXT_FIELDS if item.get(name))[:MAX_TEXT_CHARS]
+
+
+def minhash(text: str) -> Optional[List[int]]:
+    """MinHash signature of the word pairs of a text (None when it is too short)"""
+    tokens = _WORD.findall(text.lower())
+    if len(tokens) < MIN_TOKENS:
+        return None
+
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    hashes = [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little") % PRIME
+              for shingle in shingles]
+    return [min((a * value + b) % PRIME for value in hashes) for a, b in PERMUTATIONS]
+
+
+def similarity(signature: List[int], other: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for mine, theirs in zip(signature, other) if mine == theirs) / NUM_HASHES
+
+
+def minhash_bands(signature: List[int]) -> List[int]:
+    """Index keys of a signature: band number in the top bits, hash of its rows below"""
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f"<{ROWS}Q", *signature[band * ROWS:(band + 1) * ROWS])
+        digest = int.from_bytes(hashlib.blake2b(rows, digest_size=7).digest(), "little")
+        # Fits a signed 64-bit BSON integer
+        keys.append((band << 56) | digest)
+    return keys
+
+
+class NearDuplicateIndex:
+    """Finds near duplicates of crawled items among the canonical items already stored"""
+
+    def __init__(self, database, min_similarity: float = MIN_SIMILARITY):
+        self.db = database
+        self.min_similarity = min_similarity
+
+    def process(self, items: List[Dict[str, Any]], mode: str = LINK,
+                replacing: Optional[Set[Tuple[Any, str]]] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Link (or drop) the items that nearly duplicate a stored or earlier item
+
+        Canonical items get `minhash_bands` (and no `duplicate_of`), near
+        duplicates get `duplicate_of` set to the canonical item's
+        fingerprint and no bands, so they never become canonical themselves.
+
+        Args:
+            items: Items about to be stored
+            mode: LINK or DROP (anything else leaves the items alone)
+            replacing: (source_id, snapshot hash) pairs whose stored items
+                the new ones replace (re-extraction), never canonical
+
+        Returns:
+            (items to store, {"linked": n, "dropped": n})
+        """
+        counts = {"linked": 0, "dropped": 0}
+        if mode not in (LINK, DROP) or not items:
+            return items, counts
+
+        signed = []
+        for item in items:
+            signature = minhash(item_text(item))
+            if signature is not None:
+                fingerprint_item(item)
+                signed.append((item, signature, minhash_bands(signature)))
+        if not signed:
+            return items, counts
+
+        # Candidates by band: stored canonical items first, then canonical items of this batch
+        buckets: Dict[int, List[Tuple[str, List[int]]]] = {}
+        for candidate in self.db.find_near_duplicates([band for _, _, bands in signed for band in bands]):
+            if replacing and (candidate.get("source_id"), candidate.get("snapshot")) in replacing:
+                continue
+            for band in candidate["minhash_bands"]:
+                buckets.setdefault(band, []).append((candidate["fingerprint"], candidate["minhash"]))
+
+        dropped = set()
+        for item, signature, bands in signed:
+            canonical = self._closest(item["fingerprint"], signature, bands, buckets)
+            item["minhash"] = signature
+            if canonical is None:
+                item["minhash_bands"] = bands
+                item["duplicate_of"] = None
+                for band in bands:
+                    buckets.setdefault(band, []).append((item["fingerprint"], signature))
+            elif mode == DROP:
+                dropped.add(id(item))
+                counts["dropped"] += 1
+            else:
+                item["minhash_bands"] = []
+                item["duplicate_of"] = canonical
+                counts["linked"] += 1
+
+        if dropped:
+            items = [item for item in items if id(item) not in dropped]
+        return items, counts
+
+    def _closest(self, fingerprint: str, signature: List[int], bands: List[int],
+                 buckets: Dict[int, List[Tuple[str, List[int]]]]) -> Optional[str]:
+        """Fingerprint of the most similar candidate above min_similarity (the item itself excluded)"""
+        best = None
+        best_similarity = self.min_similarity
+        checked = {fingerprint}
+        for band in bands:
+            for candidate, candidate_signature in buckets.get(band, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                score = similarity(signature, candidate_signature)
+                if score >= best_similarity and (best is None or score > best_similarity):
+                    best, best_similarity = candidate, score
+        return best
@@ -0,0 +1,97 @@
+"""
+Page Readiness
+Wait conditions for JavaScript-rendered pages instead of a fixed sleep
+
+A dynamic source is ready once its container selector matches enough
+elements and/or once the page stopped loading resources for a while.
+Configured per source with a `wait_for` document:
+
+    {"min_count": 5, "network_idle": true, "idle_time": 0.5, "timeout": 20}
+"""
+import os
+import time
+from typing import Dict, Any, Optional
+
+# Upper bound on the readiness wait when a source does not set one (seconds)
+DEFAULT_TIMEOUT = float(os.getenv('CRAWLER_DYNAMIC_WAIT_TIMEOUT', '20'))
+
+# Quiet period without new network requests that counts as idle (seconds)
+DEFAULT_IDLE_TIME = 0.5
+
+POLL_INTERVAL = 0.1
+
+COUNT_SCRIPT = "return document.querySelectorAll(arguments[0]).length"
+
+# Finished document plus the number of resources requested so far
+NETWORK_SCRIPT = ("return [document.readyState, "
+                  "window.performance ? performance.getEntriesByType('resource').length : 0]")
+
+
+def readiness_settings(source: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Readiness conditions of a dynamic source
+
+    Without a container selector the page can only be judged by its
+    network activity, so network_idle is then enabled by default. The
+    legacy wait_time setting is used as the timeout when none is given.
+    """
+    wait_for = source.get("wait_for") or {}
+    selector = (source.get("selectors") or {}).get("container")
+
+    return {
+        "selector": selector,
+        "min_count": int(wait_for.get("min_count", 1)) if selector else 0,
+        "network_idle": bool(wait_for.get("network_idle", not selector)),
+        "idle_time": float(wait_for.get("idle_time", DEFAULT_IDLE_TIME)),
+        "timeout": float(wait_for.get("timeout", source.get("wait_time", DEFAULT_TIMEOUT)))
+    }
+
+
+def wait_until_ready(driver, selector: Optional[str] = None, min_count: int = 1,
+                     network_idle: bool = False, idle_time: float = DEFAULT_IDLE_TIME,
+                     timeout: float = DEFAULT_TIMEOUT, poll_interval: float = POLL_INTERVAL) -> Dict[str, Any]:
+    """
+    Poll the page until every enabled condition holds or the timeout expires
+
+    Args:
+        driver: Selenium driver with the page loaded
+        selector: Container CSS selector to count
+        min_count: Matches of selector required (0 disables the check)
+        network_idle: Also require no new resource requests for idle_time seconds
+        idle_time: Length of the quiet period
+        timeout: Maximum seconds to wait
+
+    Returns:
+        {"ready": bool, "matched": containers found, "waited": seconds}
+    """
+    start = time.monotonic()
+    deadline = start + timeout
+    matched = 0
+    resources = None
+    quiet_since = start
+
+    while True:
+        now = time.monotonic()
+
+        if selector and min_count:
+            matched = driver.execute_script(COUNT_SCRIPT, selector) or 0
+            selector_ready = matched >= min_count
+        else:
+            selector_ready = True
+
+        if network_idle:
+            state, count = driver.execute_script(NETWORK_SCRIPT)
+            if count != resources or state != "complete":
+                resources = count
+                quiet_since = now
+            idle_ready = state == "complete" and now - quiet_since >= idle_time
+        else:
+            idle_ready = True
+
+        if selector_ready and idle_ready:
+            return {"ready": True, "matched": matched, "waited": now - start}
+
+        if now >= deadline:
+            return {"ready": False, "matched": matched, "waited": now - start}
+
+        time.sleep(min(poll_interval, max(0.0, deadline - now)))
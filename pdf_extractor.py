@@ -0,0 +1,116 @@
+"""
+PDF Text Extraction
+Size-capped streaming downloads and parallel per-page text extraction
+
+PDFs are streamed to a temporary file instead of being buffered in memory,
+then large documents are split into page ranges extracted by a shared
+process pool. Page texts are joined once at the end.
+"""
+import atexit
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+# Defaults for the per-source max_bytes / max_pages settings
+DEFAULT_MAX_BYTES = int(os.getenv('CRAWLER_PDF_MAX_BYTES', 50 * 1024 * 1024))
+DEFAULT_MAX_PAGES = int(os.getenv('CRAWLER_PDF_MAX_PAGES', 500))
+
+# Documents with fewer pages are extracted inline (process start-up is not worth it)
+PARALLEL_MIN_PAGES = 16
+
+# Pages extracted per pool task
+PAGES_PER_TASK = 8
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class PDFTooLarge(ValueError):
+    """Raised when a PDF exceeds the source's max_bytes"""
+
+
+def download_to_tempfile(response, max_bytes: int = DEFAULT_MAX_BYTES) -> str:
+    """
+    Stream a response body to a temporary file, enforcing a size cap
+
+    Args:
+        response: requests.Response opened with stream=True
+        max_bytes: Maximum number of bytes accepted
+
+    Returns:
+        Path of the temporary file (the caller removes it)
+
+    Raises:
+        PDFTooLarge: The body is larger than max_bytes
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise PDFTooLarge(f"PDF is {int(declared)} bytes (max_bytes={max_bytes})")
+
+    handle, path = tempfile.mkstemp(suffix=".pdf", prefix="crawler_")
+    try:
+        written = 0
+        with os.fdopen(handle, "wb") as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > max_bytes:
+                    raise PDFTooLarge(f"PDF exceeds max_bytes={max_bytes}")
+                f.write(chunk)
+        return path
+    except Exception:
+        os.remove(path)
+        raise
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop) (runs in a worker process)"""
+    import PyPDF2
+
+    reader = PyPDF2.PdfReader(path)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Shared extraction pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Never forked: by now the process runs crawl, writer and reconnect threads whose
+            # locks a forked child could inherit held. A fork server starts single-threaded
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 2, mp_context=context)
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def extract_pdf_text(path: str, max_pages: Optional[int] = DEFAULT_MAX_PAGES) -> Tuple[str, int, int]:
+    """
+    Extract the text of a PDF file, in parallel for large documents
+
+    Args:
+        path: Path of the PDF file
+        max_pages: Only the first max_pages pages are extracted (None for all)
+
+    Returns:
+        (text, total page count, number of pages extracted)
+    """
+    import PyPDF2
+
+    total_pages = len(PyPDF2.PdfReader(path).pages)
+    page_count = total_pages if max_pages is None else min(total_pages, max_pages)
+
+    if page_count < PARALLEL_MIN_PAGES:
+        texts = _extract_pages(path, 0, page_count)
+    else:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_pages, path, start, min(start + PAGES_PER_TASK, page_count))
+                   for start in range(0, page_count, PAGES_PER_TASK)]
+        texts = [text for future in futures for text in future.result()]
+
+    return "".join(texts), total_pages, page_count
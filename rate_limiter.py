@@ -0,0 +1,188 @@
+"""
+Per-Host Rate Limiter
+Token-bucket politeness scheduler shared by every crawler fetch path
+
+Each host gets its own bucket refilled at `requests_per_second` (up to
+`burst` tokens) plus a cap on requests in flight at the same time. A
+source can ask for stricter pacing with a `rate_limit` document, e.g.
+{"requests_per_second": 0.5, "max_in_flight": 1}: its requests also go
+through a bucket of their own for that host and those settings, so the
+stricter of the two applies and other sources on the host are unaffected.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_REQUESTS_PER_SECOND = float(os.getenv('CRAWLER_HOST_RATE', '2'))
+DEFAULT_BURST = int(os.getenv('CRAWLER_HOST_BURST', '2'))
+DEFAULT_MAX_IN_FLIGHT = int(os.getenv('CRAWLER_HOST_CONCURRENCY', '2'))
+
+RATE_LIMIT_SETTINGS = ("requests_per_second", "burst", "max_in_flight")
+
+
+class HostBucket:
+    """Token bucket and in-flight counter for a single host"""
+
+    def __init__(self, requests_per_second: float, burst: int, max_in_flight: int):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+        # Metrics
+        self.requests = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def configure(self, requests_per_second=None, burst=None, max_in_flight=None):
+        """Change the bucket settings (caller holds the condition)"""
+        if requests_per_second:
+            self.requests_per_second = float(requests_per_second)
+        if burst:
+            self.burst = int(burst)
+            self.tokens = min(self.tokens, self.burst)
+        if max_in_flight:
+            self.max_in_flight = int(max_in_flight)
+
+    def refill(self, now: float):
+        """Add the tokens earned since the last refill"""
+        elapsed = now - self.updated
+        self.tokens = min(self.burst, self.tokens + elapsed * self.requests_per_second)
+        self.updated = now
+
+
+class HostRateLimiter:
+    """Thread-safe token-bucket limiter keyed by host name"""
+
+    def __init__(self, requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+                 burst: int = DEFAULT_BURST, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self._buckets: Dict[str, HostBucket] = {}
+        # (host, override settings) -> bucket of the requests made with that rate_limit
+        self._scoped: Dict[Tuple[str, tuple], HostBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host: str) -> HostBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = HostBucket(self.requests_per_second, self.burst, self.max_in_flight)
+                self._buckets[host] = bucket
+            return bucket
+
+    def _scoped_bucket(self, host: str, rate_limit: Optional[Dict[str, Any]]) -> Optional[HostBucket]:
+        """Bucket shared by the requests to a host carrying the same rate_limit override"""
+        settings = tuple((name, rate_limit[name]) for name in RATE_LIMIT_SETTINGS
+                         if rate_limit and rate_limit.get(name))
+        if not settings:
+            return None
+        with self._lock:
+            bucket = self._scoped.get((host, settings))
+            if bucket is None:
+                bucket = HostBucket(self.requests_per_second, self.burst, self.max_in_flight)
+                bucket.configure(**dict(settings))
+                self._scoped[(host, settings)] = bucket
+            return bucket
+
+    def configure_host(self, host: str, requests_per_second: Optional[float] = None,
+                       burst: Optional[int] = None, max_in_flight: Optional[int] = None):
+        """Set explicit limits for a host"""
+        bucket = self._bucket(host)
+        with bucket.condition:
+            bucket.configure(requests_per_second, burst, max_in_flight)
+            bucket.condition.notify_all()
+
+    def acquire(self, url: str, rate_limit: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Block until a request to the URL's host is allowed
+
+        Args:
+            url: URL about to be fetched
+            rate_limit: Optional per-source limits, applied on top of the host's
+
+        Returns:
+            Seconds spent waiting in the host queue
+        """
+        host = urlparse(url).netloc.lower()
+        start = time.monotonic()
+        # The source's own bucket first, so a slow source does not hold host slots while it waits
+        scoped = self._scoped_bucket(host, rate_limit)
+        if scoped is not None:
+            self._take(scoped, start)
+        self._take(self._bucket(host), start)
+        return time.monotonic() - start
+
+    @staticmethod
+    def _take(bucket: HostBucket, start: float):
+        """Wait for a token and an in-flight slot of a bucket"""
+        with bucket.condition:
+            while True:
+                now = time.monotonic()
+                bucket.refill(now)
+
+                if bucket.in_flight < bucket.max_in_flight and bucket.tokens >= 1:
+                    bucket.tokens -= 1
+                    bucket.in_flight += 1
+                    break
+
+                # Sleep until the next token, or until a request in flight finishes
+                timeout = None
+                if bucket.tokens < 1:
+                    timeout = (1 - bucket.tokens) / bucket.requests_per_second
+                bucket.condition.wait(timeout)
+
+            waited = time.monotonic() - start
+            bucket.requests += 1
+            bucket.total_wait += waited
+            bucket.max_wait = max(bucket.max_wait, waited)
+
+    def release(self, url: str, rate_limit: Optional[Dict[str, Any]] = None):
+        """Mark a request to the URL's host (made with rate_limit) as finished"""
+        host = urlparse(url).netloc.lower()
+        for bucket in (self._bucket(host), self._scoped_bucket(host, rate_limit)):
+            if bucket is None:
+                continue
+            with bucket.condition:
+                bucket.in_flight = max(0, bucket.in_flight - 1)
+                bucket.condition.notify_all()
+
+    @contextmanager
+    def limit(self, url: str, rate_limit: Optional[Dict[str, Any]] = None):
+        """Hold a request slot for the URL's host, yielding the queue wait in seconds"""
+        waited = self.acquire(url, rate_limit)
+        try:
+            yield waited
+        finally:
+            self.release(url, rate_limit)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-host settings and queue-wait metrics"""
+        with self._lock:
+            buckets = dict(self._buckets)
+
+        stats = {}
+        for host, bucket in buckets.items():
+            with bucket.condition:
+                stats[host] = {
+                    "requests_per_second": bucket.requests_per_second,
+                    "burst": bucket.burst,
+                    "max_in_flight": bucket.max_in_flight,
+                    "in_flight": bucket.in_flight,
+                    "requests": bucket.requests,
+                    "total_wait": round(bucket.total_wait, 3),
+                    "avg_wait": round(bucket.total_wait / bucket.requests, 3) if bucket.requests else 0.0,
+                    "max_wait": round(bucket.max_wait, 3)
+                }
+        return stats
+
+
+# Shared limiter so every crawler instance in the process paces hosts together
+default_limiter = HostRateLimiter()
@@ -0,0 +1,153 @@
+"""
+Snapshot Re-extraction
+Re-run the extraction of past crawls over their stored snapshots
+
+After a source's selectors are fixed, its snapshots are extracted again
+with the crawler class that originally crawled them, and the items of
+every snapshot in crawled_data are replaced by the new ones. Worker
+processes read the bodies straight from the snapshot store, so only
+snapshot metadata and extracted items cross process boundaries, and
+the main process writes each batch with a single ordered bulk write.
+"""
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Any, Optional
+
+from snapshot_store import SnapshotStore, DEFAULT_DIRECTORY
+from near_duplicate import NearDuplicateIndex, near_duplicate_mode
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# Snapshots extracted per worker task
+BATCH_SIZE = 100
+
+# Crawler used for snapshots stored before the extractor was recorded
+DEFAULT_EXTRACTOR = "crawler.WebCrawler"
+
+# Per-process state of a pool worker
+_worker: Dict[str, Any] = {}
+
+
+def _init_worker(directory: str):
+    _worker["store"] = SnapshotStore(directory)
+    _worker["crawlers"] = {}
+    # Extraction prints per page progress that would flood the job's output
+    sys.stdout = open(os.devnull, "w")
+
+
+def _crawler(extractor: str):
+    """One crawler instance per extractor class and process (no database needed)"""
+    crawler = _worker["crawlers"].get(extractor)
+    if crawler is None:
+        module_name, class_name = extractor.rsplit(".", 1)
+        crawler_class = getattr(importlib.import_module(module_name), class_name)
+        crawler = _worker["crawlers"][extractor] = crawler_class(None)
+    return crawler
+
+
+def extract_batch(source: Dict[str, Any], snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Extract the items of a batch of snapshots of one source (runs in a worker)
+
+    Returns:
+        {"results": [(snapshot, items), ...], "missing": count, "errors": [message, ...]}
+    """
+    results = []
+    missing = 0
+    errors = []
+    for snapshot in snapshots:
+        try:
+            body = _worker["store"].get(snapshot["hash"])
+        except KeyError:
+            missing += 1
+            continue
+
+        try:
+            crawler = _crawler(snapshot.get("extractor", DEFAULT_EXTRACTOR))
+            results.append((snapshot, crawler.extract_snapshot(source, snapshot, body)))
+        except Exception as e:
+            errors.append(f"{snapshot['url']} ({snapshot['hash'][:12]}): {e}")
+
+    return {"results": results, "missing": missing, "errors": errors}
+
+
+def _batches(db, source: Dict[str, Any], batch_size: int):
+    batch = []
+    for snapshot in db.iter_snapshots(source.get("_id")):
+        batch.append(snapshot)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def reextract(db, sources: List[Dict[str, Any]], workers: int = DEFAULT_WORKERS,
+              batch_size: int = BATCH_SIZE, store: Optional[SnapshotStore] = None) -> Dict[str, Any]:
+    """
+    Re-extract every snapshot of the given sources and replace their items
+
+    Args:
+        db: CrawlerDatabase (snapshot metadata and crawled_data)
+        sources: Source documents with their current selectors
+        workers: Extraction processes
+        batch_size: Snapshots per worker task
+        store: Snapshot store (default: CRAWLER_SNAPSHOT_DIR)
+
+    Returns:
+        Counts of snapshots, missing bodies, failures, deleted and inserted
+        items, plus elapsed seconds and snapshots per minute
+    """
+    directory = store.directory if store is not None else DEFAULT_DIRECTORY
+    stats = {"snapshots": 0, "missing": 0, "failed": 0, "deleted": 0, "inserted": 0, "errors": []}
+    near_duplicates = NearDuplicateIndex(db)
+    submitted = {}
+    started = time.monotonic()
+
+    def collect(future):
+        source = submitted.pop(future)
+        outcome = future.result()
+        stats["snapshots"] += len(outcome["results"])
+        stats["missing"] += outcome["missing"]
+        stats["failed"] += len(outcome["errors"])
+        stats["errors"].extend(outcome["errors"])
+        if outcome["results"]:
+            # Items are checked for near duplicates again, ignoring the stored items they replace
+            replacing = {(snapshot["source_id"], snapshot["hash"]) for snapshot, _ in outcome["results"]}
+            items = [item for _, items in outcome["results"] for item in items]
+            kept, _ = near_duplicates.process(items, near_duplicate_mode(source), replacing)
+            kept = {id(item) for item in kept}
+            results = [(snapshot, [item for item in items if id(item) in kept])
+                       for snapshot, items in outcome["results"]]
+            written = db.replace_snapshot_items(results)
+            stats["deleted"] += written["deleted"]
+            stats["inserted"] += written["inserted"]
+
+    # Spawned rather than forked: the parent holds a MongoClient and crawler threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(directory,)) as pool:
+        pending = set()
+        for source in sources:
+            for batch in _batches(db, source, batch_size):
+                # Keep a bounded number of batches in flight so memory stays flat
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        collect(future)
+                future = pool.submit(extract_batch, source, batch)
+                submitted[future] = source
+                pending.add(future)
+
+        for future in pending:
+            collect(future)
+
+    elapsed = time.monotonic() - started
+    stats["elapsed"] = round(elapsed, 3)
+    stats["per_minute"] = round(stats["snapshots"] * 60 / elapsed) if elapsed else 0
+    return stats
+
@@ -0,0 +1,115 @@
+"""
+Request Blocking
+Keeps dynamic renders from downloading resources the crawler never reads
+
+_crawl_dynamic only reads driver.page_source, so images, fonts, media and
+analytics scripts are blocked in the browser through the Chrome DevTools
+protocol (Network.setBlockedURLs). A source can tune the blocklist with a
+`block` document:
+
+    {"types": ["image", "font"], "urls": ["*ads.example.com*"], "trackers": true}
+
+or disable it with {"enabled": false} when a page needs those resources
+to render its content.
+
+Blocked URL patterns are matched against the whole URL, so every file
+extension also gets a variant with a query string (`*.png?*`), and image
+CDNs and font hosts that serve files without extensions are blocked by
+host. Blocking by resource type (Fetch.enable) would pause each request
+until a Fetch.requestPaused event is answered, which a Selenium driver
+calling execute_cdp_cmd cannot do.
+"""
+import json
+from typing import Dict, List, Any
+
+
+def _extensions(*extensions: str) -> List[str]:
+    """Patterns for URLs ending in an extension, with or without a query string"""
+    return [pattern for extension in extensions for pattern in (f"*.{extension}", f"*.{extension}?*")]
+
+
+# URL patterns per resource type (Network.setBlockedURLs wildcards)
+RESOURCE_TYPE_PATTERNS = {
+    "image": _extensions("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp") + [
+        # Image CDNs and resizers serving URLs without an extension
+        "*imgix.net/*", "*images.unsplash.com/*", "*res.cloudinary.com/*/image/*",
+        "*/_next/image?*", "*i.ytimg.com/*", "*pbs.twimg.com/*", "*gravatar.com/avatar/*"
+    ],
+    "font": _extensions("woff", "woff2", "ttf", "otf", "eot") + [
+        "*fonts.gstatic.com/*", "*fonts.googleapis.com/*", "*use.typekit.net/*"
+    ],
+    "media": _extensions("mp4", "webm", "mp3", "ogg", "m4a", "m3u8", "mpd", "mov"),
+    "stylesheet": _extensions("css")
+}
+
+DEFAULT_BLOCKED_TYPES = ("image", "font", "media")
+
+# Analytics, ad and tracking hosts
+TRACKER_PATTERNS = [
+    "*google-analytics.com*", "*googletagmanager.com*", "*googlesyndication.com*",
+    "*doubleclick.net*", "*adservice.google.*", "*connect.facebook.net*",
+    "*hotjar.com*", "*segment.io*", "*segment.com/analytics*", "*scorecardresearch.com*",
+    "*quantserve.com*", "*chartbeat.com*", "*newrelic.com*", "*nr-data.net*",
+    "*criteo.com*", "*taboola.com*", "*outbrain.com*", "*amazon-adsystem.com*"
+]
+
+
+def blocked_patterns(source: Dict[str, Any]) -> List[str]:
+    """URL patterns to block while rendering a source"""
+    block = source.get("block") or {}
+    if not block.get("enabled", True):
+        return []
+
+    patterns = []
+    for resource_type in block.get("types", DEFAULT_BLOCKED_TYPES):
+        patterns.extend(RESOURCE_TYPE_PATTERNS.get(resource_type, []))
+    if block.get("trackers", True):
+        patterns.extend(TRACKER_PATTERNS)
+    patterns.extend(block.get("urls", []))
+    return patterns
+
+
+def apply_blocking(driver, patterns: List[str]):
+    """
+    Install the blocklist on a (possibly reused) browser before navigating
+
+    Always sets the list, so patterns of the previous source on a pooled
+    browser are replaced, and drains the DevTools event log so counts only
+    cover the next page.
+    """
+    drain_network_events(driver)
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def drain_network_events(driver) -> List[Dict[str, Any]]:
+    """DevTools Network events logged since the last call"""
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        # Browser started without CDP event logging
+        return []
+
+    events = []
+    for entry in entries:
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, TypeError, ValueError):
+            continue
+        if message.get("method", "").startswith("Network."):
+            events.append(message)
+    return events
+
+
+def count_requests(driver) -> Dict[str, int]:
+    """Requests the page made since apply_blocking, split into blocked and allowed"""
+    requested = set()
+    blocked = set()
+    for event in drain_network_events(driver):
+        params = event.get("params", {})
+        if event["method"] == "Network.requestWillBeSent":
+            requested.add(params.get("requestId"))
+        elif event["method"] == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked.add(params.get("requestId"))
+
+    return {"blocked": len(blocked), "allowed": len(requested - blocked)}
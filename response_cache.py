@@ -0,0 +1,254 @@
+"""
+HTTP Response Cache
+Content-addressed on-disk store of raw responses with offline replay
+
+Bodies are stored once per SHA-256 content hash under blobs/, and a
+SQLite index maps each URL to its latest status, headers and body hash.
+The total size of the bodies is bounded; least recently used URLs are
+evicted first and a body is deleted once no URL references it.
+
+Modes (CRAWLER_RESPONSE_CACHE, or "response_cache" on a source):
+    off     no caching (default)
+    record  fetch live and store every response
+    replay  serve responses from the cache only, never touching the network
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Any, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CACHE_MODES = ("off", "record", "replay")
+DEFAULT_MODE = os.getenv('CRAWLER_RESPONSE_CACHE', 'off').lower()
+DEFAULT_DIRECTORY = os.getenv('CRAWLER_RESPONSE_CACHE_DIR', os.path.join('.crawler_cache', 'responses'))
+DEFAULT_MAX_BYTES = int(os.getenv('CRAWLER_RESPONSE_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# Headers describing the wire encoding; stored bodies are already decoded
+HOP_HEADERS = {"content-encoding", "transfer-encoding", "content-length", "connection", "keep-alive"}
+
+CHUNK_SIZE = 64 * 1024
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+class CacheMiss(LookupError):
+    """Raised in replay mode when a URL was never recorded"""
+
+
+class ResponseCache:
+    """Size-bounded, content-addressed cache of HTTP responses"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.blob_directory = os.path.join(directory, "blobs")
+        os.makedirs(self.blob_directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(directory, "index.sqlite"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_hash ON responses (hash)")
+        self._db.commit()
+
+        self.hits = 0
+        self.misses = 0
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_directory, digest[:2], digest)
+
+    # ==================== WRITE ====================
+
+    def store(self, key: str, url: str, status: int, headers: Dict[str, str], chunks: Iterable[bytes]) -> Dict[str, Any]:
+        """
+        Store a response body streamed as chunks
+
+        Args:
+            key: Cache key (the URL, or a prefixed URL for rendered pages)
+            url: Final URL of the response
+            status: HTTP status code
+            headers: Response headers
+            chunks: Decoded body chunks (written to disk as they arrive)
+
+        Returns:
+            The cache entry (status, headers, hash, size, path)
+        """
+        digest = hashlib.sha256()
+        size = 0
+        handle, temp_path = tempfile.mkstemp(dir=self.blob_directory, prefix=".incoming_")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                for chunk in chunks:
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        digest = digest.hexdigest()
+        path = self.blob_path(digest)
+        headers = {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS}
+        headers["Content-Length"] = str(size)
+        now = time.time()
+
+        with self._lock:
+            # Same content already stored: keep the existing blob
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if os.path.exists(path):
+                os.remove(temp_path)
+            else:
+                os.replace(temp_path, path)
+
+            previous = self._db.execute("SELECT hash FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, json.dumps(headers), digest, size, now, now))
+            self._db.commit()
+            if previous and previous[0] != digest:
+                self._delete_unreferenced([previous[0]])
+            self._evict()
+
+        return {"url": url, "status": status, "headers": headers, "hash": digest, "size": size, "path": path}
+
+    def store_bytes(self, key: str, url: str, status: int, headers: Dict[str, str], body: bytes) -> Dict[str, Any]:
+        return self.store(key, url, status, headers, [body])
+
+    def _delete_unreferenced(self, digests):
+        """Delete bodies no URL points to anymore (caller holds the lock)"""
+        for digest in digests:
+            in_use = self._db.execute("SELECT 1 FROM responses WHERE hash = ? LIMIT 1", (digest,)).fetchone()
+            if not in_use:
+                try:
+                    os.remove(self.blob_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def _evict(self):
+        """Drop least recently used URLs until the bodies fit in max_bytes (caller holds the lock)"""
+        total = self._stored_bytes()
+        if total <= self.max_bytes:
+            return
+
+        evicted = []
+        rows = self._db.execute("SELECT key, hash, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            evicted.append(digest)
+            # The body only frees space once its last URL is gone
+            if not self._db.execute("SELECT 1 FROM responses WHERE hash = ? LIMIT 1", (digest,)).fetchone():
+                total -= size
+        self._db.commit()
+        self._delete_unreferenced(set(evicted))
+
+    def _stored_bytes(self) -> int:
+        """Size of the distinct bodies (a shared body counts once)"""
+        row = self._db.execute("SELECT SUM(size) FROM (SELECT DISTINCT hash, size FROM responses)").fetchone()
+        return row[0] or 0
+
+    # ==================== READ ====================
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cache entry for a key (marking it recently used), or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, hash, size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or not os.path.exists(self.blob_path(row[3])):
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+
+        url, status, headers, digest, size = row
+        return {"url": url, "status": status, "headers": json.loads(headers), "hash": digest, "size": size,
+                "path": self.blob_path(digest)}
+
+    def read(self, key: str) -> bytes:
+        """Body stored for a key; raises CacheMiss when absent"""
+        entry = self.get(key)
+        if entry is None:
+            raise CacheMiss(f"Not in response cache: {key}")
+        with open(entry["path"], "rb") as f:
+            return f.read()
+
+    def to_response(self, entry: Dict[str, Any], stream: bool = False) -> requests.Response:
+        """
+        Rebuild a requests.Response from a cache entry
+
+        Streamed responses read the body file lazily (iter_content), others
+        have it loaded like a normal non-streamed request.
+        """
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.url = entry["url"]
+        response.reason = "Cached"
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+
+        if stream:
+            response.raw = open(entry["path"], "rb")
+        else:
+            with open(entry["path"], "rb") as f:
+                response._content = f.read()
+            response._content_consumed = True
+        return response
+
+    def replay(self, key: str, stream: bool = False) -> requests.Response:
+        """Cached response for a key; raises CacheMiss when absent"""
+        entry = self.get(key)
+        if entry is None:
+            raise CacheMiss(f"Not in response cache: {key}")
+        return self.to_response(entry, stream=stream)
+
+    def record(self, key: str, response: requests.Response, stream: bool = False) -> requests.Response:
+        """Store a live response and return an equivalent one reading the stored body"""
+        try:
+            chunks = response.iter_content(chunk_size=CHUNK_SIZE)
+            entry = self.store(key, response.url, response.status_code, dict(response.headers), chunks)
+        finally:
+            response.close()
+
+        replayed = self.to_response(entry, stream=stream)
+        replayed.history = response.history
+        return replayed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {"entries": entries, "bytes": self._stored_bytes(), "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def get_default_cache() -> ResponseCache:
+    """Process-wide cache in CRAWLER_RESPONSE_CACHE_DIR, created on first use"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
@@ -0,0 +1,77 @@
+"""
+Retry Policy
+Which fetch failures are retried, and how long to back off between attempts
+
+Connection errors, timeouts and 429/5xx answers are retried up to
+CRAWLER_RETRIES times with "full jitter" exponential backoff: attempt n
+sleeps a random time between 0 and min(max_backoff, backoff * 2^n), so
+crawls hitting the same struggling host do not retry in lockstep. A
+Retry-After header is honoured up to max_backoff. A source can override
+the policy with a `retry` document, e.g. {"attempts": 5, "backoff": 1}.
+"""
+import os
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional
+
+import requests
+
+DEFAULT_RETRIES = int(os.getenv('CRAWLER_RETRIES', 3))
+DEFAULT_BACKOFF = float(os.getenv('CRAWLER_RETRY_BACKOFF', 0.5))
+DEFAULT_MAX_BACKOFF = float(os.getenv('CRAWLER_RETRY_MAX_BACKOFF', 30))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+RETRYABLE_EXCEPTIONS = (
+    requests.ConnectionError,
+    requests.Timeout,
+    requests.exceptions.ChunkedEncodingError
+)
+
+
+def retry_settings(source: Dict[str, Any]) -> Dict[str, float]:
+    """Retry policy of a source (its `retry` document over the defaults)"""
+    retry = source.get("retry")
+    if retry is False:
+        retry = {"attempts": 0}
+    retry = retry or {}
+    return {
+        "attempts": int(retry.get("attempts", DEFAULT_RETRIES)),
+        "backoff": float(retry.get("backoff", DEFAULT_BACKOFF)),
+        "max_backoff": float(retry.get("max_backoff", DEFAULT_MAX_BACKOFF))
+    }
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, backoff: float = DEFAULT_BACKOFF, max_backoff: float = DEFAULT_MAX_BACKOFF,
+                  retry_after: Optional[str] = None) -> float:
+    """
+    Seconds to sleep before retry number attempt + 1
+
+    Args:
+        attempt: Retries already made (0 for the first retry)
+        backoff: Base delay doubled on every attempt
+        max_backoff: Upper bound of any delay
+        retry_after: Retry-After header of the failed response, if any
+    """
+    delay = random.uniform(0, min(max_backoff, backoff * (2 ** attempt)))
+    requested = parse_retry_after(retry_after)
+    if requested is not None:
+        delay = max(delay, requested)
+    return min(delay, max_backoff)
@@ -0,0 +1,207 @@
+"""
+robots.txt Cache
+Per-origin robots.txt rules shared by every crawler fetch path
+
+Rules are kept in memory and in the Mongo robots_cache collection for
+ROBOTS_TTL seconds, so a crawl normally costs no extra request. Following
+RFC 9309, a missing robots.txt (4xx) allows everything and a server error
+(5xx) disallows everything until a shorter retry TTL expires.
+"""
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+ROBOTS_TTL = int(os.getenv('CRAWLER_ROBOTS_TTL', 24 * 3600))
+
+# How long an unreachable robots.txt (5xx) blocks a site before it is retried
+ROBOTS_ERROR_TTL = int(os.getenv('CRAWLER_ROBOTS_ERROR_TTL', 600))
+
+# Product token matched against User-agent lines ("*" only obeys the generic group)
+ROBOTS_USER_AGENT = os.getenv('CRAWLER_ROBOTS_AGENT', '*')
+
+# Respect robots.txt unless a source sets "respect_robots": false
+RESPECT_ROBOTS = os.getenv('CRAWLER_RESPECT_ROBOTS', 'true').lower() == 'true'
+
+# Only the first 500 KiB of a robots.txt are read (RFC 9309)
+MAX_ROBOTS_BYTES = 500 * 1024
+
+# Origins kept in memory (least recently used are evicted first)
+MAX_ORIGINS = 10000
+
+
+class RobotsDisallowed(Exception):
+    """Raised before fetching a URL that robots.txt does not allow"""
+
+
+def robots_origin(url: str) -> str:
+    """scheme://host[:port] a robots.txt applies to"""
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def parse_crawl_delay(lines: List[str], user_agent: str) -> Optional[float]:
+    """
+    Crawl-delay of the group matching user_agent (falling back to "*")
+
+    urllib.robotparser only understands whole seconds, while many sites
+    use fractional delays such as "Crawl-delay: 0.5".
+    """
+    delays = {}
+    agents = []
+    in_agents = False
+    for line in lines:
+        key, _, value = line.split("#", 1)[0].partition(":")
+        key = key.strip().lower()
+        value = value.strip()
+        if key == "user-agent":
+            if not in_agents:
+                agents = []
+            agents.append(value.lower())
+            in_agents = True
+        elif key:
+            in_agents = False
+            if key == "crawl-delay":
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+
+    token = user_agent.split("/")[0].lower()
+    for agent, delay in delays.items():
+        if agent != "*" and agent in token:
+            return delay
+    return delays.get("*")
+
+
+class RobotsRules:
+    """Parsed robots.txt of one origin"""
+
+    def __init__(self, status: int, text: str = "", user_agent: str = ROBOTS_USER_AGENT):
+        self.status = status
+        self.user_agent = user_agent
+        self.parser = RobotFileParser()
+        self.crawl_delay = None
+
+        if status >= 500:
+            self.parser.disallow_all = True
+        elif status >= 400:
+            self.parser.allow_all = True
+        else:
+            lines = text[:MAX_ROBOTS_BYTES].splitlines()
+            self.parser.parse(lines)
+            self.crawl_delay = parse_crawl_delay(lines, user_agent)
+        self.parser.modified()
+
+    def allows(self, url: str) -> bool:
+        return self.parser.can_fetch(self.user_agent, url)
+
+    @property
+    def sitemaps(self) -> List[str]:
+        return self.parser.site_maps() or []
+
+
+class _OriginLock:
+    """Lock serializing the robots.txt download of one origin (weakly referenceable, unlike threading.Lock)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._lock.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._lock.release()
+
+
+class RobotsCache:
+    """Memory + Mongo cache of robots.txt rules keyed by origin"""
+
+    def __init__(self, database=None, ttl: int = ROBOTS_TTL, user_agent: str = ROBOTS_USER_AGENT):
+        self.db = database
+        self.ttl = ttl
+        self.user_agent = user_agent
+        self._entries: "OrderedDict[str, Tuple[RobotsRules, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Only origins being downloaded keep their lock
+        self._origin_locks: "weakref.WeakValueDictionary[str, _OriginLock]" = weakref.WeakValueDictionary()
+
+    def _ttl_for(self, status: int) -> int:
+        return ROBOTS_ERROR_TTL if status >= 500 else self.ttl
+
+    def _remember(self, origin: str, rules: RobotsRules, expires: float):
+        with self._lock:
+            self._entries[origin] = (rules, expires)
+            self._entries.move_to_end(origin)
+            while len(self._entries) > MAX_ORIGINS:
+                self._entries.popitem(last=False)
+
+    def _cached(self, origin: str) -> Optional[RobotsRules]:
+        with self._lock:
+            entry = self._entries.get(origin)
+            if entry and entry[1] > time.monotonic():
+                self._entries.move_to_end(origin)
+                return entry[0]
+        return None
+
+    def _load(self, origin: str) -> Optional[RobotsRules]:
+        """Rules saved in Mongo by any crawler process, if still fresh"""
+        if self.db is None:
+            return None
+        document = self.db.get_robots(origin)
+        if not document:
+            return None
+
+        age = (datetime.now() - document["fetched_at"]).total_seconds()
+        remaining = self._ttl_for(document["status"]) - age
+        if remaining <= 0:
+            return None
+
+        rules = RobotsRules(document["status"], document.get("text", ""), self.user_agent)
+        self._remember(origin, rules, time.monotonic() + remaining)
+        return rules
+
+    def get(self, url: str, fetch: Callable[[str], Tuple[int, str]]) -> Tuple[RobotsRules, bool]:
+        """
+        Rules for the origin of a URL
+
+        Args:
+            url: Any URL of the site
+            fetch: Called with the robots.txt URL on a miss, returns (status, text)
+
+        Returns:
+            (rules, cache hit)
+        """
+        origin = robots_origin(url)
+        rules = self._cached(origin)
+        if rules is not None:
+            return rules, True
+
+        # One download per origin even when several crawls of the site start together
+        with self._lock:
+            origin_lock = self._origin_locks.setdefault(origin, _OriginLock())
+        with origin_lock:
+            rules = self._cached(origin) or self._load(origin)
+            if rules is not None:
+                return rules, True
+
+            status, text = fetch(origin + "/robots.txt")
+            rules = RobotsRules(status, text, self.user_agent)
+            self._remember(origin, rules, time.monotonic() + self._ttl_for(status))
+            if self.db is not None:
+                self.db.save_robots(origin, {"status": status, "text": text[:MAX_ROBOTS_BYTES],
+                                             "fetched_at": datetime.now()})
+            return rules, False
+
+    def invalidate(self, url: str):
+        """Forget the rules of a URL's origin (memory only)"""
+        with self._lock:
+            self._entries.pop(robots_origin(url), None)
@@ -0,0 +1,153 @@
+"""
+Benchmark concurrent crawling against a local stub HTTP server
+
+Serves small HTML pages with an artificial delay and measures the wall-clock
+time of WebCrawler.crawl_many for increasing concurrency levels. Every
+database write can be given a round-trip latency, to compare synchronous
+storage with the write-behind writer (--write-behind).
+
+Usage:
+    python scripts/bench_crawl_many.py [--sources 22] [--delay 0.3]
+    python scripts/bench_crawl_many.py --write-latency 0.02 [--write-behind]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from write_behind import BufferedWriter
+
+PAGE = b"""<html><head><title>Stub</title></head><body>
+<div class="post"><h2>First post</h2><p>Hello</p></div>
+<div class="post"><h2>Second post</h2><p>World</p></div>
+</body></html>"""
+
+
+class MemoryDatabase:
+    """Minimal in-memory stand-in for CrawlerDatabase (writes take write_latency seconds)"""
+
+    def __init__(self, write_latency=0.0):
+        self.crawled_data = []
+        self.crawl_logs = []
+        self.write_latency = write_latency
+        self.round_trips = 0
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.write_latency:
+            time.sleep(self.write_latency)
+
+    def bulk_store_data(self, data_list):
+        self._round_trip()
+        self.crawled_data.extend(data_list)
+        return {"inserted": len(data_list), "updated": 0, "unchanged": 0}
+
+    def find_near_duplicates(self, bands):
+        return []
+
+    def store_crawled_data(self, data):
+        self._round_trip()
+        self.crawled_data.append(data)
+        return ""
+
+    def log_crawl(self, log_data):
+        self._round_trip()
+        self.crawl_logs.append(log_data)
+        return str(len(self.crawl_logs))
+
+    def bulk_log_crawl(self, logs):
+        self._round_trip()
+        self.crawl_logs.extend(logs)
+        return {"logged": len(logs), "failed": []}
+
+    def get_source_state(self, url):
+        return {}
+
+    def update_source_state(self, url, state):
+        return True
+
+    def get_robots(self, origin):
+        return None
+
+    def save_robots(self, origin, robots):
+        return True
+
+
+def make_handler(delay):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebCrawler.crawl_many")
+    parser.add_argument("--sources", type=int, default=22, help="Number of sources to crawl")
+    parser.add_argument("--delay", type=float, default=0.3, help="Server latency per request (seconds)")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--write-latency", type=float, default=0.0, help="Round trip of every database write")
+    parser.add_argument("--write-behind", action="store_true", help="Store through a BufferedWriter")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    sources = [{
+        "_id": f"bench_{i}",
+        "name": f"Bench source {i}",
+        "url": f"{base_url}/source/{i}",
+        "type": "html",
+        "max_items": 10,
+        "selectors": {"container": ".post", "title": "h2", "content": "p"},
+        # Identical stub pages: storing their snapshots would only measure the disk
+        "snapshot": False
+    } for i in range(args.sources)]
+
+    print(f"🕷️ crawl_many benchmark: {args.sources} sources, {args.delay}s latency each")
+    print(f"{'concurrency':>12} {'wall (s)':>10} {'speedup':>9} {'items':>7} {'writes':>7}")
+
+    baseline = None
+    for level in [int(l) for l in args.levels.split(",")]:
+        db = MemoryDatabase(args.write_latency)
+        # Every stub source shares one host, so lift the per-host politeness limits
+        limiter = HostRateLimiter(requests_per_second=1000, burst=1000, max_in_flight=level)
+        writer = BufferedWriter(db, max_delay=0.05) if args.write_behind else None
+        crawler = WebCrawler(db, rate_limiter=limiter, writer=writer)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            logs = crawler.crawl_many(sources, concurrency=level)
+            if writer is not None:
+                writer.close()
+        elapsed = time.perf_counter() - start
+
+        baseline = baseline or elapsed
+        failed = [log for log in logs if log["status"] != "success"]
+        print(f"{level:>12} {elapsed:>10.2f} {baseline / elapsed:>8.1f}x {len(db.crawled_data):>7}"
+              f" {db.round_trips:>7}"
+              + (f"  ({len(failed)} failed)" if failed else ""))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark the fast RSS/Atom parser against feedparser
+
+Parses every feed in a corpus directory (*.xml, *.rss, *.atom) with both
+parsers and reports the time per feed. Without a corpus, synthetic RSS
+and Atom feeds are generated.
+
+Usage:
+    python scripts/bench_feed_parser.py --save feeds/      # download default RSS sources
+    python scripts/bench_feed_parser.py --corpus feeds/ [--max-items 50]
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import feedparser
+from feed_parser import parse_fast, UnsupportedFeed, etree
+
+
+def synthetic_corpus(items=500):
+    """Generate one large RSS 2.0 and one large Atom feed"""
+    rss_items = "".join(
+        f"<item><title>Story {i}</title><link>https://example.com/{i}</link>"
+        f"<description><![CDATA[<p>Body of story {i} <img src='https://example.com/{i}.jpg'/></p>]]></description>"
+        f"<pubDate>Wed, 14 Oct 2026 08:00:00 GMT</pubDate>"
+        f"<media:content url='https://example.com/m{i}.jpg' type='image/jpeg'/></item>"
+        for i in range(items))
+    rss = (f"<?xml version='1.0'?><rss version='2.0' xmlns:media='http://search.yahoo.com/mrss/'>"
+           f"<channel><title>Synthetic</title>{rss_items}</channel></rss>").encode()
+
+    atom_entries = "".join(
+        f"<entry><title>Entry {i}</title><link href='https://example.com/a{i}'/>"
+        f"<summary>Summary {i}</summary><content type='html'>&lt;p&gt;Content {i}&lt;/p&gt;</content>"
+        f"<published>2026-10-14T08:00:00Z</published></entry>"
+        for i in range(items))
+    atom = (f"<?xml version='1.0'?><feed xmlns='http://www.w3.org/2005/Atom'>"
+            f"<title>Synthetic</title>{atom_entries}</feed>").encode()
+
+    return {"synthetic-rss": rss, "synthetic-atom": atom}
+
+
+def save_default_feeds(directory):
+    """Download the RSS default sources into a corpus directory"""
+    import requests
+    from default_sources import DEFAULT_SOURCES
+
+    os.makedirs(directory, exist_ok=True)
+    for source in DEFAULT_SOURCES:
+        if source["type"] != "rss":
+            continue
+        try:
+            response = requests.get(source["url"], timeout=30, headers={"User-Agent": "Mozilla/5.0"})
+            response.raise_for_status()
+            name = "".join(c if c.isalnum() else "_" for c in source["name"]).strip("_")
+            with open(os.path.join(directory, f"{name}.xml"), "wb") as f:
+                f.write(response.content)
+            print(f"✅ Saved {source['name']}")
+        except Exception as e:
+            print(f"❌ {source['name']}: {e}")
+
+
+def best_of(func, repeat):
+    """Best wall-clock time of several runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fast feed parser vs feedparser")
+    parser.add_argument("--corpus", help="Directory of saved feeds")
+    parser.add_argument("--save", help="Download default RSS sources into this directory and exit")
+    parser.add_argument("--max-items", type=int, default=50, help="max_items used by the crawler")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is kept)")
+    args = parser.parse_args()
+
+    if args.save:
+        save_default_feeds(args.save)
+        return
+
+    if args.corpus:
+        corpus = {}
+        for pattern in ("*.xml", "*.rss", "*.atom"):
+            for path in glob.glob(os.path.join(args.corpus, pattern)):
+                with open(path, "rb") as f:
+                    corpus[os.path.basename(path)] = f.read()
+    else:
+        corpus = synthetic_corpus()
+
+    print(f"📊 Feed parser benchmark ({etree.__name__}, max_items={args.max_items})")
+    print(f"{'feed':<32} {'KB':>7} {'feedparser ms':>14} {'fast ms':>9} {'fast (max) ms':>14} {'speedup':>8}")
+
+    totals = [0.0, 0.0]
+    for name, content in sorted(corpus.items()):
+        slow = best_of(lambda: feedparser.parse(content), args.repeat)
+        try:
+            fast_all = best_of(lambda: parse_fast(content), args.repeat)
+            fast_max = best_of(lambda: parse_fast(content, max_items=args.max_items), args.repeat)
+        except UnsupportedFeed as e:
+            print(f"{name[:32]:<32} {len(content) / 1024:>7.1f} {slow * 1000:>14.2f}   fallback ({e})")
+            totals[0] += slow
+            totals[1] += slow
+            continue
+
+        totals[0] += slow
+        totals[1] += fast_max
+        print(f"{name[:32]:<32} {len(content) / 1024:>7.1f} {slow * 1000:>14.2f} {fast_all * 1000:>9.2f}"
+              f" {fast_max * 1000:>14.2f} {slow / fast_max:>7.1f}x")
+
+    if totals[1]:
+        print(f"\nTotal: feedparser {totals[0] * 1000:.1f} ms, crawler path {totals[1] * 1000:.1f} ms "
+              f"({totals[0] / totals[1]:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Benchmark HTML parser backends on saved pages
+
+Times parse + extraction for every installed BeautifulSoup backend on
+pages saved from the HTML default sources, and reports sources where a
+backend extracts something different from the reference parser.
+
+Usage:
+    python scripts/bench_html_parsers.py --save pages/     # download HTML default sources
+    python scripts/bench_html_parsers.py --pages pages/ [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler_enhanced import EnhancedWebCrawler
+from default_sources import DEFAULT_SOURCES
+from html_parsers import available_parsers, diff_extractions, REFERENCE_PARSER
+
+
+def slug(name):
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_")
+
+
+def save_pages(directory):
+    """Download the HTML default sources, keeping each source's config next to it"""
+    import requests
+
+    os.makedirs(directory, exist_ok=True)
+    for source in DEFAULT_SOURCES:
+        if source["type"] != "html":
+            continue
+        try:
+            response = requests.get(source["url"], timeout=30, headers={"User-Agent": "Mozilla/5.0"})
+            response.raise_for_status()
+            with open(os.path.join(directory, slug(source["name"]) + ".html"), "w", encoding="utf-8") as f:
+                f.write(response.text)
+            with open(os.path.join(directory, slug(source["name"]) + ".json"), "w") as f:
+                json.dump(source, f)
+            print(f"✅ Saved {source['name']} ({len(response.text) / 1024:.0f} KB)")
+        except Exception as e:
+            print(f"❌ {source['name']}: {e}")
+
+
+def load_pages(directory):
+    """Saved (source, markup) pairs"""
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".html"):
+            continue
+        config_path = os.path.join(directory, name[:-5] + ".json")
+        source = {"url": "http://example.com/", "type": "html", "selectors": {}}
+        if os.path.exists(config_path):
+            with open(config_path) as f:
+                source = json.load(f)
+        source["_id"] = name[:-5]
+        with open(os.path.join(directory, name), encoding="utf-8") as f:
+            pages.append((source, f.read()))
+    return pages
+
+
+def synthetic_pages():
+    """A large front page when no saved pages are available"""
+    blocks = "".join(
+        f"<article class='post'><h2 class='title'>Story {i}</h2><img src='/img/{i}.jpg' alt='{i}'>"
+        f"<div class='body'><p>{'Lorem ipsum dolor sit amet. ' * 20}</p></div></article>"
+        for i in range(400))
+    source = {"_id": "synthetic", "url": "http://example.com/", "type": "html", "max_items": 20,
+              "selectors": {"container": ".post", "title": ".title", "content": ".body"}}
+    return [(source, f"<html><head><title>Front</title></head><body>{blocks}</body></html>")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML parser backends")
+    parser.add_argument("--pages", help="Directory of saved pages")
+    parser.add_argument("--save", help="Download HTML default sources into this directory and exit")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--full", action="store_true", help="Disable partial (container-only) parsing")
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.save)
+        return
+
+    pages = load_pages(args.pages) if args.pages else synthetic_pages()
+    for source, _ in pages:
+        source["partial_parse"] = not args.full
+    parsers = available_parsers()
+    crawler = EnhancedWebCrawler(None)
+
+    mode = "full" if args.full else "partial"
+    print(f"📊 HTML parser benchmark ({len(pages)} pages, {mode} parse + extraction, ms)")
+    print(f"{'page':<32} {'KB':>7} " + " ".join(f"{p:>12}" for p in parsers))
+
+    totals = {p: 0.0 for p in parsers}
+    mismatches = []
+    for source, markup in pages:
+        timings = {}
+        results = {}
+        for backend in parsers:
+            best = float("inf")
+            for _ in range(args.repeat):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    results[backend] = crawler._extract_html(source, source["url"], markup, backend)
+                    best = min(best, time.perf_counter() - start)
+            timings[backend] = best
+            totals[backend] += best
+
+        print(f"{source['_id'][:32]:<32} {len(markup) / 1024:>7.1f} "
+              + " ".join(f"{timings[p] * 1000:>12.1f}" for p in parsers))
+
+        for backend in parsers:
+            if backend != REFERENCE_PARSER and REFERENCE_PARSER in results:
+                difference = diff_extractions(results[REFERENCE_PARSER], results[backend])
+                if difference:
+                    mismatches.append(f"{source['_id']}: {backend} vs {REFERENCE_PARSER}: {difference}")
+
+    print(f"{'TOTAL':<32} {'':>7} " + " ".join(f"{totals[p] * 1000:>12.1f}" for p in parsers))
+
+    if mismatches:
+        print("\n⚠️ Extraction differences:")
+        for line in mismatches:
+            print(f"   {line}")
+    else:
+        print("\n✅ All backends extracted identical items")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark near-duplicate detection against a MongoDB band index
+
+Fills a scratch collection with the MinHash band keys of --items synthetic
+stories (multikey index, as on crawled_data), then times signing new items
+and looking up their candidates, for copies and for unrelated stories.
+The scratch collection is dropped at the end.
+
+Usage:
+    python scripts/bench_near_duplicates.py [--items 1000000] [--lookups 1000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import ASCENDING
+from database import CrawlerDatabase
+from near_duplicate import minhash, minhash_bands, similarity, MIN_SIMILARITY
+
+VOCABULARY = [f"word{i}" for i in range(20000)]
+
+
+def story(rng, words=80):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def reword(rng, text, changes=6):
+    words = text.split()
+    for _ in range(changes):
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000000, help="canonical items in the index")
+    parser.add_argument("--lookups", type=int, default=1000, help="items looked up per kind")
+    parser.add_argument("--batch", type=int, default=50, help="items per lookup query (one crawl)")
+    args = parser.parse_args()
+
+    db = CrawlerDatabase()
+    if db.db is None:
+        sys.exit("MongoDB is required for this benchmark")
+    collection = db.db.near_duplicate_bench
+    collection.drop()
+    collection.create_index([("minhash_bands", ASCENDING)], sparse=True)
+
+    rng = random.Random(1)
+    texts = []
+    start = time.perf_counter()
+    batch = []
+    for i in range(args.items):
+        text = story(rng)
+        if len(texts) < args.lookups:
+            texts.append(text)
+        signature = minhash(text)
+        batch.append({"fingerprint": str(i), "minhash": signature, "minhash_bands": minhash_bands(signature)})
+        if len(batch) == 10000:
+            collection.insert_many(batch)
+            batch = []
+            print(f"\r⏳ Indexed {i + 1:,} items", end="", flush=True)
+    if batch:
+        collection.insert_many(batch)
+    print(f"\r✅ Indexed {args.items:,} items in {time.perf_counter() - start:.0f}s")
+
+    for kind, queries in (("copies", [reword(rng, text) for text in texts]),
+                          ("unrelated", [story(rng) for _ in texts])):
+        started = time.perf_counter()
+        signatures = [minhash(text) for text in queries]
+        signed = time.perf_counter()
+
+        candidates = 0
+        found = 0
+        for offset in range(0, len(signatures), args.batch):
+            chunk = signatures[offset:offset + args.batch]
+            bands = list({band for signature in chunk for band in minhash_bands(signature)})
+            results = list(collection.find({"minhash_bands": {"$in": bands}},
+                                           {"_id": 0, "fingerprint": 1, "minhash": 1}))
+            candidates += len(results)
+            found += sum(1 for signature in chunk
+                         if any(similarity(signature, result["minhash"]) >= MIN_SIMILARITY for result in results))
+        looked_up = time.perf_counter()
+
+        print(f"{kind:<10} sign {(signed - started) * 1000 / len(queries):.3f} ms/item, "
+              f"lookup {(looked_up - signed) * 1000 / len(queries):.3f} ms/item, "
+              f"{candidates / len(queries):.2f} candidates/item, {found / len(queries):.1%} matched")
+
+    collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark dashboard cold start
+
+Times fresh interpreters (so nothing is cached in sys.modules) importing the
+crawler modules and the Flask app, and constructing CrawlerDatabase against
+an unreachable MongoDB both blocking and in the background. With
+--importtime, lists the slowest imports of app.py.
+
+Usage:
+    python scripts/bench_startup.py [--runs 5] [--importtime]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nothing listens on port 1: every connection attempt is refused
+UNREACHABLE = "mongodb://127.0.0.1:1/"
+
+SCENARIOS = [
+    ("import crawler_enhanced", "import crawler_enhanced"),
+    ("import app (Mongo down)", "import app"),
+    ("CrawlerDatabase() blocking (Mongo down)", "from database import CrawlerDatabase; CrawlerDatabase()"),
+    ("CrawlerDatabase(background=True) (Mongo down)",
+     "from database import CrawlerDatabase; CrawlerDatabase(background=True)"),
+]
+
+
+def environment():
+    env = dict(os.environ, MONGODB_URI=UNREACHABLE, PYTHONDONTWRITEBYTECODE="1")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def time_run(code, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def slowest_imports(env, limit=15):
+    """Direct imports of app.py by cumulative import time"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # A module is reported after everything it imports
+        if depth == 1:
+            children.append((int(cumulative), name.strip()))
+        elif depth == 0:
+            if name.strip() == "app":
+                return sorted(children, reverse=True)[:limit]
+            children = []
+    return []
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per scenario (median is reported)")
+    parser.add_argument("--importtime", action="store_true", help="List the slowest imports of app.py")
+    args = parser.parse_args()
+    env = environment()
+
+    # Baseline: a bare interpreter
+    bare = statistics.median(time_run("pass", env) for _ in range(args.runs))
+    print(f"🚀 Cold start benchmark ({args.runs} runs each, median wall time)")
+    print(f"{'scenario':<48} {'wall (s)':>9} {'+python (s)':>12}")
+    print(f"{'python -c pass':<48} {bare:>9.3f} {0:>12.3f}")
+    for label, code in SCENARIOS:
+        wall = statistics.median(time_run(code, env) for _ in range(args.runs))
+        print(f"{label:<48} {wall:>9.3f} {wall - bare:>12.3f}")
+
+    if args.importtime:
+        print("\nSlowest imports of app.py (cumulative ms):")
+        for microseconds, name in slowest_imports(env):
+            print(f"{microseconds / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
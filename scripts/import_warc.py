@@ -0,0 +1,43 @@
+"""
+Load archived WARC responses back into the crawler's caches
+
+--cache fills the response cache so sources can be crawled with
+CRAWLER_RESPONSE_CACHE=replay; --snapshots restores page snapshots
+the re-extraction job (scripts/reextract.py) reports as missing.
+
+Usage:
+    python scripts/import_warc.py --cache data/warc/*.warc.gz
+    python scripts/import_warc.py --snapshots data/warc/*.warc.gz
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_cache import get_default_cache
+from snapshot_store import get_default_store
+from warc_archive import load_into_cache, restore_snapshots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="+", help="WARC files (.warc or .warc.gz)")
+    parser.add_argument("--cache", action="store_true", help="Store responses in the response cache")
+    parser.add_argument("--snapshots", action="store_true", help="Restore bodies into the snapshot store")
+    args = parser.parse_args()
+
+    if not (args.cache or args.snapshots):
+        parser.error("choose --cache and/or --snapshots")
+
+    if args.cache:
+        stored = load_into_cache(args.files, get_default_cache())
+        print(f"✅ {stored} responses stored in the response cache")
+    if args.snapshots:
+        restored = restore_snapshots(args.files, get_default_store())
+        print(f"✅ {restored} snapshots restored")
+
+
+if __name__ == "__main__":
+    main()
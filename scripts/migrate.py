@@ -0,0 +1,43 @@
+"""
+Apply (or list) pending schema migrations
+
+Connecting applies them too unless MONGODB_AUTO_MIGRATE=false; this script
+runs them as a separate deployment step.
+
+Usage:
+    python scripts/migrate.py [--status]
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MONGODB_AUTO_MIGRATE", "false")
+
+from database import CrawlerDatabase
+from migrations import MIGRATIONS, applied_versions, migrate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="List migrations without applying them")
+    args = parser.parse_args()
+
+    db = CrawlerDatabase()
+    if db.db is None:
+        sys.exit("❌ MongoDB is not available")
+
+    if args.status:
+        applied = set(applied_versions(db.db))
+        for version, name, _ in MIGRATIONS:
+            print(f"{'✅' if version in applied else '⏳'} {version:>3} {name}")
+        return
+
+    applied = migrate(db.db)
+    print(f"✅ {len(applied)} migration(s) applied" if applied else "✅ Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
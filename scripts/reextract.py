@@ -0,0 +1,55 @@
+"""
+Re-extract crawled items from stored page snapshots
+
+Runs the current selectors of one or all sources over every snapshot
+kept for them and replaces the matching items in crawled_data.
+
+Usage:
+    python scripts/reextract.py --source <source_id> [--workers 8]
+    python scripts/reextract.py --all
+"""
+import argparse
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import CrawlerDatabase
+from reextract import reextract, DEFAULT_WORKERS, BATCH_SIZE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--source", action="append", help="Source ID (repeatable)")
+    target.add_argument("--all", action="store_true", help="Every source with snapshots")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    db = CrawlerDatabase()
+    if db.snapshots is None:
+        sys.exit("❌ MongoDB is not available")
+
+    if args.all:
+        sources = db.get_all_sources()
+    else:
+        sources = [db.get_source(source_id) for source_id in args.source]
+        missing = [source_id for source_id, source in zip(args.source, sources) if source is None]
+        if missing:
+            sys.exit(f"❌ Unknown source: {', '.join(missing)}")
+
+    print(f"🔁 Re-extracting snapshots of {len(sources)} source(s) with {args.workers} workers...")
+    stats = reextract(db, sources, workers=args.workers, batch_size=args.batch_size)
+
+    for error in stats["errors"][:20]:
+        print(f"   ⚠️ {error}")
+    print(f"✅ {stats['snapshots']} snapshots in {stats['elapsed']:.1f}s ({stats['per_minute']}/min): "
+          f"{stats['deleted']} items replaced by {stats['inserted']}, "
+          f"{stats['missing']} missing bodies, {stats['failed']} failed")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compiled Selector Cache
+CSS selectors compiled once per source configuration and reused
+
+Entries are keyed by source id and a hash of the source's selectors, so
+they are shared across containers and scheduled runs. A changed selector
+set gets a new key automatically; CrawlerDatabase.update_source also
+drops the old entries of a source when its selectors are updated.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+
+import soupsieve
+
+# Source configurations kept compiled (least recently used are evicted first)
+MAX_ENTRIES = 512
+
+
+def selectors_hash(selectors: Dict[str, str]) -> str:
+    """Stable hash of a selectors document"""
+    encoded = json.dumps(selectors, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+class SelectorCache:
+    """Thread-safe LRU cache of compiled soupsieve patterns"""
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, source_id: Any, selectors: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Compiled patterns for a source's selectors
+
+        Args:
+            source_id: Source the selectors belong to
+            selectors: Field name -> CSS selector (including "container")
+
+        Returns:
+            Field name -> compiled pattern (with .select / .select_one)
+        """
+        key = (str(source_id), selectors_hash(selectors))
+
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # Compile outside the lock; a concurrent duplicate compile is harmless
+        compiled = {field: soupsieve.compile(selector) for field, selector in selectors.items()}
+
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def invalidate(self, source_id: Any):
+        """Drop every compiled selector set of a source"""
+        source_id = str(source_id)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == source_id]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+# Shared by every crawler instance in the process
+selector_cache = SelectorCache()
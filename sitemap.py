@@ -0,0 +1,95 @@
+"""
+Sitemap Helpers
+Sitemap discovery and streaming parsing for `sitemap` sources
+
+Sitemaps are found through the Sitemap: lines of the cached robots.txt
+(falling back to /sitemap.xml), sitemap indexes are followed, and every
+file is parsed incrementally, gzipped or not, so 50k-URL sitemaps never
+sit in memory.
+"""
+import gzip
+import io
+from datetime import datetime, timezone
+from typing import Iterator, Optional, Tuple
+from urllib.parse import urlsplit
+
+from xml_stream import etree, ITERPARSE_OPTIONS, split_tag, release
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Nested sitemap indexes followed at most this deep
+MAX_INDEX_DEPTH = 3
+
+# Runs in which a failing page holds back the watermark before it is given up
+MAX_PAGE_ATTEMPTS = 3
+
+
+def is_sitemap_url(url: str) -> bool:
+    """The URL points at a sitemap file rather than a site"""
+    path = urlsplit(url).path.lower()
+    return path.endswith((".xml", ".xml.gz", ".gz")) or "sitemap" in path.rsplit("/", 1)[-1]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a W3C datetime (2026-10-14, 2026-10-14T08:00:00Z, ...+02:00)
+
+    Returns an aware UTC datetime, or None when missing or malformed.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith(("Z", "z")):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def open_sitemap(stream) -> io.BufferedIOBase:
+    """Binary stream of the sitemap XML, transparently un-gzipping .xml.gz files"""
+    buffered = io.BufferedReader(stream) if not hasattr(stream, "peek") else stream
+    if buffered.peek(2)[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=buffered)
+    return buffered
+
+
+def iter_sitemap(stream) -> Iterator[Tuple[str, str, Optional[datetime]]]:
+    """
+    Yield the entries of a sitemap or sitemap index while it is parsed
+
+    Args:
+        stream: Binary file object (e.g. ResponseStream), gzipped or not
+
+    Yields:
+        (kind, loc, lastmod) with kind "url" for <url> entries and
+        "sitemap" for <sitemap> entries of an index
+    """
+    loc = None
+    lastmod = None
+    # Local names of the open elements (image:loc and friends must not count)
+    path = []
+
+    for event, elem in etree.iterparse(open_sitemap(stream), events=("start", "end"), **ITERPARSE_OPTIONS):
+        name = split_tag(elem.tag)[1]
+        if event == "start":
+            path.append(name)
+            continue
+
+        path.pop()
+        parent = path[-1] if path else None
+
+        if name == "loc" and parent in ("url", "sitemap"):
+            loc = (elem.text or "").strip()
+        elif name == "lastmod" and parent in ("url", "sitemap"):
+            lastmod = parse_lastmod(elem.text)
+        elif name in ("url", "sitemap") and parent in ("urlset", "sitemapindex"):
+            if loc:
+                yield name, loc, lastmod
+            loc = None
+            lastmod = None
+            release(elem)
@@ -0,0 +1,198 @@
+"""
+Raw Snapshot Store
+Compressed, content-addressed copies of the page bodies behind crawled items
+
+Every body is stored once per SHA-256 hash on local disk, compressed with
+zstd when the zstandard package is installed and gzip otherwise. Crawled
+items keep the hash of the snapshot they were extracted from (the
+"snapshot" field), so a selector fix can be replayed over past pages with
+the re-extraction job (reextract.py) instead of crawling again.
+
+The store is capped at CRAWLER_SNAPSHOT_MAX_MB: past it, the snapshots
+least recently stored or seen again are deleted (their items are reported
+as missing bodies by re-extraction).
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_DIRECTORY = os.getenv('CRAWLER_SNAPSHOT_DIR', os.path.join('data', 'snapshots'))
+
+# Keep raw bodies of html and xml sources (per source: "snapshot": true/false)
+SNAPSHOTS_ENABLED = os.getenv('CRAWLER_SNAPSHOTS', 'true').lower() == 'true'
+
+# Oldest snapshots are deleted once the store is larger than this (0: unlimited)
+DEFAULT_MAX_BYTES = int(float(os.getenv('CRAWLER_SNAPSHOT_MAX_MB', 1024)) * 1024 * 1024)
+
+# Pruning frees space down to this fraction of the limit, so it does not run on every put
+PRUNE_TARGET = 0.9
+
+# zstd level 3 compresses HTML about as well as gzip -6 at several times the speed
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+CODEC_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+
+def default_codec() -> str:
+    configured = os.getenv('CRAWLER_SNAPSHOT_CODEC')
+    if configured == "zstd" and zstandard is None:
+        print("⚠️ zstandard is not installed, storing snapshots with gzip")
+        return "gzip"
+    if configured in CODEC_EXTENSIONS:
+        return configured
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def compress(body: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read zstd snapshots")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotStore:
+    """Content-addressed snapshot files under a local directory"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, codec: Optional[str] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.codec = codec or default_codec()
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        # Bytes on disk, counted on the first write
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+        self.pruned = 0
+
+    def path(self, digest: str, codec: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest + CODEC_EXTENSIONS[codec])
+
+    def _find(self, digest: str) -> Optional[tuple]:
+        """(path, codec) of a stored snapshot, whatever codec it was written with"""
+        for codec in CODEC_EXTENSIONS:
+            path = self.path(digest, codec)
+            if os.path.exists(path):
+                return path, codec
+        return None
+
+    def put(self, body: bytes) -> Dict[str, Any]:
+        """
+        Store a body unless an identical one is already stored
+
+        Returns:
+            {"hash", "size", "stored": False when deduplicated}
+        """
+        digest = hashlib.sha256(body).hexdigest()
+        found = self._find(digest)
+        if found:
+            # Seen again: pruned last
+            try:
+                os.utime(found[0])
+            except FileNotFoundError:
+                pass
+            return {"hash": digest, "size": len(body), "stored": False}
+
+        path = self.path(digest, self.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".incoming_")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                f.write(compress(body, self.codec))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        if self.max_bytes:
+            self._account(os.path.getsize(path))
+        return {"hash": digest, "size": len(body), "stored": True}
+
+    def get(self, digest: str) -> bytes:
+        """Raw body of a snapshot; raises KeyError when it is not stored"""
+        found = self._find(digest)
+        if found is None:
+            raise KeyError(f"Snapshot not found: {digest}")
+        path, codec = found
+        with open(path, "rb") as f:
+            return decompress(f.read(), codec)
+
+    def __contains__(self, digest: str) -> bool:
+        return self._find(digest) is not None
+
+    # ==================== RETENTION ====================
+
+    def _files(self):
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                for snapshot in os.scandir(entry.path):
+                    if snapshot.is_file() and not snapshot.name.startswith(".incoming_"):
+                        yield snapshot
+
+    def disk_usage(self) -> int:
+        """Compressed bytes of every stored snapshot"""
+        return sum(snapshot.stat().st_size for snapshot in self._files())
+
+    def _account(self, size: int):
+        with self._lock:
+            self._size = self.disk_usage() if self._size is None else self._size + size
+            if self._size > self.max_bytes:
+                self.prune()
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Delete the least recently stored or seen snapshots until the store
+        fits in PRUNE_TARGET of max_bytes
+
+        Returns:
+            Number of snapshots deleted
+        """
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        snapshots = sorted(((entry.stat(), entry.path) for entry in self._files()),
+                           key=lambda snapshot: snapshot[0].st_mtime_ns)
+        total = sum(stat.st_size for stat, _ in snapshots)
+        target = int(limit * PRUNE_TARGET)
+
+        removed = 0
+        for stat, path in snapshots:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= stat.st_size
+            removed += 1
+
+        self._size = total
+        self.pruned += removed
+        if removed:
+            print(f"🧹 Pruned {removed} old snapshot{'s' if removed != 1 else ''} "
+                  f"({total / 1024 / 1024:.1f} MB kept)")
+        return removed
+
+
+_default_store = None
+
+
+def get_default_store() -> SnapshotStore:
+    """Store in CRAWLER_SNAPSHOT_DIR, created on first use"""
+    global _default_store
+    if _default_store is None:
+        _default_store = SnapshotStore()
+    return _default_store
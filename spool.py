@@ -0,0 +1,310 @@
+"""
+Local Disk Spool
+Keeps crawl results that could not be written to MongoDB, and loads them later
+
+When MongoDB is unreachable or a write fails, a crawl's items, fetch state
+and log are appended to the spool instead of being discarded: segments of
+gzip-compressed NDJSON (one gzip member per crawl, MongoDB extended JSON so
+ObjectIds and dates survive) under CRAWLER_SPOOL_DIR, rotated at
+CRAWLER_SPOOL_SEGMENT_BYTES. A replay thread reconnects every
+CRAWLER_SPOOL_REPLAY_INTERVAL seconds and bulk-loads closed segments in
+order, items before the fetch state that depends on them; a segment is
+deleted once fully written. Items are upserted by fingerprint, so a segment
+replayed twice (e.g. after a crash) stores no duplicate items.
+"""
+import atexit
+import glob
+import gzip
+import os
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Any, Optional, Iterator
+
+from bson import json_util
+
+from near_duplicate import NearDuplicateIndex, OFF
+
+SPOOL_ENABLED = os.getenv('CRAWLER_SPOOL', 'true').lower() == 'true'
+DEFAULT_DIRECTORY = os.getenv('CRAWLER_SPOOL_DIR', 'data/spool')
+DEFAULT_SEGMENT_BYTES = int(os.getenv('CRAWLER_SPOOL_SEGMENT_BYTES', 64 * 1024 * 1024))
+REPLAY_INTERVAL = float(os.getenv('CRAWLER_SPOOL_REPLAY_INTERVAL', 30))
+
+# Items bulk-loaded per write during replay
+REPLAY_BATCH = 1000
+
+SEGMENT_SUFFIX = ".ndjson.gz"
+OPEN_SUFFIX = ".open"
+CLAIM_SUFFIX = ".replaying"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class DiskSpool:
+    """Append-only, size-rotated spool of crawl results"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_SEGMENT_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._size = 0
+        self._serial = 0
+
+        # Metrics
+        self.crawls_spooled = 0
+        self.items_spooled = 0
+        self.crawls_replayed = 0
+        self.items_replayed = 0
+        self.replay_errors = 0
+        self._recover()
+
+    # ==================== WRITING ====================
+
+    def spool_crawl(self, items: List[Dict[str, Any]], states: Optional[Dict[str, Dict[str, Any]]] = None,
+                    log: Optional[Dict[str, Any]] = None, near_duplicates: str = OFF):
+        """
+        Append the results of one crawl (as a single gzip member)
+
+        Args:
+            items: Items that could not be stored
+            states: url -> fetch state, applied after the items on replay
+            log: Crawl log to insert on replay
+            near_duplicates: Near-duplicate mode of the source, applied on replay
+        """
+        records = []
+        if items:
+            records.append({"kind": "items", "near_duplicates": near_duplicates, "items": items})
+        for url, state in (states or {}).items():
+            records.append({"kind": "state", "url": url, "state": state})
+        if log is not None:
+            records.append({"kind": "log", "log": {name: value for name, value in log.items() if name != "_id"}})
+        if not records:
+            return
+
+        lines = "".join(json_util.dumps(record) + "\n" for record in records)
+        member = gzip.compress(lines.encode("utf-8"))
+        with self._lock:
+            if self._path is None:
+                self._open_segment()
+            with open(self._path, "ab") as f:
+                f.write(member)
+                f.flush()
+                os.fsync(f.fileno())
+            self._size += len(member)
+            self.crawls_spooled += 1
+            self.items_spooled += len(items)
+            if self._size >= self.max_bytes:
+                self._close_segment()
+        print(f"💾 Spooled {len(items)} item{'s' if len(items) != 1 else ''} to {self.directory} "
+              f"(replayed once MongoDB is back)")
+
+    def _open_segment(self):
+        self._serial += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        name = f"spool-{stamp}-{os.getpid()}-{self._serial:05d}{SEGMENT_SUFFIX}"
+        self._path = os.path.join(self.directory, name + OPEN_SUFFIX)
+        self._size = 0
+
+    def _close_segment(self):
+        if self._path is not None and os.path.exists(self._path):
+            os.replace(self._path, self._path[:-len(OPEN_SUFFIX)])
+        self._path = None
+
+    def close(self):
+        """Close the current segment so it can be replayed"""
+        with self._lock:
+            self._close_segment()
+
+    def _recover(self):
+        """Close segments left open (or claimed) by processes that are gone"""
+        for suffix in (OPEN_SUFFIX, CLAIM_SUFFIX):
+            for path in glob.glob(os.path.join(self.directory, f"*{SEGMENT_SUFFIX}{suffix}*")):
+                try:
+                    pid = int(path.rsplit("-", 1)[1] if suffix == CLAIM_SUFFIX else path.split("-")[-2])
+                except (IndexError, ValueError):
+                    continue
+                if pid != os.getpid() and not _alive(pid):
+                    os.replace(path, path[:path.index(SEGMENT_SUFFIX) + len(SEGMENT_SUFFIX)])
+
+    # ==================== READING ====================
+
+    def segments(self) -> List[str]:
+        """Closed segments, oldest first"""
+        return sorted(glob.glob(os.path.join(self.directory, f"*{SEGMENT_SUFFIX}")))
+
+    def pending(self) -> bool:
+        with self._lock:
+            return self._path is not None or bool(self.segments())
+
+    @staticmethod
+    def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+        """Records of a segment; a member cut short by a crash ends the segment"""
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        yield json_util.loads(line)
+                    except ValueError:
+                        print(f"⚠️ Skipping unreadable spool record in {path}")
+        except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+            print(f"⚠️ Spool segment {path} is truncated: {e}")
+
+    # ==================== REPLAY ====================
+
+    def replay(self, db) -> Dict[str, int]:
+        """
+        Bulk-load every spooled crawl into the database
+
+        Stops at the first segment that cannot be written (MongoDB down
+        again); it stays in the spool for the next replay.
+
+        Returns:
+            {"segments", "crawls", "items", "failed_segments"}
+        """
+        stats = {"segments": 0, "crawls": 0, "items": 0, "failed_segments": 0}
+        if db.crawled_data is None:
+            return stats
+        self.close()
+
+        near_duplicates = NearDuplicateIndex(db)
+        for path in self.segments():
+            # Claimed by renaming, so two processes never load the same segment
+            claimed = f"{path}{CLAIM_SUFFIX}-{os.getpid()}"
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue
+
+            try:
+                loaded = self._load_segment(db, claimed, near_duplicates)
+            except Exception as e:
+                print(f"⚠️ Could not replay spool segment {path}: {e}")
+                loaded = None
+            if loaded is None:
+                os.replace(claimed, path)
+                stats["failed_segments"] += 1
+                self.replay_errors += 1
+                break
+
+            os.remove(claimed)
+            stats["segments"] += 1
+            stats["crawls"] += loaded["crawls"]
+            stats["items"] += loaded["items"]
+            self.crawls_replayed += loaded["crawls"]
+            self.items_replayed += loaded["items"]
+
+        if stats["segments"]:
+            print(f"✅ Replayed {stats['items']} spooled items from {stats['segments']} segment(s)")
+        return stats
+
+    def _load_segment(self, db, path: str, near_duplicates: NearDuplicateIndex) -> Optional[Dict[str, int]]:
+        """Write one segment in order; None if a write failed"""
+        counts = {"crawls": 0, "items": 0}
+        pending_items: List[Dict[str, Any]] = []
+        logs: List[Dict[str, Any]] = []
+
+        def store_items() -> bool:
+            if not pending_items:
+                return True
+            stored = db.bulk_store_data(pending_items)
+            if stored.get("failed"):
+                return False
+            counts["items"] += len(pending_items)
+            pending_items.clear()
+            return True
+
+        for record in self.iter_records(path):
+            kind = record.get("kind")
+            if kind == "items":
+                items, _ = near_duplicates.process(record["items"], record.get("near_duplicates", OFF))
+                pending_items.extend(items)
+                if len(pending_items) >= REPLAY_BATCH and not store_items():
+                    return None
+            elif kind == "state":
+                # Fetch state only ever follows the items it describes
+                if not store_items() or not db.update_source_state(record["url"], record["state"]):
+                    return None
+            elif kind == "log":
+                logs.append(dict(record["log"], replayed=True))
+                counts["crawls"] += 1
+
+        if not store_items():
+            return None
+        if logs and db.crawl_logs is not None and db.bulk_log_crawl(logs)["failed"]:
+            return None
+        return counts
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self.segments()
+        return {
+            "segments": len(segments) + (1 if self._path is not None else 0),
+            "bytes": sum(os.path.getsize(path) for path in segments) + self._size,
+            "crawls_spooled": self.crawls_spooled,
+            "items_spooled": self.items_spooled,
+            "crawls_replayed": self.crawls_replayed,
+            "items_replayed": self.items_replayed,
+            "replay_errors": self.replay_errors
+        }
+
+
+class SpoolReplayer:
+    """Background thread reconnecting to MongoDB and replaying the spool"""
+
+    def __init__(self, db, spool: DiskSpool, interval: float = REPLAY_INTERVAL):
+        self.db = db
+        self.spool = spool
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spool-replay", daemon=True)
+        self._thread.start()
+
+    def run_once(self) -> Optional[Dict[str, int]]:
+        if not self.spool.pending():
+            return None
+        if self.db.crawled_data is None and not self.db.connect(quiet=True):
+            return None
+        return self.spool.replay(self.db)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Spool replay failed: {e}")
+
+    def stop(self):
+        self._stop.set()
+
+
+_default_spool: Optional[DiskSpool] = None
+_replayers: Dict[int, SpoolReplayer] = {}
+_default_lock = threading.Lock()
+
+
+def get_default_spool() -> DiskSpool:
+    """Process-wide spool in CRAWLER_SPOOL_DIR, whose open segment is closed at exit"""
+    global _default_spool
+    with _default_lock:
+        if _default_spool is None:
+            _default_spool = DiskSpool()
+            atexit.register(_default_spool.close)
+        return _default_spool
+
+
+def start_replayer(db, spool: DiskSpool) -> SpoolReplayer:
+    """Start (once per database) the background replay of a spool"""
+    with _default_lock:
+        replayer = _replayers.get(id(db))
+        if replayer is None:
+            replayer = _replayers[id(db)] = SpoolReplayer(db, spool)
+        return replayer
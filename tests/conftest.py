@@ -0,0 +1,153 @@
+"""Shared fixtures for the offline crawler tests"""
+import sys
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fingerprint import fingerprint_item
+
+
+class MemoryDatabase:
+    """In-memory stand-in for CrawlerDatabase"""
+
+    def __init__(self):
+        self.crawled_data = []
+        self.crawl_logs = []
+        self.state = {}
+        self.robots = {}
+        self.snapshots = {}
+
+    def bulk_store_data(self, data_list):
+        """Upsert by fingerprint like CrawlerDatabase"""
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        stored = {item.get("fingerprint"): index for index, item in enumerate(self.crawled_data)}
+        for data in data_list:
+            fingerprint_item(data)
+            index = stored.get(data["fingerprint"])
+            if index is None:
+                stored[data["fingerprint"]] = len(self.crawled_data)
+                self.crawled_data.append(data)
+                counts["inserted"] += 1
+            elif self.crawled_data[index]["content_hash"] != data["content_hash"]:
+                self.crawled_data[index] = data
+                counts["updated"] += 1
+            else:
+                counts["unchanged"] += 1
+        return counts
+
+    def find_near_duplicates(self, bands):
+        bands = set(bands)
+        fields = ("fingerprint", "minhash", "minhash_bands", "source_id", "snapshot")
+        return [{name: item.get(name) for name in fields} for item in self.crawled_data
+                if bands.intersection(item.get("minhash_bands") or ())]
+
+    def store_crawled_data(self, data):
+        self.bulk_store_data([data])
+        return ""
+
+    def log_crawl(self, log_data):
+        self.crawl_logs.append(log_data)
+        return str(len(self.crawl_logs))
+
+    def bulk_log_crawl(self, logs):
+        self.crawl_logs.extend(logs)
+        return {"logged": len(logs), "failed": []}
+
+    def get_source_state(self, url):
+        return dict(self.state.get(url, {}))
+
+    def update_source_state(self, url, state):
+        self.state.setdefault(url, {}).update(state)
+        return True
+
+    def get_robots(self, origin):
+        return self.robots.get(origin)
+
+    def save_robots(self, origin, robots):
+        self.robots[origin] = dict(robots, origin=origin)
+        return True
+
+    def save_snapshot(self, snapshot):
+        key = (snapshot["source_id"], snapshot["url"], snapshot["hash"])
+        self.snapshots.setdefault(key, {}).update(snapshot)
+        return True
+
+    def iter_snapshots(self, source_id=None):
+        snapshots = [dict(s) for s in self.snapshots.values() if not source_id or s["source_id"] == source_id]
+        return iter(sorted(snapshots, key=lambda s: s["fetched_at"]))
+
+    def replace_snapshot_items(self, results):
+        deleted = 0
+        inserted = 0
+        for snapshot, items in results:
+            kept = [item for item in self.crawled_data
+                    if (item.get("source_id"), item.get("source_url"), item.get("snapshot"))
+                    != (snapshot["source_id"], snapshot["url"], snapshot["hash"])]
+            deleted += len(self.crawled_data) - len(kept)
+            self.crawled_data = kept + list(items)
+            inserted += len(items)
+        return {"deleted": deleted, "inserted": inserted}
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    """Keep page snapshots of every test in its own temporary store"""
+    import snapshot_store
+    store = snapshot_store.SnapshotStore(str(tmp_path / "snapshots"))
+    monkeypatch.setattr(snapshot_store, "_default_store", store)
+    return store
+
+
+@pytest.fixture(autouse=True)
+def spool_dir(tmp_path, monkeypatch):
+    """Spool the results a test cannot store into its own temporary directory"""
+    import spool
+    disk_spool = spool.DiskSpool(str(tmp_path / "spool"))
+    monkeypatch.setattr(spool, "_default_spool", disk_spool)
+    return disk_spool
+
+
+@pytest.fixture
+def memory_db():
+    return MemoryDatabase()
+
+
+@pytest.fixture
+def stub_server():
+    """
+    Local HTTP server serving the `routes` dict: path -> (status, headers, body)
+
+    Every request is recorded in `requests` as (path, headers).
+    """
+    routes = {}
+    seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            seen.append((self.path, dict(self.headers)))
+            route = routes.get(self.path)
+            if callable(route):
+                route = route(self)
+            status, headers, body = route or (404, {}, b"not found")
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.routes = routes
+    server.requests = seen
+    yield server
+    server.shutdown()
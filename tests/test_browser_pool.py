@@ -0,0 +1,163 @@
+"""Test the headless browser pool with fake drivers (offline)"""
+import sys
+import os
+import threading
+import time
+
+import pytest
+from bs4 import BeautifulSoup
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_pool import BrowserPool, BrowserPoolTimeout
+from crawler import WebCrawler
+from page_readiness import COUNT_SCRIPT
+
+
+class FakeDriver:
+    """Just enough of a Selenium driver for the pool and _crawl_dynamic"""
+
+    def __init__(self, page_source="", heap_bytes=10 * 1024 * 1024):
+        self.page_source = page_source
+        self.heap_bytes = heap_bytes
+        self.alive = True
+        self.visited = []
+
+    def execute_script(self, script, *args):
+        if not self.alive:
+            raise RuntimeError("browser crashed")
+        if script == "return 1":
+            return 1
+        if script == COUNT_SCRIPT:
+            return len(BeautifulSoup(self.page_source, "html.parser").select(args[0]))
+        return self.heap_bytes
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        self.alive = False
+
+
+def make_pool(**kwargs):
+    drivers = []
+    page_source = kwargs.pop("page_source", "")
+
+    def factory():
+        driver = FakeDriver(page_source)
+        drivers.append(driver)
+        return driver
+
+    return BrowserPool(factory=factory, **kwargs), drivers
+
+
+def test_browser_is_reused():
+    """Consecutive borrows share one warm browser"""
+    pool, drivers = make_pool(max_size=2)
+    for _ in range(3):
+        with pool.borrow() as driver:
+            driver.get("https://example.com/")
+
+    assert len(drivers) == 1
+    assert drivers[0].visited[-1] == "about:blank"
+    assert pool.stats()["reused"] == 2
+
+
+def test_recycled_after_max_pages():
+    """A browser is quit and replaced after max_pages pages"""
+    pool, drivers = make_pool(max_size=1, max_pages=2)
+    for _ in range(3):
+        with pool.borrow():
+            pass
+
+    assert len(drivers) == 2
+    assert not drivers[0].alive
+    assert pool.stats()["recycled"] == 1
+
+
+def test_recycled_on_memory():
+    """A browser whose JS heap grew past max_memory_mb is replaced"""
+    pool, drivers = make_pool(max_size=1, max_memory_mb=100)
+    with pool.borrow() as driver:
+        driver.heap_bytes = 200 * 1024 * 1024
+    with pool.borrow():
+        pass
+
+    assert len(drivers) == 2
+    assert pool.stats()["recycled"] == 1
+
+
+def test_unhealthy_browser_replaced():
+    """A crashed idle browser is discarded at the next borrow"""
+    pool, drivers = make_pool(max_size=1)
+    with pool.borrow():
+        pass
+    drivers[0].alive = False
+
+    with pool.borrow() as driver:
+        assert driver is drivers[1]
+    assert pool.stats()["unhealthy"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_size_limit_and_timeout():
+    """Borrowers beyond max_size wait, and time out if nothing is returned"""
+    pool, drivers = make_pool(max_size=1)
+    with pool.borrow():
+        with pytest.raises(BrowserPoolTimeout):
+            pool.acquire(timeout=0.05)
+
+    peak = []
+    running = []
+    lock = threading.Lock()
+
+    def worker():
+        with pool.borrow():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max(peak) == 1
+    assert len(drivers) == 1
+
+
+def test_close_quits_idle_browsers():
+    pool, drivers = make_pool(max_size=2)
+    with pool.borrow():
+        pass
+    pool.close()
+
+    assert not drivers[0].alive
+    with pytest.raises(RuntimeError):
+        pool.acquire(timeout=0)
+
+
+def test_dynamic_crawl_borrows_from_pool(memory_db):
+    """_crawl_dynamic renders through a pooled browser and returns it"""
+    html = "<div class='card'><h3>One</h3></div><div class='card'><h3>Two</h3></div>"
+    pool, drivers = make_pool(max_size=1, page_source=html)
+    crawler = WebCrawler(memory_db, browser_pool=pool)
+    source = {"_id": "dyn", "url": "https://example.com/app", "type": "dynamic", "wait_time": 0,
+              "respect_robots": False, "selectors": {"container": ".card", "title": "h3"}}
+
+    first = crawler.crawl_source(source)
+    second = crawler.crawl_source(source)
+
+    assert first["status"] == "success" and second["status"] == "success"
+    assert first["items_collected"] == 2
+    assert "browser_wait" in first["metrics"] and "ready_wait" in first["metrics"]
+    assert len(drivers) == 1
+    assert pool.stats()["idle"] == 1
@@ -0,0 +1,74 @@
+"""Test conditional GET (ETag / Last-Modified) crawling (offline)"""
+from crawler import WebCrawler
+
+PAGE = b"<html><head><title>Page</title></head><body><p>Hello</p></body></html>"
+
+
+def test_not_modified_skips_crawl(memory_db, stub_server):
+    def page(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"Content-Type": "text/html", "ETag": '"v1"',
+                     "Last-Modified": "Wed, 14 Oct 2026 08:00:00 GMT"}, PAGE
+
+    stub_server.routes["/page"] = page
+    crawler = WebCrawler(memory_db)
+    source = {"_id": "s1", "url": stub_server.base_url + "/page", "type": "html"}
+
+    first = crawler.crawl_source(source)
+    assert first["status"] == "success"
+    assert memory_db.state[source["url"]]["etag"] == '"v1"'
+
+    second = crawler.crawl_source(source)
+    assert second["status"] == "not_modified"
+    assert stub_server.requests[-1][1]["If-Modified-Since"] == "Wed, 14 Oct 2026 08:00:00 GMT"
+    assert len(memory_db.crawled_data) == 1
+
+
+def test_conditional_get_can_be_disabled(memory_db, stub_server):
+    stub_server.routes["/page"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, PAGE)
+    crawler = WebCrawler(memory_db)
+    source = {"_id": "s1", "url": stub_server.base_url + "/page", "type": "html",
+              "conditional_get": False}
+
+    crawler.crawl_source(source)
+    second = crawler.crawl_source(source)
+    assert "If-None-Match" not in stub_server.requests[-1][1]
+    # Fetched again, but the unchanged item is not stored twice
+    assert second["metrics"]["items_unchanged"] == 1
+    assert len(memory_db.crawled_data) == 1
+
+
+def test_selector_change_skips_saved_validators(memory_db, stub_server):
+    def posts(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        return 200, {"Content-Type": "text/html", "ETag": '"v1"'}, \
+            b"<html><body><div class='post'><h2>Old</h2><h3>Fixed</h3></div></body></html>"
+
+    stub_server.routes["/posts"] = posts
+    crawler = WebCrawler(memory_db)
+    source = {"_id": "s1", "url": stub_server.base_url + "/posts", "type": "html",
+              "selectors": {"container": ".post", "title": "h4"}}
+    crawler.crawl_source(source)
+
+    source["selectors"] = {"container": ".post", "title": "h3"}
+    fixed = crawler.crawl_source(source)
+    assert "If-None-Match" not in stub_server.requests[-1][1]
+    assert fixed["status"] == "success"
+    assert memory_db.crawled_data[-1]["title"] == "Fixed"
+
+    assert crawler.crawl_source(source)["status"] == "not_modified"
+
+
+def test_no_data_crawl_keeps_no_validators(memory_db, stub_server):
+    stub_server.routes["/empty"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, PAGE)
+    crawler = WebCrawler(memory_db)
+    source = {"_id": "s1", "url": stub_server.base_url + "/empty", "type": "html",
+              "selectors": {"container": ".post", "title": "h2"}}
+
+    assert crawler.crawl_source(source)["status"] == "no_data"
+    assert "etag" not in memory_db.state.get(source["url"], {})
+
+    crawler.crawl_source(source)
+    assert "If-None-Match" not in stub_server.requests[-1][1]
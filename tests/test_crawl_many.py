@@ -0,0 +1,98 @@
+"""Test concurrent crawling with crawl_many (offline)"""
+import threading
+import time
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+
+HTML = {"Content-Type": "text/html"}
+
+
+def page(*titles):
+    posts = "".join(f"<div class='post'><h2>{title}</h2></div>" for title in titles)
+    return f"<html><body>{posts}</body></html>".encode()
+
+
+def html_source(stub_server, path):
+    return {"_id": path, "url": stub_server.base_url + path, "type": "html", "respect_robots": False,
+            "snapshot": False, "selectors": {"container": ".post", "title": "h2"}}
+
+
+def make_crawler(memory_db):
+    return WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+
+
+def test_logs_come_back_in_input_order(memory_db, stub_server):
+    def delayed(delay, title):
+        def route(handler):
+            time.sleep(delay)
+            return 200, HTML, page(title)
+        return route
+
+    # The first sources answer last
+    for i in range(4):
+        stub_server.routes[f"/s{i}"] = delayed(0.2 - i * 0.05, f"S{i}")
+    sources = [html_source(stub_server, f"/s{i}") for i in range(4)]
+
+    logs = make_crawler(memory_db).crawl_many(sources, concurrency=4)
+    assert [log["url"] for log in logs] == [source["url"] for source in sources]
+    assert all(log["status"] == "success" for log in logs)
+
+
+def test_concurrency_is_bounded(memory_db, stub_server):
+    lock = threading.Lock()
+    running = []
+    peak = []
+
+    def slow(handler):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.1)
+        with lock:
+            running.pop()
+        return 200, HTML, page("Post")
+
+    for i in range(6):
+        stub_server.routes[f"/s{i}"] = slow
+    sources = [html_source(stub_server, f"/s{i}") for i in range(6)]
+
+    make_crawler(memory_db).crawl_many(sources, concurrency=2)
+    assert max(peak) == 2
+
+
+def test_concurrent_crawls_keep_their_own_log_and_state(memory_db, stub_server):
+    # Both crawls are in flight at the same time
+    both = threading.Barrier(2, timeout=5)
+
+    def route(etag, *titles):
+        def serve(handler):
+            both.wait()
+            return 200, dict(HTML, ETag=etag), page(*titles)
+        return serve
+
+    stub_server.routes["/a"] = route('"a"', "A1")
+    stub_server.routes["/b"] = route('"b"', "B1", "B2", "B3")
+    sources = [html_source(stub_server, "/a"), html_source(stub_server, "/b")]
+
+    logs = make_crawler(memory_db).crawl_many(sources, concurrency=2)
+    assert [log["items_collected"] for log in logs] == [1, 3]
+    assert memory_db.state[sources[0]["url"]]["etag"] == '"a"'
+    assert memory_db.state[sources[1]["url"]]["etag"] == '"b"'
+    assert {item["source_id"]: item["title"] for item in memory_db.crawled_data}["/a"] == "A1"
+
+
+def test_crawl_all_validates_concurrency(monkeypatch):
+    import app as dashboard
+
+    calls = []
+    monkeypatch.setattr(dashboard.db, "get_all_sources", lambda status=None: [])
+    monkeypatch.setattr(dashboard.crawler, "crawl_many",
+                        lambda sources, concurrency: calls.append(concurrency) or [])
+    client = dashboard.app.test_client()
+
+    assert client.post("/api/crawl/all", json={"concurrency": "4"}).status_code == 200
+    assert client.post("/api/crawl/all", json={"concurrency": 0}).status_code == 200
+    assert calls == [4, 1]
+    response = client.post("/api/crawl/all", json={"concurrency": "many"})
+    assert response.status_code == 400 and response.get_json()["success"] is False
@@ -0,0 +1,74 @@
+"""Test the fast RSS/Atom parser against feedparser (offline)"""
+import feedparser
+
+from feed_parser import parse_fast, parse_feed, UnsupportedFeed
+
+RSS = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/"
+     xmlns:content="http://purl.org/rss/1.0/modules/content/">
+<channel><title>Feed</title><link>http://example.com/</link>
+<item><title>First &amp; best</title><link>http://example.com/1</link>
+<description><![CDATA[<p>One <img src="http://example.com/1.jpg"/></p>]]></description>
+<pubDate>Wed, 14 Oct 2026 08:00:00 GMT</pubDate>
+<media:group><media:content url="http://example.com/m.jpg" type="image/jpeg"/></media:group></item>
+<item><title>Second</title><guid>http://example.com/2</guid><description>Two</description>
+<content:encoded><![CDATA[<p>Full text</p>]]></content:encoded>
+<enclosure url="http://example.com/2.png" type="image/png" length="10"/></item>
+<item><title>Third</title><link>http://example.com/3</link></item>
+</channel></rss>"""
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom"><title>Feed</title>
+<entry><title>Atom one</title><link rel="alternate" href="http://example.com/a1"/>
+<link rel="enclosure" href="http://example.com/a1.jpg" type="image/jpeg"/>
+<summary>Short</summary><published>2026-10-14T08:00:00Z</published></entry>
+<entry><title>Atom two</title><link href="http://example.com/a2"/>
+<content type="html">&lt;p&gt;Body&lt;/p&gt;</content></entry>
+</feed>"""
+
+
+def _fields(entry):
+    return {
+        "title": entry.get("title", ""),
+        "link": entry.get("link", ""),
+        "published": entry.get("published", ""),
+        "media": [m.get("url") for m in entry.get("media_content", [])],
+        "enclosures": [e.get("href") for e in entry.get("enclosures", [])],
+    }
+
+
+def test_rss_matches_feedparser():
+    fast = parse_fast(RSS)
+    slow = feedparser.parse(RSS).entries
+    assert [_fields(e) for e in fast] == [_fields(e) for e in slow]
+    assert fast[1]["content"][0]["value"] == "<p>Full text</p>"
+    assert "img" in fast[0]["summary"]
+
+
+def test_atom_matches_feedparser():
+    fast = parse_fast(ATOM)
+    slow = feedparser.parse(ATOM).entries
+    assert [_fields(e) for e in fast] == [_fields(e) for e in slow]
+    assert fast[1]["summary"] == "<p>Body</p>"
+
+
+def test_stops_at_max_items():
+    assert [e["title"] for e in parse_fast(RSS, max_items=2)] == ["First & best", "Second"]
+
+
+def test_malformed_falls_back_to_feedparser():
+    broken = RSS.replace(b"<title>Feed</title>", b"<title>Feed&nbsp;</title>")
+    try:
+        parse_fast(broken)
+        assert False, "expected UnsupportedFeed"
+    except UnsupportedFeed:
+        pass
+
+    feed = parse_feed(broken, max_items=2)
+    assert feed["parser"] == "feedparser"
+    assert len(feed["entries"]) == 2
+
+
+def test_fast_path_used_for_valid_feeds():
+    assert parse_feed(ATOM)["parser"] == "fast"
+    assert parse_feed(ATOM, fast=False)["parser"] == "feedparser"
@@ -0,0 +1,55 @@
+"""Test RSS/Atom crawling through the pooled session (offline)"""
+import gzip
+
+from crawler import WebCrawler
+from crawler_enhanced import EnhancedWebCrawler
+
+RSS = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:media="http://search.yahoo.com/mrss/">
+<channel><title>Stub feed</title><link>http://example.com/</link>
+<item><title>First</title><link>/first</link><description>One</description>
+<pubDate>Wed, 14 Oct 2026 08:00:00 GMT</pubDate>
+<media:content url="http://example.com/a.jpg" type="image/jpeg"/></item>
+<item><title>Second</title><link>http://example.com/second</link><description>Two</description>
+<enclosure url="http://example.com/b.png" type="image/png" length="1"/></item>
+<item><title>Third</title><link>http://example.com/third</link><description>Three</description></item>
+</channel></rss>"""
+
+
+def test_feed_fetched_through_session(memory_db, stub_server):
+    stub_server.routes["/feed"] = (200, {"Content-Type": "application/rss+xml",
+                                         "Content-Encoding": "gzip"}, gzip.compress(RSS))
+    crawler = WebCrawler(memory_db)
+    log = crawler.crawl_source({"_id": "f", "url": stub_server.base_url + "/feed",
+                                "type": "rss", "max_items": 2})
+
+    assert log["status"] == "success"
+    assert [item["title"] for item in memory_db.crawled_data] == ["First", "Second"]
+    path, headers = stub_server.requests[-1]
+    assert headers["User-Agent"] == crawler.session.headers["User-Agent"]
+    assert "gzip" in headers["Accept-Encoding"]
+    assert "application/rss+xml" in headers["Accept"]
+
+
+def test_enhanced_feed_images(memory_db, stub_server):
+    stub_server.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"}, RSS)
+    crawler = EnhancedWebCrawler(memory_db)
+    crawler.crawl_source({"_id": "f", "url": stub_server.base_url + "/feed", "type": "rss"})
+
+    first, second, third = memory_db.crawled_data
+    assert first["images"][0]["url"] == "http://example.com/a.jpg"
+    assert second["images"][0]["url"] == "http://example.com/b.png"
+    assert third["images"] == []
+
+
+def test_content_images_resolve_against_entry_link(memory_db, stub_server):
+    feed = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0"><channel><title>Stub feed</title><link>http://example.com/</link>
+<item><title>Post</title><link>http://example.com/posts/4/</link>
+<description><![CDATA[<p>Four <img src="cover.jpg"></p>]]></description></item>
+</channel></rss>"""
+    stub_server.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"}, feed)
+    crawler = EnhancedWebCrawler(memory_db)
+    crawler.crawl_source({"_id": "f", "url": stub_server.base_url + "/feed", "type": "rss"})
+
+    assert memory_db.crawled_data[0]["images"][0]["url"] == "http://example.com/posts/4/cover.jpg"
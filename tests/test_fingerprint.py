@@ -0,0 +1,54 @@
+"""Test idempotent item storage keyed by fingerprints (offline)"""
+from crawler import WebCrawler
+from fingerprint import fingerprint_item
+from rate_limiter import HostRateLimiter
+from test_feeds import RSS
+
+
+def test_items_with_a_link_are_keyed_by_it():
+    first = fingerprint_item({"source_id": "f", "link": "https://a.example/1", "title": "Draft"})
+    edited = fingerprint_item({"source_id": "f", "link": "https://a.example/1", "title": "Final"})
+    other_source = fingerprint_item({"source_id": "g", "link": "https://a.example/1", "title": "Draft"})
+
+    assert first["fingerprint"] == edited["fingerprint"]
+    assert first["content_hash"] != edited["content_hash"]
+    assert first["fingerprint"] != other_source["fingerprint"]
+
+
+def test_bookkeeping_fields_do_not_change_the_hash():
+    item = {"source_id": "s", "source_url": "https://a.example/", "type": "html", "content": "Hello"}
+    plain = fingerprint_item(dict(item))
+    crawled = fingerprint_item(dict(item, timestamp="now", snapshot="abc", _id="x"))
+
+    assert plain["fingerprint"] == crawled["fingerprint"]
+    assert plain["content_hash"] == crawled["content_hash"]
+
+
+def test_documents_are_keyed_by_url_and_other_items_by_content():
+    pdf = fingerprint_item({"source_id": "p", "source_url": "https://a.example/x.pdf", "type": "pdf",
+                            "content": "v1"})
+    pdf_v2 = fingerprint_item(dict(pdf, content="v2"))
+    assert pdf["fingerprint"] == pdf_v2["fingerprint"]
+
+    html = fingerprint_item({"source_id": "h", "source_url": "https://a.example/", "type": "html",
+                             "content": "v1"})
+    html_v2 = fingerprint_item(dict(html, content="v2"))
+    assert html["fingerprint"] != html_v2["fingerprint"]
+
+
+def test_recrawl_reports_inserted_updated_and_unchanged(memory_db, stub_server):
+    stub_server.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"}, RSS)
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    source = {"_id": "f", "url": stub_server.base_url + "/feed", "type": "rss", "conditional_get": False,
+              "respect_robots": False}
+
+    first = crawler.crawl_source(source)
+    assert first["metrics"]["items_inserted"] == 3
+
+    stub_server.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"},
+                                   RSS.replace(b"<description>Two</description>", b"<description>2</description>"))
+    second = crawler.crawl_source(source)
+
+    assert (second["metrics"]["items_inserted"], second["metrics"]["items_updated"],
+            second["metrics"]["items_unchanged"]) == (0, 1, 2)
+    assert len(memory_db.crawled_data) == 3
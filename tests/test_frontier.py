@@ -0,0 +1,114 @@
+"""Test the link-following frontier crawl mode (offline)"""
+from crawler import WebCrawler
+from frontier import normalize_url, SeenSet, Frontier, LinkRules, DEFAULT_MAX_PAGES
+from rate_limiter import HostRateLimiter
+
+HTML = {"Content-Type": "text/html"}
+
+
+def page(title, *links):
+    anchors = "".join(f"<a href='{link}'>{link}</a>" for link in links)
+    return f"<html><body><div class='post'><h2>{title}</h2></div>{anchors}</body></html>".encode()
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.COM:80/a/./b/../c?b=2&a=1&utm_source=x#top") == \
+        "http://example.com/a/c?a=1&b=2"
+    assert normalize_url("../x", "https://example.com/a/b/") == "https://example.com/a/x"
+    assert normalize_url("https://example.com") == "https://example.com/"
+    assert normalize_url("mailto:someone@example.com") is None
+    assert normalize_url("javascript:void(0)", "https://example.com/") is None
+
+
+def test_seen_set_grows_and_dedups():
+    seen = SeenSet(capacity=4)
+    for i in range(5000):
+        assert seen.add(f"https://example.com/{i}")
+    assert not seen.add("https://example.com/42")
+    assert "https://example.com/4999" in seen
+    assert "https://example.com/5000" not in seen
+    assert len(seen) == 5000
+    # 8-byte slots at <= 50% load
+    assert seen.memory_bytes() <= 5000 * 32
+
+
+def test_frontier_order_and_rules():
+    rules = LinkRules("https://example.com/", {"deny": [r"/login"], "prefer": [r"/news/"]})
+    frontier = Frontier(rules, max_depth=2)
+    frontier.seed("https://example.com/")
+
+    assert frontier.push("https://example.com/about", 1)
+    assert frontier.push("https://example.com/news/1", 1)
+    assert not frontier.push("https://example.com/about", 1)
+    assert not frontier.push("https://example.com/login", 1)
+    assert not frontier.push("https://other.example/", 1)
+    assert not frontier.push("https://example.com/logo.png", 1)
+    assert not frontier.push("https://example.com/deep", 3)
+
+    assert [frontier.pop()[0] for _ in range(3)] == [
+        "https://example.com/", "https://example.com/news/1", "https://example.com/about"]
+
+
+def test_follow_crawl(memory_db, stub_server):
+    routes = stub_server.routes
+    routes["/"] = (200, HTML, page("Home", "/a", "/b#comments", "/b", "/private/x", "/img.jpg"))
+    routes["/a"] = (200, HTML, page("A", "/", "/a/deep", "/b?utm_source=feed"))
+    routes["/b"] = (200, HTML, page("B", "/missing"))
+    routes["/a/deep"] = (200, HTML, page("Deep", "/a/deeper"))
+    routes["/a/deeper"] = (200, HTML, page("Deeper"))
+
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    source = {"_id": "site", "url": stub_server.base_url + "/", "type": "html",
+              "selectors": {"container": ".post", "title": "h2"},
+              "follow": {"max_depth": 2, "max_pages": 10, "deny": [r"/private/"]}}
+
+    log = crawler.crawl_source(source)
+
+    assert log["status"] == "success"
+    titles = sorted(item["title"] for item in memory_db.crawled_data)
+    assert titles == ["A", "B", "Deep", "Home"]
+    fetched = [path for path, _ in stub_server.requests]
+    assert "/a/deeper" not in fetched and "/private/x" not in fetched
+    assert fetched.count("/b") == 1
+    assert log["metrics"]["pages_failed"] == 1
+    assert log["metrics"]["pages_crawled"] == 5
+
+
+def test_follow_page_budget(memory_db, stub_server):
+    stub_server.routes["/"] = (200, HTML, page("Home", *[f"/p{i}" for i in range(50)]))
+    for i in range(50):
+        stub_server.routes[f"/p{i}"] = (200, HTML, page(f"P{i}"))
+
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    source = {"_id": "site", "url": stub_server.base_url + "/", "type": "html",
+              "selectors": {"container": ".post", "title": "h2"},
+              "follow": {"max_pages": 5}}
+
+    log = crawler.crawl_source(source)
+    assert log["metrics"]["pages_crawled"] == 5
+    assert len([path for path, _ in stub_server.requests if path != "/robots.txt"]) == 5
+    assert log["metrics"]["urls_pending"] == 46
+
+
+def test_follow_true_uses_the_default_page_budget(memory_db, stub_server):
+    links = [f"/p{i}" for i in range(DEFAULT_MAX_PAGES + 20)]
+    stub_server.routes["/"] = (200, HTML, page("Home", *links))
+    for link in links:
+        stub_server.routes[link] = (200, HTML, page(link))
+
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    source = {"_id": "site", "url": stub_server.base_url + "/", "type": "html", "respect_robots": False,
+              "selectors": {"container": ".post", "title": "h2"}, "follow": True}
+
+    log = crawler.crawl_source(source)
+    assert log["status"] == "success"
+    assert DEFAULT_MAX_PAGES == 100
+    assert log["metrics"]["pages_crawled"] == DEFAULT_MAX_PAGES
+
+
+def test_follow_must_be_a_document(memory_db, stub_server):
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    log = crawler.crawl_source({"_id": "site", "url": stub_server.base_url + "/", "type": "html",
+                                "respect_robots": False, "follow": "yes"})
+    assert log["status"] == "error"
+    assert "follow must be true or a document" in log["errors"][0]
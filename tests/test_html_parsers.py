@@ -0,0 +1,108 @@
+"""Test pluggable HTML parser backends (offline)"""
+from crawler import WebCrawler
+from crawler_enhanced import EnhancedWebCrawler
+from html_parsers import available_parsers, resolve_parser, DEFAULT_PARSER
+
+PAGE = """<html><head><title>Blog</title></head><body>
+<div class="post"><h2>First</h2><p>Alpha <img src="/a.png"></p></div>
+<div class="post"><h2>Second</h2><p>Beta</p></div>
+</body></html>"""
+
+SOURCE = {"_id": "s", "url": "http://example.com/", "type": "html",
+          "selectors": {"container": ".post", "title": "h2", "content": "p"}}
+
+
+def test_default_is_fastest_installed():
+    assert DEFAULT_PARSER == available_parsers()[0]
+    assert resolve_parser("not-a-parser") == DEFAULT_PARSER
+    assert resolve_parser("html.parser") == "html.parser"
+
+
+def test_backends_extract_the_same_items():
+    crawler = EnhancedWebCrawler(None)
+    results = {parser: crawler._extract_html(SOURCE, SOURCE["url"], PAGE, parser)
+               for parser in available_parsers()}
+    reference = results["html.parser"]
+    assert [item["title"] for item in reference] == ["First", "Second"]
+    assert reference[0]["images"][0]["url"] == "http://example.com/a.png"
+    for items in results.values():
+        assert items == reference
+
+
+def test_parser_mismatch_is_reported(memory_db, stub_server):
+    if "lxml" not in available_parsers():
+        return
+
+    # Unclosed <p> elements: lxml closes them, html.parser nests them
+    page = b"<html><body><p class='post'><b>One</b><p class='post'><b>Two</b></body></html>"
+    stub_server.routes["/"] = (200, {"Content-Type": "text/html"}, page)
+    crawler = WebCrawler(memory_db)
+    log = crawler.crawl_source({"_id": "s", "url": stub_server.base_url + "/", "type": "html",
+                                "parser": "lxml", "parser_check": True,
+                                "selectors": {"container": ".post"}})
+
+    assert log["status"] == "success"
+    assert log["metrics"]["parser_mismatches"] == 1
+    assert "lxml" in log["warnings"][0]
+
+
+def test_partial_parse_matches_full_parse():
+    blocks = "".join(f"<div class='wrap'><article class='post big'><h2>Story {i}</h2>"
+                     f"<p>Body {i}</p></article></div>" for i in range(100))
+    page = f"<html><head><title>Front</title></head><body><nav><h2>Menu</h2></nav>{blocks}</body></html>"
+    crawler = EnhancedWebCrawler(None)
+
+    for container in ("article.post", ".post.big", "article"):
+        source = dict(SOURCE, max_items=20, selectors={"container": container, "title": "h2", "content": "p"})
+        for parser in available_parsers():
+            partial = crawler._extract_html(source, SOURCE["url"], page, parser)
+            full = crawler._extract_html(dict(source, partial_parse=False), SOURCE["url"], page, parser)
+            assert len(partial) == 20
+            assert partial == full
+
+
+def test_large_page_is_only_parsed_up_to_the_last_container_needed():
+    from html_parsers import container_prefix, PREFIX_CHUNK
+
+    if "lxml" not in available_parsers():
+        return
+
+    blocks = "".join(f"<div class='wrap'><article class='post'><h2>Story {i}</h2><p>Body {i}</p></article></div>"
+                     for i in range(5000))
+    page = f"<html><body>{blocks}</body></html>"
+    assert len(container_prefix(page, "article.post", 20)) == PREFIX_CHUNK
+
+    crawler = EnhancedWebCrawler(None)
+    source = dict(SOURCE, max_items=20, selectors={"container": "article.post", "title": "h2", "content": "p"})
+    partial = crawler._extract_html(source, SOURCE["url"], page, "lxml")
+    assert partial == crawler._extract_html(dict(source, partial_parse=False), SOURCE["url"], page, "lxml")
+
+    # A container holding the others is only complete once it closes, past the first chunk
+    nested = "<div class='post'>" + "<div class='post'>x</div>" * 5000 + "<h2>End</h2></div>" + blocks
+    prefix = container_prefix(nested, ".post", 1)
+    assert PREFIX_CHUNK < len(prefix) < len(nested) and "End" in prefix
+
+
+def test_only_simple_selectors_are_strained():
+    from html_parsers import container_strainer
+
+    assert container_strainer(".post") is not None
+    assert container_strainer("li[data-id]") is not None
+    assert container_strainer("div .post") is None
+    assert container_strainer(".a, .b") is None
+    assert container_strainer("li:nth-child(2)") is None
+
+
+def test_selectors_compiled_once_per_source():
+    from selector_cache import SelectorCache
+
+    cache = SelectorCache()
+    selectors = {"container": ".post", "title": "h2"}
+    first = cache.get("s1", selectors)
+    assert cache.get("s1", dict(selectors)) is first
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+    # Changed selectors get their own entry; invalidation drops the source
+    assert cache.get("s1", {"container": ".item"}) is not first
+    cache.invalidate("s1")
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,82 @@
+"""Test schema migrations and the non-blocking MongoDB connection (offline)"""
+import time
+
+import pytest
+
+import migrations
+from database import CrawlerDatabase
+
+
+class FakeCollection:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+        self.docs = {}
+
+    def create_index(self, keys, **options):
+        if self.db.fail_on == self.name:
+            raise RuntimeError("index build failed")
+        self.db.indexes.append((self.name, tuple(keys)))
+
+    def find(self, query, projection=None):
+        return [dict(doc) for doc in self.docs.values()]
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["_id"], dict(update["$setOnInsert"], _id=query["_id"]))
+
+
+class FakeMongoDatabase:
+    """The parts of a pymongo Database used by migrations"""
+
+    def __init__(self):
+        self.collections = {}
+        self.indexes = []
+        self.fail_on = None
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    __getattr__ = __getitem__
+
+
+def test_migrations_run_once_in_order():
+    db = FakeMongoDatabase()
+    applied = migrations.migrate(db)
+
+    assert applied == [name for _, name, _ in migrations.MIGRATIONS]
+    assert migrations.applied_versions(db) == [version for version, _, _ in migrations.MIGRATIONS]
+    assert db.indexes[0] == ("crawled_data", (("content", "text"), ("title", "text")))
+
+    created = len(db.indexes)
+    assert migrations.migrate(db) == []
+    assert len(db.indexes) == created
+
+
+def test_failed_migration_is_retried_on_next_connection():
+    db = FakeMongoDatabase()
+    db.fail_on = "snapshots"
+    with pytest.raises(RuntimeError):
+        migrations.migrate(db)
+    assert migrations.applied_versions(db) == [1, 2, 3]
+
+    db.fail_on = None
+    assert [version for version, _, _ in migrations.pending_migrations(db)] == [4, 5, 6]
+    migrations.migrate(db)
+    assert migrations.pending_migrations(db) == []
+
+
+def test_background_connection_does_not_block(monkeypatch):
+    attempts = []
+    monkeypatch.setattr(CrawlerDatabase, "connect", lambda self, quiet=False: attempts.append(quiet) or False)
+    monkeypatch.setattr("database.RECONNECT_INTERVAL", 0.01)
+
+    started = time.monotonic()
+    db = CrawlerDatabase("mongodb://127.0.0.1:1/", background=True)
+    assert time.monotonic() - started < 0.5
+    assert db.crawled_data is None and not db.wait_connected(timeout=0.1)
+
+    db.close()
+    # Only the first failed attempt is reported
+    assert attempts[0] is False and all(attempts[1:]) and len(attempts) >= 2
@@ -0,0 +1,85 @@
+"""Test MinHash near-duplicate detection before storage (offline)"""
+from crawler import WebCrawler
+from near_duplicate import NearDuplicateIndex, minhash, minhash_bands, similarity
+from rate_limiter import HostRateLimiter
+
+STORY = ("Apple on Tuesday unveiled a new MacBook Pro powered by its M5 chip, promising faster graphics, "
+         "a brighter display and up to 24 hours of battery life. The laptop goes on sale next week in the "
+         "United States and Europe, starting at 1,999 dollars, and analysts expect strong demand.")
+REWORDED = ("Apple on Tuesday unveiled its new MacBook Pro powered by the M5 chip, promising faster graphics, "
+            "a brighter display and up to 24 hours of battery life. The laptop goes on sale next week in the "
+            "US and Europe, starting at $1,999, and analysts expect strong demand ahead of the holidays.")
+SAME_TEMPLATE = ("Apple on Tuesday unveiled a new iPad Air powered by its M4 chip, promising a sharper camera "
+                 "and up to 12 hours of battery life. The tablet goes on sale next month in Asia, starting "
+                 "at 599 dollars, and analysts expect modest demand.")
+OTHER = ("The European Central Bank kept interest rates unchanged on Thursday as inflation in the euro "
+         "area continued to ease towards its two percent target, while policymakers warned that wage "
+         "growth and energy prices could still push consumer prices higher next year.")
+
+
+def rss(*entries):
+    items = "".join(f"<item><title>{title}</title><link>{link}</link><description>{text}</description></item>"
+                    for title, link, text in entries)
+    return f"<?xml version='1.0'?><rss version='2.0'><channel><title>T</title>{items}</channel></rss>".encode()
+
+
+def crawl(memory_db, stub_server, path, body, **overrides):
+    stub_server.routes[path] = (200, {"Content-Type": "application/rss+xml"}, body)
+    source = {"_id": path.strip("/"), "url": stub_server.base_url + path, "type": "rss",
+              "conditional_get": False, "respect_robots": False}
+    source.update(overrides)
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    return crawler.crawl_source(source)
+
+
+def test_similarity_separates_copies_from_other_stories():
+    story = minhash(STORY)
+    assert similarity(story, minhash(REWORDED)) >= 0.5
+    assert similarity(story, minhash(SAME_TEMPLATE)) < 0.5
+    assert similarity(story, minhash(OTHER)) < 0.1
+    assert minhash("Too short to compare") is None
+
+    # Signatures (and band keys) are the same in every process
+    assert minhash(STORY) == story
+    assert set(minhash_bands(story)) & set(minhash_bands(minhash(REWORDED)))
+    assert not set(minhash_bands(story)) & set(minhash_bands(minhash(OTHER)))
+
+
+def test_story_from_a_second_source_is_linked_to_the_first(memory_db, stub_server):
+    crawl(memory_db, stub_server, "/bbc", rss(("MacBook Pro M5", "https://bbc.example/1", STORY)))
+    log = crawl(memory_db, stub_server, "/techcrunch", rss(
+        ("Apple's new MacBook Pro", "https://tc.example/a", REWORDED),
+        ("ECB holds rates", "https://tc.example/b", OTHER)))
+
+    assert log["metrics"]["near_duplicates_linked"] == 1
+    first, copy, other = memory_db.crawled_data
+    assert copy["duplicate_of"] == first["fingerprint"]
+    assert copy["minhash_bands"] == [] and first["minhash_bands"]
+    assert other["duplicate_of"] is None
+
+    # Crawling the first source again does not link its items to themselves
+    again = crawl(memory_db, stub_server, "/bbc", rss(("MacBook Pro M5", "https://bbc.example/1", STORY)))
+    assert "near_duplicates_linked" not in again["metrics"]
+    assert again["metrics"]["items_unchanged"] == 1
+
+
+def test_drop_mode_does_not_store_the_copy(memory_db, stub_server):
+    crawl(memory_db, stub_server, "/bbc", rss(("MacBook Pro M5", "https://bbc.example/1", STORY)))
+    log = crawl(memory_db, stub_server, "/hn", rss(("MacBook Pro", "https://hn.example/1", REWORDED)),
+                near_duplicates="drop")
+
+    assert log["metrics"]["near_duplicates_dropped"] == 1
+    assert [item["link"] for item in memory_db.crawled_data] == ["https://bbc.example/1"]
+
+
+def test_copies_within_one_batch_and_disabled_sources(memory_db):
+    items = [{"source_id": "s", "link": f"https://a.example/{i}", "content": text}
+             for i, text in enumerate([STORY, REWORDED, OTHER])]
+    index = NearDuplicateIndex(memory_db)
+
+    kept, counts = index.process([dict(item) for item in items], "off")
+    assert counts == {"linked": 0, "dropped": 0} and "minhash" not in kept[0]
+
+    kept, counts = index.process(items, "drop")
+    assert counts["dropped"] == 1
+    assert [item["link"] for item in kept] == ["https://a.example/0", "https://a.example/2"]
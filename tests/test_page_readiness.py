@@ -0,0 +1,69 @@
+"""Test readiness waits for dynamic pages (offline, scripted fake driver)"""
+import sys
+import os
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from page_readiness import readiness_settings, wait_until_ready, COUNT_SCRIPT, NETWORK_SCRIPT
+
+
+class ScriptedDriver:
+    """Page whose containers and network requests appear over time"""
+
+    def __init__(self, containers_at, requests_until=0.0):
+        self.start = time.monotonic()
+        self.containers_at = containers_at
+        self.requests_until = requests_until
+
+    def execute_script(self, script, *args):
+        elapsed = time.monotonic() - self.start
+        if script == COUNT_SCRIPT:
+            return sum(1 for at in self.containers_at if elapsed >= at)
+        if script == NETWORK_SCRIPT:
+            # One new resource every 50 ms until requests_until
+            return ["complete", int(min(elapsed, self.requests_until) / 0.05)]
+        raise AssertionError(script)
+
+
+def test_returns_as_soon_as_selector_matches():
+    driver = ScriptedDriver(containers_at=[0.1, 0.15, 0.2])
+    result = wait_until_ready(driver, selector=".card", min_count=2, timeout=5, poll_interval=0.02)
+
+    assert result["ready"]
+    assert result["matched"] >= 2
+    assert result["waited"] < 1
+
+
+def test_times_out_with_partial_matches():
+    driver = ScriptedDriver(containers_at=[0.0, 10.0])
+    result = wait_until_ready(driver, selector=".card", min_count=2, timeout=0.2, poll_interval=0.02)
+
+    assert not result["ready"]
+    assert result["matched"] == 1
+    assert 0.2 <= result["waited"] < 1
+
+
+def test_network_idle():
+    """Idle is reached only after requests stop for idle_time"""
+    driver = ScriptedDriver(containers_at=[], requests_until=0.3)
+    result = wait_until_ready(driver, network_idle=True, idle_time=0.2, timeout=5, poll_interval=0.02)
+
+    assert result["ready"]
+    assert result["waited"] >= 0.4
+
+
+def test_settings_from_source():
+    settings = readiness_settings({"selectors": {"container": ".card"},
+                                   "wait_for": {"min_count": 3, "timeout": 8}})
+    assert settings["selector"] == ".card"
+    assert settings["min_count"] == 3
+    assert not settings["network_idle"]
+    assert settings["timeout"] == 8
+
+    # No container selector: fall back to network idle, legacy wait_time as timeout
+    settings = readiness_settings({"selectors": {}, "wait_time": 5})
+    assert settings["network_idle"]
+    assert settings["min_count"] == 0
+    assert settings["timeout"] == 5
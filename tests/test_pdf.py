@@ -0,0 +1,56 @@
+"""Test streamed, size-capped PDF crawling (offline)"""
+from crawler import WebCrawler
+
+
+def make_pdf(pages):
+    """Build a minimal PDF with one line of text per page"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(pages):
+        stream = f"BT /F1 12 Tf 72 720 Td (Page{i}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def test_large_pdf_extracted_in_parallel(memory_db, stub_server):
+    stub_server.routes["/doc.pdf"] = (200, {"Content-Type": "application/pdf"}, make_pdf(40))
+    crawler = WebCrawler(memory_db)
+    log = crawler.crawl_source({"_id": "p", "url": stub_server.base_url + "/doc.pdf",
+                                "type": "pdf", "max_pages": 30})
+
+    assert log["status"] == "success"
+    item = memory_db.crawled_data[0]
+    assert item["pages"] == 40
+    assert item["pages_extracted"] == 30
+    assert item["content"].startswith("Page0Page1")
+
+    # Workers are not forked from the threaded crawler process
+    import pdf_extractor
+    assert pdf_extractor._get_pool()._mp_context.get_start_method() in ("forkserver", "spawn")
+    assert "Page29" in item["content"] and "Page30" not in item["content"]
+
+
+def test_pdf_over_max_bytes_is_rejected(memory_db, stub_server):
+    stub_server.routes["/doc.pdf"] = (200, {"Content-Type": "application/pdf"}, make_pdf(3))
+    crawler = WebCrawler(memory_db)
+    log = crawler.crawl_source({"_id": "p", "url": stub_server.base_url + "/doc.pdf",
+                                "type": "pdf", "max_bytes": 100})
+
+    assert log["status"] == "error"
+    assert "max_bytes" in log["errors"][0]
+    assert memory_db.crawled_data == []
@@ -0,0 +1,87 @@
+"""Test the per-host token-bucket rate limiter (offline)"""
+import sys
+import os
+import threading
+import time
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rate_limiter import HostRateLimiter
+
+
+def test_burst_then_paced():
+    """Requests beyond the burst wait for the bucket to refill"""
+    limiter = HostRateLimiter(requests_per_second=20, burst=2, max_in_flight=10)
+    start = time.monotonic()
+    for _ in range(4):
+        with limiter.limit("https://example.com/a"):
+            pass
+    elapsed = time.monotonic() - start
+
+    # 2 immediate + 2 paced at 20/s
+    assert elapsed >= 0.09
+    stats = limiter.stats()["example.com"]
+    assert stats["requests"] == 4
+    assert stats["total_wait"] > 0
+
+
+def test_hosts_are_independent():
+    """Waiting on one host does not slow down another"""
+    limiter = HostRateLimiter(requests_per_second=1, burst=1, max_in_flight=1)
+    with limiter.limit("https://slow.example/"):
+        pass
+    assert limiter.acquire("https://other.example/") < 0.05
+    limiter.release("https://other.example/")
+
+
+def test_max_in_flight():
+    """No more than max_in_flight requests run against a host at once"""
+    limiter = HostRateLimiter(requests_per_second=1000, burst=1000, max_in_flight=2)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with limiter.limit("https://example.com/"):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert max(peak) == 2
+
+
+def test_source_override_is_scoped_to_its_requests():
+    """A source's rate_limit paces its own requests without reconfiguring the host"""
+    limiter = HostRateLimiter(requests_per_second=100, burst=5, max_in_flight=5)
+    slow = {"requests_per_second": 5, "burst": 1}
+    start = time.monotonic()
+    for _ in range(3):
+        with limiter.limit("https://example.com/", slow):
+            pass
+    assert time.monotonic() - start >= 0.35
+
+    stats = limiter.stats()["example.com"]
+    assert (stats["requests_per_second"], stats["burst"], stats["max_in_flight"]) == (100, 5, 5)
+    # Other sources on the host keep the host's pacing
+    assert limiter.acquire("https://example.com/") < 0.05
+    limiter.release("https://example.com/")
+
+
+def test_looser_override_keeps_host_limits():
+    """An override faster than the host's settings cannot lift them"""
+    limiter = HostRateLimiter(requests_per_second=20, burst=1, max_in_flight=5)
+    start = time.monotonic()
+    for _ in range(3):
+        with limiter.limit("https://example.com/", {"requests_per_second": 1000, "burst": 1000}):
+            pass
+    assert time.monotonic() - start >= 0.09
@@ -0,0 +1,112 @@
+"""Test per-source request blocking for dynamic renders (offline, fake driver)"""
+import sys
+import os
+import json
+import re
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_pool import BrowserPool
+from crawler import WebCrawler
+from page_readiness import COUNT_SCRIPT
+from request_blocking import blocked_patterns, apply_blocking, count_requests
+
+PAGE_RESOURCES = [
+    "https://example.com/app.js",
+    "https://example.com/api/items.json",
+    "https://example.com/hero.jpg",
+    "https://example.com/fonts/inter.woff2",
+    "https://www.google-analytics.com/analytics.js",
+    "https://cdn.example.com/thumb.png?w=300",
+    "https://fonts.gstatic.com/s/inter/v13/UcCO3FwrK3iLTeHuS_fvQtMwCp50KnMw2boKoduKmMEVuLyfAZ9hiA"
+]
+
+
+def cdp_match(url, pattern):
+    """Network.setBlockedURLs matching: '*' is the only wildcard, over the whole URL"""
+    return re.fullmatch(".*".join(re.escape(part) for part in pattern.split("*")), url) is not None
+
+
+class CDPDriver:
+    """Fake Chrome that enforces Network.setBlockedURLs and logs network events"""
+
+    def __init__(self):
+        self.blocked = []
+        self.log = []
+        self.page_source = "<div class='card'><h3>One</h3></div>"
+
+    def execute_cdp_cmd(self, command, params):
+        if command == "Network.setBlockedURLs":
+            self.blocked = params["urls"]
+
+    def _event(self, method, **params):
+        self.log.append({"message": json.dumps({"message": {"method": method, "params": params}})})
+
+    def get(self, url):
+        for request_id, resource in enumerate([url] + PAGE_RESOURCES):
+            self._event("Network.requestWillBeSent", requestId=str(request_id), request={"url": resource})
+            if any(cdp_match(resource, pattern) for pattern in self.blocked):
+                self._event("Network.loadingFailed", requestId=str(request_id), blockedReason="inspector")
+
+    def get_log(self, name):
+        entries, self.log = self.log, []
+        return entries
+
+    def execute_script(self, script, *args):
+        return 1 if script in ("return 1", COUNT_SCRIPT) else None
+
+    def delete_all_cookies(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+def test_default_patterns():
+    patterns = blocked_patterns({})
+    assert "*.jpg" in patterns and "*.woff2" in patterns and "*.mp4" in patterns
+    assert "*.jpg?*" in patterns
+    assert "*google-analytics.com*" in patterns
+    assert "*.css" not in patterns
+
+
+def test_source_overrides():
+    patterns = blocked_patterns({"block": {"types": ["stylesheet"], "trackers": False,
+                                           "urls": ["*cdn.example.com/widgets*"]}})
+    assert patterns == ["*.css", "*.css?*", "*cdn.example.com/widgets*"]
+    assert blocked_patterns({"block": {"enabled": False}}) == []
+
+
+def test_query_strings_and_extensionless_assets_are_blocked():
+    patterns = blocked_patterns({})
+    for url in ("https://cdn.example.com/img.png?w=300", "https://example.com/a.webp?v=2&fit=crop",
+                "https://fonts.gstatic.com/s/inter/v13/UcCO3FwrK3iLTeHuS", "https://x.imgix.net/photo?w=640"):
+        assert any(cdp_match(url, pattern) for pattern in patterns), url
+    assert not any(cdp_match("https://example.com/api/items?format=json", pattern) for pattern in patterns)
+
+
+def test_counts_blocked_and_allowed():
+    driver = CDPDriver()
+    apply_blocking(driver, blocked_patterns({}))
+    driver.get("https://example.com/")
+
+    # Page, app.js and the API call load; images, fonts and tracker are blocked
+    assert count_requests(driver) == {"blocked": 5, "allowed": 3}
+    assert count_requests(driver) == {"blocked": 0, "allowed": 0}
+
+
+def test_pooled_browser_gets_each_sources_blocklist(memory_db):
+    """A reused browser does not keep the previous source's patterns"""
+    driver = CDPDriver()
+    crawler = WebCrawler(memory_db, browser_pool=BrowserPool(max_size=1, factory=lambda: driver))
+    source = {"_id": "dyn", "url": "https://example.com/", "type": "dynamic", "respect_robots": False,
+              "selectors": {"container": ".card", "title": "h3"}}
+
+    log = crawler.crawl_source(source)
+    assert log["metrics"]["requests_blocked"] == 5
+    assert log["metrics"]["requests_allowed"] == 3
+
+    log = crawler.crawl_source(dict(source, block={"enabled": False}))
+    assert log["metrics"]["requests_blocked"] == 0
+    assert log["metrics"]["requests_allowed"] == 8
@@ -0,0 +1,111 @@
+"""Test the on-disk response cache and record/replay crawling (offline)"""
+import gzip
+
+import pytest
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from response_cache import ResponseCache, CacheMiss
+from test_pdf import make_pdf
+
+PAGE = b"<html><body><div class='post'><h2>Cached story</h2></div></body></html>"
+XML = b"<root>" + b"".join(b"<item><t>%d</t></item>" % i for i in range(20)) + b"</root>"
+
+
+def make_crawler(memory_db, cache):
+    return WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10), response_cache=cache)
+
+
+def test_record_then_replay_without_network(memory_db, stub_server, tmp_path):
+    stub_server.routes["/page"] = (200, {"Content-Type": "text/html"}, PAGE)
+    stub_server.routes["/doc.pdf"] = (200, {"Content-Type": "application/pdf"}, make_pdf(3))
+    stub_server.routes["/dump.xml"] = (200, {"Content-Type": "application/xml"}, XML)
+    cache = ResponseCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    crawler = make_crawler(memory_db, cache)
+
+    base = stub_server.base_url
+    sources = [
+        {"_id": "h", "url": base + "/page", "type": "html", "selectors": {"container": ".post", "title": "h2"}},
+        {"_id": "p", "url": base + "/doc.pdf", "type": "pdf"},
+        {"_id": "x", "url": base + "/dump.xml", "type": "xml", "streaming": True, "max_items": 5},
+    ]
+
+    recorded = [crawler.crawl_source(dict(source, response_cache="record")) for source in sources]
+    assert [log["status"] for log in recorded] == ["success"] * 3
+    live_items = [dict(item) for item in memory_db.crawled_data]
+    requests_before = len(stub_server.requests)
+
+    memory_db.crawled_data.clear()
+    replayed = [crawler.crawl_source(dict(source, response_cache="replay")) for source in sources]
+
+    assert [log["status"] for log in replayed] == ["success"] * 3
+    assert len(stub_server.requests) == requests_before
+    assert [item["content"] for item in memory_db.crawled_data] == [item["content"] for item in live_items]
+    assert all(log["metrics"]["cache_hits"] == 1 for log in replayed)
+
+
+def test_replay_miss_fails_the_crawl(memory_db, tmp_path):
+    crawler = make_crawler(memory_db, ResponseCache(str(tmp_path)))
+    log = crawler.crawl_source({"_id": "h", "url": "https://example.com/never", "type": "html",
+                                "response_cache": "replay"})
+    assert log["status"] == "error"
+    assert "Not in response cache" in log["errors"][0]
+
+
+def test_identical_bodies_stored_once(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store_bytes("https://a.example/", "https://a.example/", 200, {}, PAGE)
+    cache.store_bytes("https://b.example/", "https://b.example/", 200, {}, PAGE)
+
+    stats = cache.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] == len(PAGE)
+
+
+def test_lru_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_bytes=250)
+    for name in ("a", "b", "c"):
+        cache.store_bytes(name, name, 200, {}, name.encode() * 100)
+        if name == "b":
+            cache.get("a")
+
+    # "b" was the least recently used when "c" pushed the cache over its limit
+    assert cache.get("b") is None
+    assert cache.read("a") == b"a" * 100
+    assert cache.read("c") == b"c" * 100
+    assert cache.stats()["bytes"] <= 250
+    with pytest.raises(CacheMiss):
+        cache.read("b")
+
+
+def test_decoded_body_is_stored(memory_db, stub_server, tmp_path):
+    stub_server.routes["/page"] = (200, {"Content-Type": "text/html", "Content-Encoding": "gzip"},
+                                   gzip.compress(PAGE))
+    cache = ResponseCache(str(tmp_path))
+    crawler = make_crawler(memory_db, cache)
+    source = {"_id": "h", "url": stub_server.base_url + "/page", "type": "html"}
+
+    crawler.crawl_source(dict(source, response_cache="record"))
+    entry = cache.get(source["url"])
+    assert "Content-Encoding" not in entry["headers"]
+    assert cache.read(source["url"]) == PAGE
+
+
+def test_dynamic_render_replayed_without_browser(memory_db, tmp_path):
+    from browser_pool import BrowserPool
+    from test_browser_pool import FakeDriver
+
+    html = "<div class='card'><h3>Rendered</h3></div>"
+    started = []
+    pool = BrowserPool(max_size=1, factory=lambda: started.append(1) or FakeDriver(html))
+    crawler = WebCrawler(memory_db, browser_pool=pool, response_cache=ResponseCache(str(tmp_path)))
+    source = {"_id": "d", "url": "https://example.com/app", "type": "dynamic", "respect_robots": False,
+              "selectors": {"container": ".card", "title": "h3"}}
+
+    assert crawler.crawl_source(dict(source, response_cache="record"))["status"] == "success"
+    pool.close()
+
+    log = crawler.crawl_source(dict(source, response_cache="replay"))
+    assert log["status"] == "success"
+    assert memory_db.crawled_data[-1]["data"]["title"] == "Rendered"
+    assert len(started) == 1
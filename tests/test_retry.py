@@ -0,0 +1,118 @@
+"""Test fetch retries with backoff and the per-host circuit breaker (offline)"""
+import socket
+import time
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CircuitOpen
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from retry_policy import backoff_delay, parse_retry_after, retry_settings
+
+PAGE = b"<html><body><div class='post'><h2>Back online</h2></div></body></html>"
+FAST_RETRY = {"attempts": 3, "backoff": 0.01, "max_backoff": 0.05}
+
+
+def make_crawler(memory_db, breaker=None):
+    return WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10),
+                      circuit_breaker=breaker or CircuitBreaker())
+
+
+def make_source(url, **overrides):
+    source = {"_id": "s", "url": url, "type": "html", "respect_robots": False, "retry": FAST_RETRY,
+              "selectors": {"container": ".post", "title": "h2"}}
+    source.update(overrides)
+    return source
+
+
+def flaky(failures, status=503):
+    """Route answering `status` for the first `failures` requests, then the page"""
+    calls = []
+
+    def route(handler):
+        calls.append(handler.path)
+        if len(calls) <= failures:
+            return status, {}, b"busy"
+        return 200, {"Content-Type": "text/html"}, PAGE
+    route.calls = calls
+    return route
+
+
+def test_backoff_is_jittered_exponential_and_capped():
+    for attempt in range(6):
+        delays = [backoff_delay(attempt, 0.5, 4) for _ in range(50)]
+        assert all(0 <= delay <= min(4, 0.5 * 2 ** attempt) for delay in delays)
+    assert len({backoff_delay(3, 0.5, 4) for _ in range(20)}) > 1
+
+    assert backoff_delay(0, 0.5, 10, retry_after="3") == 3
+    assert backoff_delay(0, 0.5, 2, retry_after="120") == 2
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0
+    assert retry_settings({"retry": False})["attempts"] == 0
+
+
+def test_retryable_status_is_retried_until_success(memory_db, stub_server):
+    route = stub_server.routes["/news"] = flaky(2)
+    log = make_crawler(memory_db).crawl_source(make_source(stub_server.base_url + "/news"))
+
+    assert log["status"] == "success"
+    assert len(route.calls) == 3
+    assert log["metrics"]["retries"] == 2
+    assert memory_db.crawled_data[0]["title"] == "Back online"
+
+
+def test_client_errors_are_not_retried(memory_db, stub_server):
+    route = stub_server.routes["/news"] = flaky(5, status=404)
+    log = make_crawler(memory_db).crawl_source(make_source(stub_server.base_url + "/news"))
+
+    assert log["status"] == "error"
+    assert len(route.calls) == 1
+
+
+def test_breaker_opens_then_half_open_probe_closes_it(memory_db, stub_server):
+    route = stub_server.routes["/news"] = flaky(2, status=500)
+    breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    crawler = make_crawler(memory_db, breaker)
+    source = make_source(stub_server.base_url + "/news", retry=False)
+
+    assert [crawler.crawl_source(source)["status"] for _ in range(2)] == ["error", "error"]
+    host = stub_server.base_url.split("//")[1]
+    assert breaker.stats()[host]["state"] == "open"
+
+    # Short-circuited: no request reaches the host
+    log = crawler.crawl_source(source)
+    assert log["status"] == "circuit_open"
+    assert len(route.calls) == 2
+    assert breaker.stats()[host]["short_circuited"] == 1
+
+    time.sleep(0.25)
+    assert crawler.crawl_source(source)["status"] == "success"
+    assert breaker.stats()[host]["state"] == "closed"
+
+
+def test_failed_probe_reopens_for_longer():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05, max_cooldown=1)
+    url = "https://down.example/"
+    breaker.record_failure(url)
+    time.sleep(0.06)
+
+    breaker.before(url)
+    # Only one probe at a time while half-open
+    with pytest.raises(CircuitOpen):
+        breaker.before(url)
+    breaker.record_failure(url)
+
+    stats = breaker.stats()["down.example"]
+    assert stats["state"] == "open" and stats["trips"] == 2
+    assert 0.05 < stats["retry_in"] <= 0.1
+
+
+def test_connection_errors_are_retried_and_counted(memory_db):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    breaker = CircuitBreaker(threshold=10)
+    log = make_crawler(memory_db, breaker).crawl_source(make_source(f"http://127.0.0.1:{port}/"))
+
+    assert log["status"] == "error"
+    assert log["metrics"]["retries"] == 3
+    assert breaker.stats()[f"127.0.0.1:{port}"]["consecutive_failures"] == 4
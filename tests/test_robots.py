@@ -0,0 +1,92 @@
+"""Test the robots.txt cache and its use by the crawler (offline)"""
+from datetime import datetime, timedelta
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from robots import RobotsCache, RobotsRules
+
+HTML = {"Content-Type": "text/html"}
+ROBOTS = b"User-agent: *\nDisallow: /private/\nCrawl-delay: 0.2\nSitemap: /sitemap.xml\n"
+PAGE = b"<html><body><p>Hello</p></body></html>"
+
+
+def make_crawler(memory_db):
+    return WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+
+
+def test_rules():
+    rules = RobotsRules(200, ROBOTS.decode())
+    assert rules.allows("https://example.com/news")
+    assert not rules.allows("https://example.com/private/a")
+    assert rules.crawl_delay == 0.2
+    assert rules.sitemaps == ["/sitemap.xml"]
+
+    assert RobotsRules(404).allows("https://example.com/private/a")
+    assert not RobotsRules(503).allows("https://example.com/")
+
+
+def test_disallowed_url_is_never_fetched(memory_db, stub_server):
+    stub_server.routes["/robots.txt"] = (200, {"Content-Type": "text/plain"}, ROBOTS)
+    stub_server.routes["/private/page"] = (200, HTML, PAGE)
+    crawler = make_crawler(memory_db)
+
+    log = crawler.crawl_source({"_id": "s", "url": stub_server.base_url + "/private/page", "type": "html"})
+
+    assert log["status"] == "disallowed"
+    assert [path for path, _ in stub_server.requests] == ["/robots.txt"]
+    assert log["metrics"]["robots_disallowed"] == 1
+
+
+def test_cache_hits_and_opt_out(memory_db, stub_server):
+    stub_server.routes["/robots.txt"] = (200, {"Content-Type": "text/plain"}, ROBOTS)
+    stub_server.routes["/page"] = (200, HTML, PAGE)
+    stub_server.routes["/private/page"] = (200, HTML, PAGE)
+    crawler = make_crawler(memory_db)
+    source = {"_id": "s", "url": stub_server.base_url + "/page", "type": "html", "conditional_get": False}
+
+    first = crawler.crawl_source(source)
+    second = crawler.crawl_source(source)
+    assert first["metrics"]["robots_cache_misses"] == 1
+    assert second["metrics"]["robots_cache_hits"] == 1
+    assert [path for path, _ in stub_server.requests].count("/robots.txt") == 1
+
+    # A new crawler (another process) reuses the copy saved in the database
+    assert make_crawler(memory_db).crawl_source(source)["metrics"]["robots_cache_hits"] == 1
+
+    opted_out = dict(source, url=stub_server.base_url + "/private/page", respect_robots=False)
+    assert crawler.crawl_source(opted_out)["status"] == "success"
+
+
+def test_expired_database_copy_is_refetched(memory_db):
+    memory_db.save_robots("https://example.com", {"status": 200, "text": "User-agent: *\nDisallow: /\n",
+                                                  "fetched_at": datetime.now() - timedelta(days=2)})
+    fetched = []
+    cache = RobotsCache(memory_db, ttl=3600)
+
+    rules, hit = cache.get("https://example.com/a", lambda url: fetched.append(url) or (404, ""))
+    assert not hit
+    assert fetched == ["https://example.com/robots.txt"]
+    assert rules.allows("https://example.com/a")
+
+
+def test_download_locks_are_not_kept(memory_db):
+    cache = RobotsCache(memory_db)
+    for n in range(100):
+        cache.get(f"https://site{n}.example/", lambda url: (404, ""))
+    assert len(cache._origin_locks) == 0
+
+
+def test_crawl_delay_paces_host(memory_db, stub_server):
+    stub_server.routes["/robots.txt"] = (200, {"Content-Type": "text/plain"}, ROBOTS)
+    for i in range(3):
+        stub_server.routes[f"/p{i}"] = (200, HTML, PAGE)
+    limiter = HostRateLimiter(1000, 1000, 10)
+    crawler = WebCrawler(memory_db, rate_limiter=limiter)
+
+    for i in range(3):
+        crawler.crawl_source({"_id": "s", "url": f"{stub_server.base_url}/p{i}", "type": "html"})
+
+    host = stub_server.base_url.split("://", 1)[1]
+    assert limiter.stats()[host]["requests_per_second"] == 5
+    # Two waits of ~0.2 s between the three pages
+    assert limiter.stats()[host]["total_wait"] >= 0.3
@@ -0,0 +1,128 @@
+"""Test the compressed snapshot store and bulk re-extraction (offline)"""
+import gzip
+import os
+
+import pytest
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from reextract import reextract
+from snapshot_store import SnapshotStore
+
+PAGE = b"""<html><head><title>News</title></head><body>
+<div class="post"><h2>First story</h2><span class="by">Ann</span></div>
+<div class="post"><h2>Second story</h2><span class="by">Bob</span></div>
+</body></html>"""
+XML = b"<root><item><t>one</t></item><item><t>two</t></item></root>"
+
+
+def make_crawler(memory_db, store):
+    return WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10), snapshot_store=store)
+
+
+def test_bodies_are_compressed_and_stored_once(tmp_path):
+    store = SnapshotStore(str(tmp_path), codec="gzip")
+    first = store.put(PAGE)
+    second = store.put(PAGE)
+
+    assert first["stored"] and not second["stored"]
+    assert first["hash"] == second["hash"]
+    path = store.path(first["hash"], "gzip")
+    assert gzip.decompress(open(path, "rb").read()) == PAGE
+    assert store.get(first["hash"]) == PAGE
+    assert len(os.listdir(os.path.dirname(path))) == 1
+
+    with pytest.raises(KeyError):
+        store.get("0" * 64)
+
+
+def test_store_is_pruned_oldest_first(tmp_path):
+    store = SnapshotStore(str(tmp_path), codec="gzip", max_bytes=3500)
+    bodies = [os.urandom(1000) for _ in range(4)]
+    digests = []
+    for age, body in enumerate(bodies[:3]):
+        digest = store.put(body)["hash"]
+        os.utime(store.path(digest, "gzip"), (1000 + age, 1000 + age))
+        digests.append(digest)
+
+    # Seen again: no longer the oldest
+    assert store.put(bodies[0])["stored"] is False
+    digests.append(store.put(bodies[3])["hash"])
+
+    assert digests[1] not in store
+    assert all(digest in store for digest in (digests[0], digests[2], digests[3]))
+    assert store.pruned == 1 and store.disk_usage() <= 3500
+
+
+def test_crawled_items_reference_their_snapshot(memory_db, stub_server, snapshot_dir):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html; charset=utf-8"}, PAGE)
+    source = {"_id": "news", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+              "conditional_get": False, "selectors": {"container": ".post", "title": "h2"}}
+    crawler = make_crawler(memory_db, snapshot_dir)
+
+    first = crawler.crawl_source(source)
+    second = crawler.crawl_source(source)
+
+    assert first["metrics"]["snapshots_stored"] == 1
+    assert second["metrics"]["snapshots_deduplicated"] == 1
+    digests = {item["snapshot"] for item in memory_db.crawled_data}
+    assert len(digests) == 1 and len(memory_db.snapshots) == 1
+    snapshot = next(iter(memory_db.snapshots.values()))
+    assert snapshot["extractor"] == "crawler.WebCrawler"
+    assert snapshot["encoding"] == "utf-8"
+    assert snapshot_dir.get(snapshot["hash"]) == PAGE
+
+
+def test_snapshots_can_be_disabled_per_source(memory_db, stub_server, snapshot_dir):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html"}, PAGE)
+    crawler = make_crawler(memory_db, snapshot_dir)
+    log = crawler.crawl_source({"_id": "news", "url": stub_server.base_url + "/news", "type": "html",
+                                "respect_robots": False, "snapshot": False,
+                                "selectors": {"container": ".post", "title": "h2"}})
+
+    assert log["status"] == "success"
+    assert "snapshot" not in memory_db.crawled_data[0]
+    assert not memory_db.snapshots
+
+
+def test_reextract_replaces_items_with_fixed_selectors(memory_db, stub_server, snapshot_dir):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html"}, PAGE)
+    stub_server.routes["/feed.xml"] = (200, {"Content-Type": "application/xml"}, XML)
+    crawler = make_crawler(memory_db, snapshot_dir)
+
+    # A typo in the author selector: items are stored without it
+    html_source = {"_id": "news", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+                   "selectors": {"container": ".post", "title": "h2", "author": ".bye"}}
+    xml_source = {"_id": "feed", "url": stub_server.base_url + "/feed.xml", "type": "xml",
+                  "respect_robots": False}
+    crawler.crawl_source(html_source)
+    crawler.crawl_source(xml_source)
+    assert all("author" not in item.get("data", {}) for item in memory_db.crawled_data)
+    unrelated = {"source_id": "other", "source_url": "https://other.example/", "content": "keep me"}
+    memory_db.crawled_data.append(unrelated)
+
+    # The site is gone: re-extraction must only read the snapshots
+    stub_server.routes.clear()
+    fixed = dict(html_source, selectors={"container": ".post", "title": "h2", "author": ".by"})
+    stats = reextract(memory_db, [fixed, xml_source], workers=2, batch_size=1, store=snapshot_dir)
+
+    assert stats["snapshots"] == 2 and stats["failed"] == 0 and stats["missing"] == 0
+    assert stats["deleted"] == 4 and stats["inserted"] == 4
+    html_items = [item for item in memory_db.crawled_data if item["source_id"] == "news"]
+    assert [item["data"]["author"] for item in html_items] == ["Ann", "Bob"]
+    xml_items = [item for item in memory_db.crawled_data if item["source_id"] == "feed"]
+    assert [item["content"] for item in xml_items] == ["one", "two"]
+    assert unrelated in memory_db.crawled_data
+
+
+def test_reextract_keeps_items_of_missing_bodies(memory_db, stub_server, tmp_path):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html"}, PAGE)
+    store = SnapshotStore(str(tmp_path / "store"))
+    source = {"_id": "news", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+              "selectors": {"container": ".post", "title": "h2"}}
+    make_crawler(memory_db, store).crawl_source(source)
+
+    stats = reextract(memory_db, [source], workers=1, store=SnapshotStore(str(tmp_path / "empty")))
+
+    assert stats["missing"] == 1 and stats["inserted"] == 0
+    assert len(memory_db.crawled_data) == 2
@@ -0,0 +1,137 @@
+"""Test the local disk spool and its replay (offline)"""
+import gzip
+import os
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from conftest import MemoryDatabase
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from spool import DiskSpool, SpoolReplayer
+
+PAGE = b"<html><body><div class='post'><h2>Kept on disk</h2></div></body></html>"
+
+
+class FlakyDatabase(MemoryDatabase):
+    """MemoryDatabase that starts disconnected and can fail its bulk writes"""
+
+    def __init__(self, connected=False):
+        super().__init__()
+        self.fail = False
+        self.reachable = connected
+        self.order = []
+        if not connected:
+            self.crawled_data = self.crawl_logs = None
+
+    def connect(self, quiet=False):
+        if self.reachable and self.crawled_data is None:
+            self.crawled_data, self.crawl_logs = [], []
+        return self.reachable
+
+    def bulk_store_data(self, data_list):
+        if self.fail:
+            return {"inserted": 0, "updated": 0, "unchanged": 0, "failed": len(data_list)}
+        self.order.append("items")
+        return super().bulk_store_data(data_list)
+
+    def update_source_state(self, url, state):
+        self.order.append("state")
+        return super().update_source_state(url, state)
+
+
+def html_source(stub_server):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, PAGE)
+    return {"_id": ObjectId(), "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+            "selectors": {"container": ".post", "title": "h2"}}
+
+
+def test_records_round_trip_with_bson_types(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    source_id = ObjectId()
+    fetched = datetime(2026, 10, 17, 8, 30, tzinfo=timezone.utc)
+    spool.spool_crawl([{"source_id": source_id, "title": "A", "timestamp": fetched}],
+                      {"https://a.example/feed": {"etag": '"v2"'}}, {"source_id": source_id, "status": "spooled"})
+    spool.close()
+
+    (segment,) = spool.segments()
+    items, state, log = DiskSpool.iter_records(segment)
+    assert items["items"][0]["source_id"] == source_id
+    assert items["items"][0]["timestamp"].replace(tzinfo=timezone.utc) == fetched
+    assert state == {"kind": "state", "url": "https://a.example/feed", "state": {"etag": '"v2"'}}
+    assert log["log"]["status"] == "spooled"
+
+
+def test_crawl_is_spooled_while_disconnected_and_replayed_on_reconnect(stub_server, spool_dir):
+    db = FlakyDatabase()
+    crawler = WebCrawler(db, rate_limiter=HostRateLimiter(1000, 1000, 10))
+    source = html_source(stub_server)
+
+    log = crawler.crawl_source(source)
+    assert log["status"] == "spooled" and log["items_collected"] == 1
+    assert spool_dir.stats()["crawls_spooled"] == 1
+
+    replayer = SpoolReplayer(db, spool_dir, interval=3600)
+    assert replayer.run_once() is None
+    db.reachable = True
+    assert replayer.run_once() == {"segments": 1, "crawls": 1, "items": 1, "failed_segments": 0}
+    replayer.stop()
+
+    assert db.crawled_data[0]["title"] == "Kept on disk"
+    assert db.state[source["url"]]["etag"] == '"v1"'
+    assert db.order == ["items", "state"]
+    assert db.crawl_logs[0]["status"] == "spooled" and db.crawl_logs[0]["replayed"] is True
+    assert spool_dir.segments() == []
+
+
+def test_failed_replay_keeps_the_segment(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.spool_crawl([{"title": "A", "link": "https://a.example/1"}], log={"status": "spooled"})
+    db = FlakyDatabase(connected=True)
+    db.fail = True
+
+    assert spool.replay(db)["failed_segments"] == 1
+    assert len(spool.segments()) == 1 and db.crawl_logs == []
+
+    db.fail = False
+    assert spool.replay(db)["items"] == 1
+    assert spool.segments() == []
+
+
+def test_replaying_twice_stores_no_duplicates(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.spool_crawl([{"title": "A", "link": "https://a.example/1", "content": "same"}])
+    spool.close()
+    (segment,) = spool.segments()
+    with open(segment, "rb") as f:
+        data = f.read()
+
+    db = FlakyDatabase(connected=True)
+    spool.replay(db)
+    # As if the process died after writing but before deleting the segment
+    with open(segment, "wb") as f:
+        f.write(data)
+    spool.replay(db)
+    assert len(db.crawled_data) == 1
+
+
+def test_truncated_segment_replays_its_complete_crawls(tmp_path):
+    spool = DiskSpool(str(tmp_path))
+    spool.spool_crawl([{"title": "A", "link": "https://a.example/1"}])
+    spool.close()
+    (segment,) = spool.segments()
+    with open(segment, "ab") as f:
+        f.write(gzip.compress(b'{"kind": "items", "items": [{"title": "B"}]}\n')[:-12])
+
+    db = FlakyDatabase(connected=True)
+    assert spool.replay(db)["items"] == 1
+    assert [item["title"] for item in db.crawled_data] == ["A"]
+
+
+def test_segment_left_open_by_a_dead_process_is_recovered(tmp_path):
+    path = os.path.join(str(tmp_path), "spool-20261017000000-999999999-00001.ndjson.gz.open")
+    with open(path, "wb") as f:
+        f.write(gzip.compress(b'{"kind": "log", "log": {"status": "spooled"}}\n'))
+
+    spool = DiskSpool(str(tmp_path))
+    assert spool.segments() == [path[:-len(".open")]]
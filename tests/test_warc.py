@@ -0,0 +1,104 @@
+"""Test WARC archiving of fetched responses and replay from WARC files (offline)"""
+import base64
+import gzip
+import hashlib
+import os
+
+import requests
+
+from crawler import WebCrawler
+from rate_limiter import HostRateLimiter
+from response_cache import ResponseCache
+from snapshot_store import SnapshotStore
+from warc_archive import WarcWriter, iter_warc, iter_responses, load_into_cache, restore_snapshots
+
+PAGE = b"<html><body>" + b"".join(b"<div class='post'><h2>Story %d</h2></div>" % i for i in range(20)) + b"</body></html>"
+
+
+def sha1(data):
+    return "sha1:" + base64.b32encode(hashlib.sha1(data).digest()).decode()
+
+
+def crawl_page(memory_db, stub_server, writer):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html", "Content-Encoding": "gzip"},
+                                   gzip.compress(PAGE))
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10), warc_writer=writer)
+    source = {"_id": "news", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+              "selectors": {"container": ".post", "title": "h2"}}
+    log = crawler.crawl_source(source)
+    writer.close()
+    return source, log
+
+
+def test_archives_exact_wire_bytes(memory_db, stub_server, tmp_path):
+    writer = WarcWriter(str(tmp_path))
+    _, log = crawl_page(memory_db, stub_server, writer)
+    assert log["status"] == "success"
+
+    [path] = writer.files
+    records = list(iter_warc(path))
+    assert [record["type"] for record in records] == ["warcinfo", "response", "request"]
+
+    response = records[1]
+    payload = response["block"].partition(b"\r\n\r\n")[2]
+    assert payload == stub_server.routes["/news"][2]
+    assert response["headers"]["WARC-Payload-Digest"] == sha1(payload)
+    assert response["headers"]["WARC-Block-Digest"] == sha1(response["block"])
+    assert response["headers"]["WARC-Target-URI"].endswith("/news")
+    assert records[2]["headers"]["WARC-Concurrent-To"] == response["headers"]["WARC-Record-ID"]
+    assert records[2]["block"].startswith(b"GET /news HTTP/1.1\r\n")
+
+    # Every record is its own gzip member
+    with open(path, "rb") as f:
+        assert f.read().count(b"\x1f\x8b\x08") >= 3
+
+    [archived] = iter_responses([path])
+    assert archived["body"] == PAGE and not archived["truncated"]
+
+
+def test_files_rotate_by_size(stub_server, tmp_path):
+    stub_server.routes["/a"] = (200, {}, b"a" * 1000)
+    writer = WarcWriter(str(tmp_path / "warc"), max_bytes=1)
+    session = requests.Session()
+    session.hooks["response"].append(writer.capture)
+    for _ in range(3):
+        session.get(stub_server.base_url + "/a")
+    writer.close()
+
+    assert len(writer.files) == 3
+    assert sorted(os.listdir(tmp_path / "warc")) == sorted(os.path.basename(path) for path in writer.files)
+    assert writer.stats()["records"] == 3
+
+
+def test_partially_read_body_is_marked_truncated(stub_server, tmp_path):
+    stub_server.routes["/big"] = (200, {}, b"x" * 200000)
+    writer = WarcWriter(str(tmp_path))
+    session = requests.Session()
+    session.hooks["response"].append(writer.capture)
+    response = session.get(stub_server.base_url + "/big", stream=True)
+    next(response.iter_content(1024))
+    response.close()
+    writer.close()
+
+    [record] = [r for r in iter_warc(writer.files[0]) if r["type"] == "response"]
+    assert record["headers"]["WARC-Truncated"] == "unspecified"
+
+
+def test_warc_feeds_replay_and_snapshot_restore(memory_db, stub_server, tmp_path):
+    writer = WarcWriter(str(tmp_path / "warc"))
+    source, _ = crawl_page(memory_db, stub_server, writer)
+    live = [item["title"] for item in memory_db.crawled_data]
+
+    cache = ResponseCache(str(tmp_path / "cache"))
+    assert load_into_cache(writer.files, cache) == 1
+    stub_server.routes.clear()
+    memory_db.crawled_data.clear()
+    crawler = WebCrawler(memory_db, rate_limiter=HostRateLimiter(1000, 1000, 10), response_cache=cache)
+    log = crawler.crawl_source(dict(source, response_cache="replay"))
+
+    assert log["status"] == "success"
+    assert [item["title"] for item in memory_db.crawled_data] == live
+
+    store = SnapshotStore(str(tmp_path / "restored"))
+    assert restore_snapshots(writer.files, store) == 1
+    assert store.get(memory_db.crawled_data[0]["snapshot"]) == PAGE
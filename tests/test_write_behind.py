@@ -0,0 +1,211 @@
+"""Test the write-behind buffered writer (offline)"""
+import threading
+import time
+
+from pymongo.errors import BulkWriteError
+
+from conftest import MemoryDatabase
+from crawler import WebCrawler
+from database import CrawlerDatabase
+from fingerprint import fingerprint_item
+from rate_limiter import HostRateLimiter
+from write_behind import BufferedWriter
+
+PAGE = b"<html><body><div class='post'><h2>Stored later</h2></div></body></html>"
+
+
+class SlowDatabase(MemoryDatabase):
+    """MemoryDatabase counting bulk writes, which can be held up or made to fail"""
+
+    def __init__(self):
+        super().__init__()
+        self.bulk_writes = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+        # Items of these sources fail, reported by fingerprint like CrawlerDatabase does
+        self.fail_sources = set()
+
+    def bulk_store_data(self, data_list):
+        self.release.wait()
+        self.bulk_writes.append(len(data_list))
+        if self.fail:
+            return {"inserted": 0, "updated": 0, "unchanged": 0, "failed": len(data_list)}
+        rejected = [item for item in data_list if item["source_id"] in self.fail_sources]
+        stored = super().bulk_store_data([item for item in data_list if item not in rejected])
+        if rejected:
+            for item in rejected:
+                fingerprint_item(item)
+            stored.update(failed=len(rejected), failed_fingerprints=[item["fingerprint"] for item in rejected])
+        return stored
+
+
+class PartialLogs:
+    """crawl_logs collection whose insert_many rejects the log of source s2"""
+
+    def insert_many(self, logs, ordered=True):
+        rejected = [index for index, log in enumerate(logs) if log["source_id"] == "s2"]
+        raise BulkWriteError({"nInserted": len(logs) - len(rejected),
+                              "writeErrors": [{"index": index, "code": 121, "errmsg": "invalid"} for index in rejected]})
+
+
+class PartialLogDatabase(SlowDatabase):
+    """SlowDatabase logging crawls through CrawlerDatabase.bulk_log_crawl"""
+
+    def __init__(self):
+        super().__init__()
+        self.crawl_logs = PartialLogs()
+
+    bulk_log_crawl = CrawlerDatabase.bulk_log_crawl
+
+
+def crawl_log(n):
+    return {"source_id": f"s{n}", "status": "success", "errors": [], "metrics": {}}
+
+
+def items(source, count):
+    return [{"source_id": source, "link": f"https://a.example/{source}/{i}", "title": str(i)} for i in range(count)]
+
+
+def test_crawls_are_grouped_into_one_bulk_write():
+    db = SlowDatabase()
+    writer = BufferedWriter(db, max_batch=100, max_delay=60)
+    for n in range(3):
+        writer.submit(items(f"s{n}", 5), crawl_log(n), {f"https://a.example/{n}": {"etag": f'"{n}"'}})
+
+    assert writer.flush(timeout=5)
+    assert db.bulk_writes == [15]
+    assert len(db.crawl_logs) == 3
+    assert db.state["https://a.example/2"] == {"etag": '"2"'}
+
+    stats = writer.stats()
+    assert (stats["flushes"], stats["items_written"], stats["max_batch_size"]) == (1, 15, 15)
+    assert stats["stored"]["inserted"] == 15
+    writer.close()
+
+
+def test_batches_are_written_by_size_or_age():
+    db = SlowDatabase()
+    writer = BufferedWriter(db, max_batch=10, max_delay=0.05)
+    writer.submit(items("a", 6))
+    writer.submit(items("b", 6))
+    time.sleep(0.3)
+
+    # Whole crawls per batch: 6 + 6 exceeds max_batch, so two writes
+    assert db.bulk_writes == [6, 6]
+    assert writer.stats()["queued_items"] == 0
+    writer.close()
+
+
+def test_full_queue_makes_crawls_wait():
+    db = SlowDatabase()
+    db.release.clear()
+    writer = BufferedWriter(db, max_batch=4, max_delay=0, max_queue=8)
+    writer.submit(items("a", 4))
+    writer.submit(items("b", 4))
+
+    log = crawl_log(3)
+    threading.Timer(0.2, db.release.set).start()
+    waited = writer.submit(items("c", 4), log)
+
+    assert waited >= 0.15
+    assert log["metrics"]["write_wait"] >= 0.15
+    assert writer.stats()["backpressure_waits"] == 1
+    writer.close()
+    assert len(db.crawled_data) == 12
+
+
+def test_state_is_not_saved_when_items_cannot_be_stored():
+    db = SlowDatabase()
+    db.fail = True
+    writer = BufferedWriter(db, max_delay=0)
+    log = crawl_log(1)
+    writer.submit(items("s1", 2), log, {"https://a.example/feed": {"etag": '"v2"'}})
+    writer.close()
+
+    assert db.state == {}
+    assert log["status"] == "success"
+    assert db.crawl_logs[0]["status"] == "error" and db.crawl_logs[0]["errors"] == ["Could not store 2 items"]
+    assert writer.stats()["write_errors"] == 1
+
+
+def test_crawler_hands_results_to_the_writer(stub_server):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, PAGE)
+    db = SlowDatabase()
+    writer = BufferedWriter(db, max_delay=60)
+    crawler = WebCrawler(db, rate_limiter=HostRateLimiter(1000, 1000, 10), writer=writer)
+    source = {"_id": "s", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+              "selectors": {"container": ".post", "title": "h2"}}
+
+    log = crawler.crawl_source(source)
+    assert log["status"] == "success" and log["items_collected"] == 1
+    assert db.crawled_data == [] and db.crawl_logs == []
+
+    writer.close()
+    assert db.crawled_data[0]["title"] == "Stored later"
+    assert db.crawl_logs == [log]
+    assert db.state[source["url"]]["etag"] == '"v1"'
+
+
+def test_crawls_that_cannot_be_stored_are_spooled(spool_dir):
+    db = SlowDatabase()
+    db.fail = True
+    writer = BufferedWriter(db, max_delay=0, spool=spool_dir)
+    writer.submit(items("s1", 2), crawl_log(1), {"https://a.example/feed": {"etag": '"v2"'}})
+    writer.close()
+
+    assert db.state == {} and db.crawl_logs == []
+    db.fail = False
+    assert spool_dir.replay(db)["items"] == 2
+    assert db.state["https://a.example/feed"] == {"etag": '"v2"'}
+    assert db.crawl_logs[0]["status"] == "spooled"
+
+
+def test_only_crawls_with_failed_items_are_held_back(spool_dir):
+    db = SlowDatabase()
+    db.fail_sources = {"s2"}
+    writer = BufferedWriter(db, max_delay=60, spool=spool_dir)
+    for n in (1, 2, 3):
+        writer.submit(items(f"s{n}", 2), crawl_log(n), {f"https://a.example/{n}": {"etag": f'"{n}"'}})
+    writer.close()
+
+    assert db.bulk_writes == [6]
+    assert sorted(item["source_id"] for item in db.crawled_data) == ["s1", "s1", "s3", "s3"]
+    assert sorted(db.state) == ["https://a.example/1", "https://a.example/3"]
+    assert [log["status"] for log in db.crawl_logs] == ["success", "success"]
+    stats = writer.stats()
+    assert (stats["write_errors"], stats["items_written"]) == (1, 4)
+
+    # Only the failed crawl was spooled, with its own items and state
+    db.fail_sources = set()
+    assert spool_dir.replay(db)["items"] == 2
+    assert db.state["https://a.example/2"] == {"etag": '"2"'}
+
+
+def test_crawl_stored_directly_after_close_keeps_state_if_storage_fails(stub_server):
+    stub_server.routes["/news"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, PAGE)
+    db = SlowDatabase()
+    db.fail = True
+    writer = BufferedWriter(db, max_delay=60)
+    writer.close()
+    crawler = WebCrawler(db, rate_limiter=HostRateLimiter(1000, 1000, 10), writer=writer)
+    crawler.spool = None
+    source = {"_id": "s", "url": stub_server.base_url + "/news", "type": "html", "respect_robots": False,
+              "selectors": {"container": ".post", "title": "h2"}}
+
+    log = crawler.crawl_source(source)
+    assert log["status"] == "error" and log["errors"] == ["Could not store 1 items"]
+    assert db.state == {}
+
+
+def test_only_logs_that_failed_to_insert_are_spooled(spool_dir):
+    db = PartialLogDatabase()
+    writer = BufferedWriter(db, max_delay=60, spool=spool_dir)
+    for n in (1, 2, 3):
+        writer.submit(items(f"s{n}", 1), crawl_log(n), {})
+    writer.close()
+
+    assert writer.stats()["logs_written"] == 2
+    replayed = MemoryDatabase()
+    assert spool_dir.replay(replayed)["crawls"] == 1
+    assert [log["source_id"] for log in replayed.crawl_logs] == ["s2"]
@@ -0,0 +1,39 @@
+"""Test incremental XML crawling (offline)"""
+import io
+
+from crawler import WebCrawler
+from xml_stream import iter_records
+
+DUMP = (b"<?xml version='1.0'?><dump><meta>header</meta>"
+        + b"".join(b"<record><id>%d</id> <name> Row %d </name></record>" % (i, i) for i in range(200))
+        + b"</dump>")
+
+
+def test_streaming_matches_in_memory_parse(memory_db, stub_server):
+    stub_server.routes["/dump.xml"] = (200, {"Content-Type": "application/xml"}, DUMP)
+    crawler = WebCrawler(memory_db)
+    base = {"url": stub_server.base_url + "/dump.xml", "type": "xml", "max_items": 1000}
+
+    crawler.crawl_source(dict(base, _id="full", streaming=False))
+    crawler.crawl_source(dict(base, _id="stream", streaming=True))
+
+    full = [i["content"] for i in memory_db.crawled_data if i["source_id"] == "full"]
+    streamed = [i["content"] for i in memory_db.crawled_data if i["source_id"] == "stream"]
+    assert len(full) == 200
+    assert streamed == full
+
+
+def test_streaming_stops_at_max_items(memory_db, stub_server):
+    stub_server.routes["/dump.xml"] = (200, {"Content-Type": "application/xml"}, DUMP)
+    crawler = WebCrawler(memory_db)
+    log = crawler.crawl_source({"_id": "s", "url": stub_server.base_url + "/dump.xml",
+                                "type": "xml", "streaming": True, "max_items": 5})
+
+    assert log["items_collected"] == 5
+    assert memory_db.crawled_data[-1]["content"] == "4Row 4"
+
+
+def test_nested_records_emitted_once():
+    doc = b"<root><item>a<record>b</record></item><record>c</record></root>"
+    records = list(iter_records(io.BytesIO(doc)))
+    assert [r["content"] for r in records] == ["ab", "c"]
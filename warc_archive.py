@@ -0,0 +1,412 @@
+"""
+WARC Archive
+Exact copies of every HTTP exchange made through the crawler's session
+
+Responses are captured as their bodies are read, so the archived payload
+is the bytes received on the wire (still gzip/br encoded; only the HTTP
+chunk framing, removed by http.client, is not kept). Each exchange is
+written as a request and a response record, every record its own gzip
+member, by a background thread; the crawl only copies bytes into a spool
+file. Files rotate once they exceed CRAWLER_WARC_MAX_BYTES.
+
+The reader side loads archived responses into the response cache
+(replay mode) or the snapshot store (re-extraction).
+"""
+import atexit
+import base64
+import gzip
+import hashlib
+import io
+import itertools
+import os
+import queue
+import socket
+import tempfile
+import threading
+import uuid
+import weakref
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
+
+import urllib3
+
+# Archive every fetch made through WebCrawler.session
+WARC_ENABLED = os.getenv('CRAWLER_WARC', 'false').lower() == 'true'
+DEFAULT_DIRECTORY = os.getenv('CRAWLER_WARC_DIR', os.path.join('data', 'warc'))
+DEFAULT_MAX_BYTES = int(os.getenv('CRAWLER_WARC_MAX_BYTES', 1024 * 1024 * 1024))
+DEFAULT_PREFIX = os.getenv('CRAWLER_WARC_PREFIX', 'crawl')
+
+WARC_VERSION = "WARC/1.0"
+
+# Captured bodies stay in memory up to this size, then spill to a temp file
+SPOOL_BYTES = 1024 * 1024
+
+# Files being written carry this suffix until they are rotated or closed
+OPEN_SUFFIX = ".open"
+
+# Removed from archived headers: the payload is stored without chunk framing
+FRAMING_HEADERS = {"transfer-encoding"}
+
+HTTP_VERSIONS = {9: "HTTP/0.9", 10: "HTTP/1.0", 11: "HTTP/1.1", 20: "HTTP/2"}
+
+CHUNK_SIZE = 64 * 1024
+
+
+def warc_date(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sha1_digest(chunks: Iterable[bytes]) -> str:
+    """WARC digest (sha1, base32) of a byte stream"""
+    digest = hashlib.sha1()
+    for chunk in chunks:
+        digest.update(chunk)
+    return "sha1:" + base64.b32encode(digest.digest()).decode("ascii")
+
+
+class _Capture:
+    """
+    Wraps the http.client response under urllib3, copying body bytes as they are read
+
+    Hides the `fp` attribute so urllib3 reads through http.client (which
+    removes chunk framing) instead of parsing chunks on the socket itself.
+    """
+
+    def __init__(self, fp, exchange: Dict[str, Any], writer: "WarcWriter"):
+        self._fp = fp
+        self._exchange = exchange
+        self._writer = writer
+        self._body = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        self._done = False
+
+    def __getattr__(self, name):
+        if name == "fp":
+            raise AttributeError(name)
+        return getattr(self._fp, name)
+
+    def read(self, *args, **kwargs):
+        return self._copy(self._fp.read(*args, **kwargs))
+
+    def read1(self, *args, **kwargs):
+        return self._copy(self._fp.read1(*args, **kwargs))
+
+    def readinto(self, buffer):
+        count = self._fp.readinto(buffer)
+        self._copy(bytes(memoryview(buffer)[:count]))
+        return count
+
+    def _copy(self, data: bytes) -> bytes:
+        if not self._done:
+            if data:
+                self._body.write(data)
+            if not data or self._fp.isclosed():
+                self.finish()
+        return data
+
+    def close(self):
+        self.finish()
+        self._fp.close()
+
+    def finish(self):
+        """Hand the exchange to the writer (once); a body not read to the end is marked truncated"""
+        if self._done:
+            return
+        self._done = True
+        self._exchange["truncated"] = not self._fp.isclosed()
+        self._writer.submit(self._exchange, self._body)
+
+
+class WarcWriter:
+    """Background writer of gzip-per-record WARC files with size-based rotation"""
+
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES,
+                 prefix: str = DEFAULT_PREFIX):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.prefix = prefix
+        os.makedirs(directory, exist_ok=True)
+
+        # Unbounded on purpose: queued bodies live in spool files, and the crawl must never wait
+        self._queue: "queue.Queue[Optional[Tuple[Dict[str, Any], Any]]]" = queue.Queue()
+        self._file = None
+        self._path = None
+        self._serial = 0
+        self.files: List[str] = []
+        self.records = 0
+        self.bytes_written = 0
+        self.errors = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="warc-writer", daemon=True)
+        self._thread.start()
+
+    # ==================== CAPTURE ====================
+
+    def capture(self, response, *args, **kwargs):
+        """requests response hook: archive this exchange once its body has been read"""
+        raw = response.raw
+        if self._closed or not hasattr(raw, "_fp") or raw._fp is None:
+            return response
+
+        request = response.request
+        request_body = request.body or b""
+        if isinstance(request_body, str):
+            request_body = request_body.encode("utf-8")
+        exchange = {
+            "url": response.url,
+            "date": datetime.now(timezone.utc),
+            "method": request.method,
+            "path": request.path_url,
+            "request_headers": list(request.headers.items()),
+            # Streamed (file or generator) request bodies are not archived
+            "request_body": request_body if isinstance(request_body, bytes) else b"",
+            "version": HTTP_VERSIONS.get(getattr(raw, "version", 11), "HTTP/1.1"),
+            "status": response.status_code,
+            "reason": response.reason or "",
+            "headers": list(raw.headers.items()),
+            "ip": self._peer_address(raw)
+        }
+        capture = _Capture(raw._fp, exchange, self)
+        raw._fp = capture
+        # Responses dropped without being read or closed are still archived (as truncated)
+        weakref.finalize(response, capture.finish)
+        return response
+
+    @staticmethod
+    def _peer_address(raw) -> Optional[str]:
+        try:
+            return raw._connection.sock.getpeername()[0]
+        except (AttributeError, OSError, TypeError):
+            return None
+
+    def submit(self, exchange: Dict[str, Any], body):
+        self._queue.put((exchange, body))
+
+    # ==================== WRITING ====================
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            try:
+                if entry is None:
+                    self._close_file()
+                    return
+                exchange, body = entry
+                try:
+                    self._write_exchange(exchange, body)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ WARC record not written for {exchange['url']}: {e}")
+                finally:
+                    body.close()
+            finally:
+                self._queue.task_done()
+
+    def _open_file(self):
+        self._serial += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        name = f"{self.prefix}-{stamp}-{os.getpid()}-{self._serial:05d}.warc.gz"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path + OPEN_SUFFIX, "wb")
+
+        info = (f"software: web-crawler\r\nformat: WARC File Format 1.0\r\n"
+                f"hostname: {socket.gethostname()}\r\n").encode("utf-8")
+        self._write_record({"WARC-Type": "warcinfo", "WARC-Filename": name,
+                            "Content-Type": "application/warc-fields"}, [info], len(info))
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._path + OPEN_SUFFIX, self._path)
+        self.files.append(self._path)
+        self._file = None
+
+    def _write_exchange(self, exchange: Dict[str, Any], body):
+        if self._file is None:
+            self._open_file()
+
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+        date = warc_date(exchange["date"])
+
+        body_size = body.tell()
+        status_line = f"{exchange['version']} {exchange['status']} {exchange['reason']}\r\n"
+        head = status_line + "".join(f"{name}: {value}\r\n" for name, value in exchange["headers"]
+                                     if name.lower() not in FRAMING_HEADERS)
+        head = (head + "\r\n").encode("iso-8859-1", "replace")
+
+        payload_digest = sha1_digest(self._chunks(body))
+        block_digest = sha1_digest(itertools.chain([head], self._chunks(body)))
+        headers = {"WARC-Type": "response", "WARC-Record-ID": response_id, "WARC-Date": date,
+                   "WARC-Target-URI": exchange["url"], "WARC-Block-Digest": block_digest,
+                   "WARC-Payload-Digest": payload_digest,
+                   "Content-Type": "application/http; msgtype=response"}
+        if exchange["ip"]:
+            headers["WARC-IP-Address"] = exchange["ip"]
+        if exchange["truncated"]:
+            headers["WARC-Truncated"] = "unspecified"
+        self._write_record(headers, itertools.chain([head], self._chunks(body)), len(head) + body_size)
+
+        # http.client always sends HTTP/1.1 requests, whatever the server answers with
+        request_line = f"{exchange['method']} {exchange['path']} HTTP/1.1\r\n"
+        request = request_line + "".join(f"{name}: {value}\r\n" for name, value in exchange["request_headers"])
+        request = (request + "\r\n").encode("iso-8859-1", "replace") + exchange["request_body"]
+        self._write_record({"WARC-Type": "request", "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+                            "WARC-Date": date, "WARC-Target-URI": exchange["url"],
+                            "WARC-Concurrent-To": response_id,
+                            "WARC-Block-Digest": sha1_digest([request]),
+                            "Content-Type": "application/http; msgtype=request"}, [request], len(request))
+
+        self.records += 1
+        if self._file.tell() >= self.max_bytes:
+            self._close_file()
+
+    @staticmethod
+    def _chunks(body) -> Iterator[bytes]:
+        body.seek(0)
+        while True:
+            chunk = body.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def _write_record(self, headers: Dict[str, str], block: Iterable[bytes], length: int):
+        """Append one record as its own gzip member"""
+        headers.setdefault("WARC-Record-ID", f"<urn:uuid:{uuid.uuid4()}>")
+        headers.setdefault("WARC-Date", warc_date(datetime.now(timezone.utc)))
+        lines = [WARC_VERSION] + [f"{name}: {value}" for name, value in headers.items()]
+        lines.append(f"Content-Length: {length}")
+
+        start = self._file.tell()
+        with gzip.GzipFile(fileobj=self._file, mode="wb") as member:
+            member.write(("\r\n".join(lines) + "\r\n\r\n").encode("utf-8"))
+            for chunk in block:
+                member.write(chunk)
+            member.write(b"\r\n\r\n")
+        self.bytes_written += self._file.tell() - start
+
+    # ==================== LIFECYCLE ====================
+
+    def flush(self):
+        """Wait until every captured exchange is on disk"""
+        self._queue.join()
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Write what is queued and close the current file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"records": self.records, "bytes": self.bytes_written, "files": len(self.files),
+                "queued": self._queue.qsize(), "errors": self.errors}
+
+
+# ==================== READING ====================
+
+def iter_warc(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the records of a WARC file (gzipped or not)
+
+    Yields:
+        {"type", "headers" (WARC headers), "block" (record content bytes)}
+    """
+    opener = gzip.open if path.endswith((".gz", ".gz" + OPEN_SUFFIX)) else open
+    with opener(path, "rb") as f:
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            if not line.strip():
+                continue
+            if not line.startswith(b"WARC/"):
+                raise ValueError(f"Not a WARC record in {path}: {line[:40]!r}")
+
+            headers = {}
+            for header in iter(f.readline, b"\r\n"):
+                if not header:
+                    break
+                name, _, value = header.decode("utf-8").partition(":")
+                headers[name.strip()] = value.strip()
+
+            block = f.read(int(headers.get("Content-Length", 0)))
+            f.read(4)
+            yield {"type": headers.get("WARC-Type"), "headers": headers, "block": block}
+
+
+def parse_http_response(block: bytes) -> Dict[str, Any]:
+    """Status, headers and decoded body of an archived HTTP response block"""
+    head, _, payload = block.partition(b"\r\n\r\n")
+    lines = head.decode("iso-8859-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    headers = urllib3.HTTPHeaderDict()
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        headers.add(name.strip(), value.strip())
+
+    # urllib3 undoes the Content-Encoding exactly like it did during the crawl
+    decoded = urllib3.HTTPResponse(body=io.BytesIO(payload), headers=headers, status=status,
+                                   preload_content=False, decode_content=True)
+    return {"status": status, "headers": headers, "payload": payload, "body": decoded.read()}
+
+
+def iter_responses(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Yield every archived response: {"url", "date", "status", "headers", "body", "truncated"}"""
+    for path in paths:
+        for record in iter_warc(path):
+            if record["type"] != "response":
+                continue
+            response = parse_http_response(record["block"])
+            response["url"] = record["headers"]["WARC-Target-URI"]
+            response["date"] = record["headers"].get("WARC-Date")
+            response["truncated"] = "WARC-Truncated" in record["headers"]
+            yield response
+
+
+def load_into_cache(paths: Iterable[str], cache) -> int:
+    """
+    Store archived responses in a ResponseCache so replay mode serves them
+
+    Later records of a URL replace earlier ones; truncated bodies are skipped.
+    """
+    stored = 0
+    for response in iter_responses(paths):
+        if response["truncated"]:
+            continue
+        headers = {name: value for name, value in response["headers"].items()}
+        cache.store_bytes(response["url"], response["url"], response["status"], headers, response["body"])
+        stored += 1
+    return stored
+
+
+def restore_snapshots(paths: Iterable[str], store) -> int:
+    """
+    Put the bodies of archived 2xx responses into a SnapshotStore
+
+    Snapshots are addressed by the hash of the decoded body, so this
+    brings back any snapshot the re-extraction job reports as missing.
+    """
+    restored = 0
+    for response in iter_responses(paths):
+        if response["truncated"] or not 200 <= response["status"] < 300:
+            continue
+        if store.put(response["body"])["stored"]:
+            restored += 1
+    return restored
+
+
+_default_writer = None
+_default_lock = threading.Lock()
+
+
+def get_default_writer() -> WarcWriter:
+    """Process-wide writer in CRAWLER_WARC_DIR, closed at exit"""
+    global _default_writer
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = WarcWriter()
+            atexit.register(_default_writer.close)
+        return _default_writer
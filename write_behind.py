@@ -0,0 +1,262 @@
+"""
+Write-Behind Storage
+Stores crawl results from a background thread in large batches
+
+Instead of every crawl waiting on its own bulk write plus a crawl log
+insert, crawls hand their items, fetch state and log to a BufferedWriter.
+Its thread groups the results of many crawls into one unordered bulk
+upsert of items, then the fetch-state updates (only of crawls whose items
+were stored), then one insert of crawl logs. A batch is written once it
+holds CRAWLER_WRITE_BATCH items or its oldest crawl waited
+CRAWLER_WRITE_DELAY seconds. The queue is bounded by
+CRAWLER_WRITE_QUEUE items: a crawl finding it full waits (back-pressure)
+and records the wait in its `write_wait` metric.
+"""
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Any, Optional
+
+WRITE_BEHIND = os.getenv('CRAWLER_WRITE_BEHIND', 'false').lower() == 'true'
+DEFAULT_BATCH = int(os.getenv('CRAWLER_WRITE_BATCH', 1000))
+DEFAULT_DELAY = float(os.getenv('CRAWLER_WRITE_DELAY', 1.0))
+DEFAULT_QUEUE = int(os.getenv('CRAWLER_WRITE_QUEUE', 10000))
+
+
+class WriterClosed(Exception):
+    """Raised when submitting to a writer that has been closed"""
+
+
+class BufferedWriter:
+    """Background writer batching the items, fetch state and logs of many crawls"""
+
+    def __init__(self, database, max_batch: int = DEFAULT_BATCH, max_delay: float = DEFAULT_DELAY,
+                 max_queue: int = DEFAULT_QUEUE, spool=None):
+        self.db = database
+        # DiskSpool keeping the crawls whose results cannot be written (None: they are lost)
+        self.spool = spool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_queue = max(max_queue, max_batch)
+
+        # Pending crawls: {"items", "states", "log", "queued_at"}
+        self._pending = deque()
+        self._queued_items = 0
+        self._submitted = 0
+        self._written = 0
+        self._closed = False
+        self._flush_requested = False
+        self._condition = threading.Condition()
+
+        # Metrics
+        self.flushes = 0
+        self.items_written = 0
+        self.logs_written = 0
+        self.write_errors = 0
+        self.stored = {"inserted": 0, "updated": 0, "unchanged": 0}
+        self.batch_sizes: deque = deque(maxlen=1000)
+        self.flush_seconds: deque = deque(maxlen=1000)
+        self.max_flush_seconds = 0.0
+        self.backpressure_waits = 0
+        self.backpressure_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    # ==================== SUBMITTING ====================
+
+    def submit(self, items: List[Dict[str, Any]], log: Optional[Dict[str, Any]] = None,
+               states: Optional[Dict[str, Dict[str, Any]]] = None) -> float:
+        """
+        Queue the results of one crawl, waiting while the queue is full
+
+        Args:
+            items: Crawled items to upsert
+            log: Crawl log, inserted after the items (a copy, whose status
+                becomes "error" or "spooled" if some cannot be stored)
+            states: url -> fetch state, saved only once the items are stored
+
+        Returns:
+            Seconds spent waiting for room in the queue
+        """
+        size = len(items)
+        waited = 0.0
+        with self._condition:
+            if self._closed:
+                raise WriterClosed("Buffered writer is closed")
+            # A crawl larger than the whole queue only waits for the queue to drain
+            if self._queued_items and self._queued_items + size > self.max_queue:
+                started = time.monotonic()
+                self.backpressure_waits += 1
+                while self._queued_items and self._queued_items + size > self.max_queue and not self._closed:
+                    self._condition.wait()
+                waited = time.monotonic() - started
+                self.backpressure_seconds += waited
+                if self._closed:
+                    raise WriterClosed("Buffered writer closed while waiting for room")
+
+            if log is not None:
+                if waited:
+                    log["metrics"]["write_wait"] = round(waited, 3)
+                # The caller keeps its log; the writer updates and inserts its own copy
+                log = dict(log, errors=list(log["errors"]), metrics=dict(log["metrics"]))
+            self._pending.append({"items": items, "states": states or {}, "log": log,
+                                  "queued_at": time.monotonic()})
+            self._queued_items += size
+            self._submitted += 1
+            self._condition.notify_all()
+        return waited
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything submitted so far now; False if it did not finish within timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            target = self._submitted
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._written < target:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Write what is queued, then stop the writer thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    # ==================== WRITING ====================
+
+    def _ready(self) -> bool:
+        if not self._pending:
+            return False
+        return (self._closed or self._flush_requested or self._queued_items >= self.max_batch
+                or time.monotonic() - self._pending[0]["queued_at"] >= self.max_delay)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._ready():
+                    if self._closed and not self._pending:
+                        return
+                    if not self._pending:
+                        self._flush_requested = False
+                    timeout = None
+                    if self._pending:
+                        timeout = max(0.0, self._pending[0]["queued_at"] + self.max_delay - time.monotonic())
+                    self._condition.wait(timeout)
+
+                # Whole crawls, up to max_batch items (a larger crawl goes alone)
+                batch = [self._pending.popleft()]
+                size = len(batch[0]["items"])
+                while self._pending and size + len(self._pending[0]["items"]) <= self.max_batch:
+                    entry = self._pending.popleft()
+                    batch.append(entry)
+                    size += len(entry["items"])
+
+            try:
+                self._write(batch, size)
+            except Exception as e:
+                self.write_errors += 1
+                print(f"⚠️ Write-behind batch failed: {e}")
+
+            with self._condition:
+                self._queued_items -= size
+                self._written += len(batch)
+                self._condition.notify_all()
+
+    def _write(self, batch: List[Dict[str, Any]], size: int):
+        started = time.monotonic()
+        items = [item for entry in batch for item in entry["items"]]
+        stored = self.db.bulk_store_data(items) if items else {}
+        failed = stored.get("failed", 0)
+        # Without the fingerprints of the failed items, every crawl with items counts as failed
+        failed_fingerprints = set(stored.get("failed_fingerprints", ()))
+        for outcome in self.stored:
+            self.stored[outcome] += stored.get(outcome, 0)
+
+        # Fetch state is only advanced once the content behind it is stored
+        logs = []
+        for entry in batch:
+            log = entry["log"]
+            lost = []
+            if failed:
+                lost = [item for item in entry["items"]
+                        if not failed_fingerprints or item.get("fingerprint") in failed_fingerprints]
+            if lost:
+                self.write_errors += 1
+                if log is not None:
+                    log["status"] = "spooled" if self.spool is not None else "error"
+                    log["errors"].append(f"Could not store {len(lost)} items")
+                if self.spool is not None:
+                    self.spool.spool_crawl(lost, entry["states"], log)
+                    continue
+            else:
+                for url, state in entry["states"].items():
+                    self.db.update_source_state(url, state)
+            if log is not None:
+                logs.append(log)
+        if logs:
+            if self.db.crawl_logs is not None:
+                result = self.db.bulk_log_crawl(logs)
+            else:
+                result = {"logged": 0, "failed": list(range(len(logs)))}
+            self.logs_written += result["logged"]
+            if self.spool is not None:
+                # Only the logs that were not inserted, so none is logged twice
+                for index in result["failed"]:
+                    self.spool.spool_crawl([], log=logs[index])
+
+        elapsed = time.monotonic() - started
+        self.flushes += 1
+        self.items_written += len(items) - failed
+        self.batch_sizes.append(size)
+        self.flush_seconds.append(elapsed)
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+
+    # ==================== METRICS ====================
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, batch sizes, flush latency and storage outcomes"""
+        with self._condition:
+            queued_items = self._queued_items
+            queued_crawls = len(self._pending)
+            batch_sizes = list(self.batch_sizes)
+            flush_seconds = sorted(self.flush_seconds)
+        return {
+            "queued_crawls": queued_crawls,
+            "queued_items": queued_items,
+            "flushes": self.flushes,
+            "items_written": self.items_written,
+            "logs_written": self.logs_written,
+            "write_errors": self.write_errors,
+            "stored": dict(self.stored),
+            "avg_batch_size": round(sum(batch_sizes) / len(batch_sizes), 1) if batch_sizes else 0,
+            "max_batch_size": max(batch_sizes, default=0),
+            "avg_flush_seconds": round(sum(flush_seconds) / len(flush_seconds), 4) if flush_seconds else 0.0,
+            "p95_flush_seconds": round(flush_seconds[int(len(flush_seconds) * 0.95)], 4) if flush_seconds else 0.0,
+            "max_flush_seconds": round(self.max_flush_seconds, 4),
+            "backpressure_waits": self.backpressure_waits,
+            "backpressure_seconds": round(self.backpressure_seconds, 3)
+        }
+
+
+_writers: Dict[int, BufferedWriter] = {}
+_writers_lock = threading.Lock()
+
+
+def get_writer(database, spool=None) -> BufferedWriter:
+    """Process-wide writer of a database (shared by its crawlers), flushed at exit"""
+    with _writers_lock:
+        writer = _writers.get(id(database))
+        if writer is None:
+            writer = _writers[id(database)] = BufferedWriter(database, spool=spool)
+            atexit.register(writer.close)
+        return writer
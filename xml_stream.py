@@ -0,0 +1,109 @@
+"""
+Streaming XML Helpers
+Incremental parsing of large XML documents straight from the network
+
+Uses lxml when installed and the standard library ElementTree otherwise.
+Records are emitted as soon as their closing tag arrives and are freed
+right after, so memory stays bounded regardless of document size.
+"""
+import io
+from typing import Dict, Iterator, Iterable, Optional
+
+try:
+    from lxml import etree
+    XMLParseError = etree.XMLSyntaxError
+    ITERPARSE_OPTIONS = {"resolve_entities": False, "no_network": True}
+    # Data dumps: keep whatever records can be read from slightly broken documents
+    RECORD_ITERPARSE_OPTIONS = dict(ITERPARSE_OPTIONS, recover=True)
+except ImportError:
+    import xml.etree.ElementTree as etree
+    XMLParseError = etree.ParseError
+    ITERPARSE_OPTIONS = {}
+    RECORD_ITERPARSE_OPTIONS = {}
+
+# Record elements extracted by default (same as the non-streaming _crawl_xml)
+DEFAULT_RECORD_TAGS = ("item", "entry", "record")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ResponseStream(io.RawIOBase):
+    """Read-only file object over a streamed requests.Response body"""
+
+    def __init__(self, response, chunk_size: int = STREAM_CHUNK_SIZE):
+        self._chunks = response.iter_content(chunk_size=chunk_size)
+        self._buffer = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._buffer:
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def split_tag(tag) -> tuple:
+    """Split '{namespace}name' into (namespace, name)"""
+    if isinstance(tag, str) and tag.startswith("{"):
+        namespace, name = tag[1:].split("}", 1)
+        return namespace, name
+    return "", tag
+
+
+def release(elem):
+    """Free a fully processed element (and, with lxml, its finished siblings)"""
+    elem.clear()
+    if hasattr(elem, "getprevious"):
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+
+
+def element_text(elem) -> str:
+    """Concatenated stripped text, like BeautifulSoup's get_text(strip=True)"""
+    return "".join(text.strip() for text in elem.itertext())
+
+
+def iter_records(stream, tags: Iterable[str] = DEFAULT_RECORD_TAGS,
+                 max_items: Optional[int] = None) -> Iterator[Dict[str, str]]:
+    """
+    Yield one record per matching element while the document is parsed
+
+    Args:
+        stream: Binary file object (e.g. ResponseStream)
+        tags: Local names of record elements (namespaces are ignored)
+        max_items: Stop parsing once this many records were emitted
+
+    Yields:
+        {"tag": local name, "content": record text}
+    """
+    tags = set(tags)
+    depth = 0
+    emitted = 0
+
+    for event, elem in etree.iterparse(stream, events=("start", "end"), **RECORD_ITERPARSE_OPTIONS):
+        if split_tag(elem.tag)[1] not in tags:
+            continue
+
+        if event == "start":
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth:
+            # Nested record: its text is part of the outer record
+            continue
+
+        yield {"tag": split_tag(elem.tag)[1], "content": element_text(elem)}
+        release(elem)
+
+        emitted += 1
+        if max_items is not None and emitted >= max_items:
+            return